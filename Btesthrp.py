@@ -2,18 +2,20 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import datetime
-import yfinance as yf
+import provedor_dados
 from HRPMACRO import (
     setores_por_ticker,
     setores_por_cenario,
     obter_preco_diario_ajustado,
     pontuar_macro,
+    validar_macro,
     classificar_cenario_macro,
     calcular_favorecimento_continuo,
     otimizar_carteira_sharpe,
     otimizar_carteira_hrp,
     get_bcb_hist,
     calcular_media_movel,  # <--- Importa função de médias móveis
+    warm_up,
 )
 
 st.title("Backtest Mensal com Aportes – HRPMACRO (Macroeconômico Histórico, max 30% por ativo)")
@@ -21,7 +23,7 @@ st.title("Backtest Mensal com Aportes – HRPMACRO (Macroeconômico Histórico,
 valor_aporte = 1000.0
 limite_porc_ativo = 0.15
 start_date = pd.to_datetime("2018-01-01")
-end_date = pd.to_datetime(datetime.date.today())
+end_date = pd.to_datetime(provedor_dados.hoje())
 
 tickers_str = st.text_input(
     "Tickers elegíveis (ex: PETR4.SA,VALE3.SA,ITUB4.SA)",
@@ -40,6 +42,9 @@ if st.button("Executar Backtest Mensal"):
         st.warning("Inclua ao menos um ticker.")
         st.stop()
 
+    # Médias móveis de commodities usadas na pontuação (sem snapshot macro atual: o backtest usa o histórico)
+    warm_up(macro=False)
+
     datas_aporte = pd.date_range(start_date, end_date, freq="MS")
     valor_carteira = []
     datas_carteira = []
@@ -119,6 +124,8 @@ if st.button("Executar Backtest Mensal"):
             "petroleo_ideal": macro["petroleo"]
         })
 
+        # pontuar_macro não altera mais o dict: o preenchimento com 0.0 usado na classificação é explícito
+        validar_macro(macro)
         score_macro = pontuar_macro(macro)
         cenario = classificar_cenario_macro(
             ipca=macro.get("ipca"),
@@ -1,49 +1,53 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
-import requests
-import datetime
 import os
-import matplotlib.pyplot as plt
-from sklearn.covariance import LedoitWolf
-from scipy.cluster.hierarchy import linkage, dendrogram
-from scipy.spatial.distance import squareform
 from scipy.optimize import minimize
-
-st.set_page_config(page_title="Sugestão de Carteira", layout="wide")
+import provedor_dados
+from armazenamento_precos import carregar_precos, carregar_close_e_fator
+from cotacoes import obter_cotacoes
+from focus import obter_mediana_focus
+from sgs import obter_serie_sgs
+from carregador_macro import carregar_snapshot_macro
+from snapshot_macro import congelar, memoizar
+from commodities import CESTA_COMMODITIES, precos_spot, medias_moveis_12m
+from historico_cenarios import calcular_historico, expandir_para_tickers
+from armazenamento_historico import atualizar_historico, impressao_digital
+from matriz_setorial import MatrizSetorial
+import pontuacao_vetorizada as pv
+from grade_cenarios import EIXOS_PADRAO, avaliar_grade, tabela
+from simulador_macro import simular_cenarios, quantis_favor
+from fronteira_eficiente import simular_fronteira
+from fronteira_exata import tracar_fronteira, melhor_sharpe
+from objetivos_carteira import sharpe_negativo, retorno_negativo, soma_um
+from contexto_carteira import ContextoCarteira
+from hrp_vetorizado import calcular_hrp
 
 def get_bcb_hist(code, inicio, final):
-    url = f"https://api.bcb.gov.br/dados/serie/bcdata.sgs.{code}/dados?formato=json&dataInicial={inicio}&dataFinal={final}"
-    r = requests.get(url)
-    if r.status_code == 200:
-        data = r.json()
-        # Se o retorno não for uma lista ou está vazio, retorna um Series vazio
-        if not isinstance(data, list) or not data:
-            print(f"Retorno vazio ou inválido da API BCB para código {code}: {data}")
-            return pd.Series(dtype=float)
-        df = pd.DataFrame(data)
-        df['data'] = pd.to_datetime(df['data'], dayfirst=True)
-        df['valor'] = df['valor'].str.replace(",", ".").astype(float)
-        return df.set_index('data')['valor']
-    else:
-        print(f"Request falhou para código {code} com status {r.status_code}")
-        return pd.Series(dtype=float)
+    """Série histórica do SGS/BCB (datas dd/mm/aaaa), com cache local incremental por código."""
+    serie = obter_serie_sgs(code, inicio, final)
+    if serie.empty:
+        print(f"Retorno vazio ou inválido da API BCB para código {code}")
+    return serie
 
 def obter_preco_petroleo_hist(start, end):
     """Baixa preço histórico mensal do petróleo Brent (BZ=F) do Yahoo Finance."""
-    df = yf.download("BZ=F", start=start, end=end, interval="1mo", progress=False)
+    df = provedor_dados.download("BZ=F", start=start, end=end, interval="1mo", progress=False)
     if not df.empty:
         df.index = pd.to_datetime(df.index)
         return df['Close']
     return pd.Series(dtype=float)
 
-def montar_historico_7anos(tickers, setores_por_ticker, start='2015-01-01'):
-    """Gera histórico dos últimos 10 anos (em memória, sem salvar em CSV)."""
-    hoje = datetime.date.today()
+def montar_macro_mensal(start='2015-01-01', anterior=None):
+    """
+    Indicadores macro em frequência mensal (fim de mês) desde start, com preenchimento para frente/trás.
+    anterior: meses já montados antes de start (atualização incremental); as novas linhas são
+    preenchidas para frente a partir do último deles, como se o período inteiro tivesse sido montado de uma vez.
+    """
+    hoje = provedor_dados.hoje()
     inicio = pd.to_datetime(start)
     final = hoje
-    datas = pd.date_range(inicio, final, freq='M').normalize()
+    datas = pd.date_range(inicio, final, freq='ME').normalize()
     
     # Baixar séries macro históricas do BCB
     selic_hist = get_bcb_hist(432, inicio.strftime('%d/%m/%Y'), final.strftime('%d/%m/%Y'))
@@ -62,43 +66,38 @@ def montar_historico_7anos(tickers, setores_por_ticker, start='2015-01-01'):
     macro_df['ipca'] = ipca_hist.reindex(datas, method='ffill')
     macro_df['dolar'] = dolar_hist.reindex(datas, method='ffill')
     macro_df['petroleo'] = petroleo_hist.reindex(datas, method='ffill')
+    if anterior is not None:
+        macro_df = pd.concat([anterior[macro_df.columns].iloc[-1:], macro_df]).ffill().iloc[1:]
     macro_df = macro_df.ffill().bfill()
+    # PIB fixo em 2; soja, milho e minério sem histórico (pontuados como ausentes)
+    macro_df['pib'] = 2.0
+    return macro_df
 
-    historico = []
-    for data in datas:
-        macro = {
-            "ipca": macro_df.loc[data, "ipca"],
-            "selic": macro_df.loc[data, "selic"],
-            "dolar": macro_df.loc[data, "dolar"],
-            "pib": 2,
-            "petroleo": macro_df.loc[data, "petroleo"],
-            "soja": None,
-            "milho": None,
-            "minerio": None
-        }
-        cenario = classificar_cenario_macro(
-            ipca=macro["ipca"],
-            selic=macro["selic"],
-            dolar=macro["dolar"],
-            pib=macro["pib"],
-            preco_soja=macro["soja"],
-            preco_milho=macro["milho"],
-            preco_minerio=macro["minerio"],
-            preco_petroleo=macro["petroleo"]
-        )
-        score_macro = pontuar_macro(macro)
-        for ticker in tickers:
-            setor = setores_por_ticker.get(ticker, None)
-            favorecido = calcular_favorecimento_continuo(setor, score_macro)
-            historico.append({
-                "data": str(data.date()),
-                "cenario": cenario,
-                "ticker": ticker,
-                "setor": setor,
-                "favorecido": favorecido
-            })
-    df_hist = pd.DataFrame(historico)
-    return df_hist
+def montar_historico_cenarios(start='2015-01-01', incremental=True):
+    """
+    Histórico compacto (cenário e favorecimento por setor, mês a mês), pontuado de uma vez só.
+    incremental: reaproveita o histórico salvo em disco e só monta/pontua os meses ainda em aberto
+    (ver armazenamento_historico); False refaz tudo desde start sem tocar no arquivo.
+    """
+    if not incremental:
+        return calcular_historico(montar_macro_mensal(start), PARAMS, matriz_setorial)
+    return atualizar_historico(
+        "hrpmacro", start,
+        montar_macro=montar_macro_mensal,
+        pontuar=lambda macro_df: calcular_historico(macro_df, PARAMS, matriz_setorial),
+        impressao=impressao_digital(
+            sorted(PARAMS.items()), matriz_setorial.fatores, matriz_setorial.setores, matriz_setorial.matriz.tolist()
+        ),
+    )
+
+def montar_historico_7anos(tickers, setores_por_ticker, start='2015-01-01', historico=None):
+    """
+    Gera histórico dos últimos 10 anos (em memória, sem salvar em CSV), uma linha por mês x ticker.
+    Cenário e setor não dependem do ticker: o histórico compacto é expandido só aqui.
+    """
+    if historico is None:
+        historico = montar_historico_cenarios(start)
+    return expandir_para_tickers(historico, tickers, setores_por_ticker)
 
 # ========= DICIONÁRIOS ==========
 
@@ -375,7 +374,7 @@ for setores in setores_por_cenario.values():
 # Funções para obter dados do BCB
 
 @st.cache_data(ttl=86400)
-def buscar_projecoes_focus(indicador, ano=datetime.datetime.now().year):
+def buscar_projecoes_focus(indicador, ano=None):
     indicador_map = {
         "IPCA": "IPCA",
         "Selic": "Selic",
@@ -385,55 +384,97 @@ def buscar_projecoes_focus(indicador, ano=datetime.datetime.now().year):
     nome_indicador = indicador_map.get(indicador)
     if not nome_indicador:
         return None
-    base_url = "https://olinda.bcb.gov.br/olinda/servico/Expectativas/versao/v1/odata/"
-    url = f"{base_url}ExpectativasMercadoTop5Anuais?$top=100000&$filter=Indicador eq '{nome_indicador}'&$format=json&$select=Indicador,Data,DataReferencia,Mediana"
+    ano = ano or provedor_dados.hoje().year
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        dados = response.json()["value"]
-        df = pd.DataFrame(dados)
-        df = df[df["DataReferencia"].str.contains(str(ano))]
-        df = df.sort_values("Data", ascending=False)
-        if df.empty:
+        mediana = obter_mediana_focus(nome_indicador, ano)
+        if mediana is None:
             raise ValueError(f"Nenhum dado encontrado para {indicador} em {ano}.")
-        return float(df.iloc[0]["Mediana"])
+        return mediana
     except Exception as e:
         print(f"Erro ao buscar {indicador} no Boletim Focus: {e}")
         return None
 
+def _ultimo_fechamento_yf(ticker):
+    dados = provedor_dados.historico(ticker, period="5d")
+    if dados.empty or 'Close' not in dados.columns:
+        raise ValueError(f"Preço indisponível para {ticker}")
+    return float(dados['Close'].dropna().iloc[-1])
+
+def _spot_commodity(simbolo):
+    # Todas as commodities saem do mesmo download da cesta (compartilhado entre as threads)
+    preco = precos_spot().get(simbolo)
+    if preco is None:
+        raise ValueError(f"Preço indisponível para {simbolo}")
+    return preco
+
+# Fontes do snapshot macro (na ordem exibida) e prazo máximo de cada uma, em segundos
+FONTES_MACRO = {
+    "ipca": lambda: obter_mediana_focus("IPCA", provedor_dados.hoje().year),
+    "selic": lambda: obter_mediana_focus("Selic", provedor_dados.hoje().year),
+    "pib": lambda: obter_mediana_focus("PIB Total", provedor_dados.hoje().year),
+    "petroleo": lambda: _spot_commodity("BZ=F"),
+    "dolar": lambda: obter_mediana_focus("Câmbio", provedor_dados.hoje().year),
+    "soja": lambda: _spot_commodity("ZS=F"),
+    "milho": lambda: _spot_commodity("ZC=F"),
+    # Mantido BZ=F como no cálculo original do minério no snapshot macro
+    "minerio": lambda: _spot_commodity("BZ=F"),
+}
+TIMEOUTS_MACRO = {"ipca": 20, "selic": 20, "pib": 20, "dolar": 20}
+
+# Snapshot com alguma fonte falha (None pontua como 0) é refeito após alguns minutos, e não só no dia seguinte
+TTL_MACRO_INCOMPLETO = 300
+
+@st.cache_resource(ttl=TTL_MACRO_INCOMPLETO, show_spinner=False)
+def _tentar_carregar_macro(dia):
+    return carregar_snapshot_macro(FONTES_MACRO, timeouts=TIMEOUTS_MACRO, timeout_padrao=10)
+
+@st.cache_resource(ttl=86400)
+def _macros_completos():
+    return {}
+
+def carregar_macro():
+    """
+    Snapshot macro imutável carregado com todas as fontes em paralelo (compartilhado entre sessões).
+    Só o snapshot sem falhas vale o dia inteiro; o incompleto fica em cache por TTL_MACRO_INCOMPLETO segundos.
+    """
+    dia = provedor_dados.hoje()
+    completos = _macros_completos()
+    if dia in completos:
+        return completos[dia]
+    snapshot = _tentar_carregar_macro(dia)
+    if not snapshot.falhas:
+        completos.clear()
+        completos[dia] = snapshot
+    return snapshot
+
 def obter_macro():
-    macro = {
-        "ipca": buscar_projecoes_focus("IPCA"),
-        "selic": buscar_projecoes_focus("Selic"),
-        "pib": buscar_projecoes_focus("PIB Total"),
-        "petroleo": obter_preco_petroleo(),
-        "dolar": buscar_projecoes_focus("Câmbio"),
-        "soja": obter_preco_commodity("ZS=F", nome="Soja"),
-        "milho": obter_preco_commodity("ZC=F", nome="Milho"),
-        "minerio": obter_preco_commodity("BZ=F", nome="Minério de Ferro")
-    }
-    return macro
+    """MacroSnapshot imutável do dia; ajustes manuais geram um novo snapshot com substituir()."""
+    return carregar_macro().valores
 
 @st.cache_data(ttl=86400)
 def obter_preco_yf(ticker, nome="Ativo"):
     try:
-        dados = yf.Ticker(ticker).history(period="5d")
-        if not dados.empty and 'Close' in dados.columns:
-            return float(dados['Close'].dropna().iloc[-1])
-        else:
-            st.warning(f"Preço indisponível para {nome}.")
-            return None
+        return _ultimo_fechamento_yf(ticker)
+    except ValueError:
+        st.warning(f"Preço indisponível para {nome}.")
+        return None
     except Exception as e:
         st.error(f"Erro ao obter preço de {nome} ({ticker}): {e}")
         return None
 
 @st.cache_data(ttl=86400)
 def obter_preco_commodity(ticker, nome="Commodity"):
+    if ticker in CESTA_COMMODITIES.values():
+        try:
+            return _spot_commodity(ticker)
+        except Exception:
+            st.warning(f"Preço indisponível para {nome}.")
+            return None
     return obter_preco_yf(ticker, nome)
 
 @st.cache_data(ttl=86400)
 def obter_preco_petroleo():
-    return obter_preco_yf("BZ=F", "Petróleo")
+    return obter_preco_commodity("BZ=F", "Petróleo")
 
 # Funções de pontuação individual
 
@@ -504,10 +545,15 @@ def pontuar_pib(pib):
 def calcular_media_movel(ticker, periodo="12mo", intervalo="1mo"):
     """
     Calcula a média móvel do preço de um ativo (ex.: soja, milho, petróleo, minério).
-    Retorna float (valor escalar).
+    Retorna float (valor escalar). Para a cesta de commodities em 12 meses, usa o download único da cesta.
     """
+    if ticker in CESTA_COMMODITIES.values() and (periodo, intervalo) == ("12mo", "1mo"):
+        media_movel = medias_moveis_12m().get(ticker)
+        if media_movel is None:
+            st.warning(f"Dados históricos indisponíveis para {ticker}.")
+        return media_movel
     try:
-        dados = yf.download(ticker, period=periodo, interval=intervalo, progress=False)
+        dados = provedor_dados.download(ticker, period=periodo, interval=intervalo, progress=False)
         if not dados.empty:
             media_movel = float(dados['Close'].mean())
             return media_movel
@@ -520,11 +566,15 @@ def calcular_media_movel(ticker, periodo="12mo", intervalo="1mo"):
 
 # --- Função para obter preços ideais dinâmicos usando médias móveis ---
 def obter_precos_ideais():
+    # Uma única cesta (diária) alimenta as quatro médias de 12 meses
+    try:
+        medias = medias_moveis_12m()
+    except Exception as e:
+        st.error(f"Erro ao calcular médias móveis das commodities: {e}")
+        medias = {}
     return {
-        "soja_ideal": calcular_media_movel("ZS=F", periodo="12mo", intervalo="1mo"),    # Soja
-        "milho_ideal": calcular_media_movel("ZC=F", periodo="12mo", intervalo="1mo"),   # Milho
-        "minerio_ideal": calcular_media_movel("TIO=F", periodo="12mo", intervalo="1mo"), # Minério de ferro (use o ticker correto para o seu caso)
-        "petroleo_ideal": calcular_media_movel("BZ=F", periodo="12mo", intervalo="1mo") # Petróleo Brent
+        f"{indicador}_ideal": medias.get(simbolo)
+        for indicador, simbolo in CESTA_COMMODITIES.items()
     }
 
 # --- Atualize os parâmetros globais de commodities ---
@@ -565,7 +615,7 @@ def pontuar_minerio(minerio):
         return 0
     if isinstance(minerio, pd.Series):
         minerio = float(minerio.iloc[0])
-    ideal = PARAMS["minerio_ideal"]
+    ideal = PARAMS.get("minerio_ideal")
     if ideal is None or pd.isna(ideal):
         return 0
     desvio = abs(minerio - ideal)
@@ -576,7 +626,7 @@ def pontuar_petroleo(petroleo):
         return 0
     if isinstance(petroleo, pd.Series):
         petroleo = float(petroleo.iloc[0])
-    ideal = PARAMS["petroleo_ideal"]
+    ideal = PARAMS.get("petroleo_ideal")
     if ideal is None or pd.isna(ideal):
         return 0
     desvio = abs(petroleo - ideal)
@@ -584,9 +634,6 @@ def pontuar_petroleo(petroleo):
 
 
 
-# --- Garanta que os parâmetros estejam atualizados antes do uso ---
-PARAMS = atualizar_parametros_com_medias_moveis()
-
 # Atualize o Streamlit para mostrar os preços ideais
 def validar_macro(macro):
     obrigatorios = ["selic", "ipca", "dolar", "pib", "soja", "milho", "minerio", "petroleo"]
@@ -595,12 +642,19 @@ def validar_macro(macro):
             macro[k] = 0.0  # Preencha com zero se ausente ou inválido
             
 
+def _estado_params():
+    # Entra nas chaves de memoização: PARAMS muda quando as médias móveis são recarregadas
+    return tuple(sorted(PARAMS.items()))
+
+@memoizar(maxsize=256, dependencias=_estado_params, copiar=dict)
 def pontuar_macro(m, pesos=None):
     """
     Calcula scores macroeconômicos normalizados e média ponderada.
-    m: dict com indicadores macroeconômicos
+    m: dict ou MacroSnapshot com indicadores macroeconômicos (não é alterado)
     pesos: dict opcional com pesos dos indicadores
+    Com MacroSnapshot, o resultado é memoizado pelo conteúdo do snapshot.
     """
+    m = dict(m)
     validar_macro(m)
     score = {
         "juros": pontuar_selic(m["selic"]),
@@ -623,52 +677,37 @@ def pontuar_macro(m, pesos=None):
 # Funções para preço-alvo e preço atual
 
 def obter_preco_alvo(ticker):
-    try:
-        return yf.Ticker(ticker).info.get('targetMeanPrice', None)
-    except Exception as e:
-        st.warning(f"Erro ao obter preço-alvo de {ticker}: {e}")
-        return None
+    preco_alvo = obter_cotacoes([ticker]).at[ticker, "preco_alvo"]
+    return None if pd.isna(preco_alvo) else preco_alvo
 
 def obter_preco_atual(ticker):
-    try:
-        dados = yf.Ticker(ticker).history(period="1d")
-        if not dados.empty:
-            return dados['Close'].iloc[-1]
-    except Exception as e:
-        st.warning(f"Erro ao obter preço atual de {ticker}: {e}")
-    return None
+    preco_atual = obter_cotacoes([ticker]).at[ticker, "preco_atual"]
+    return None if pd.isna(preco_atual) else preco_atual
 
 def gerar_ranking_acoes(carteira, macro, usar_pesos_macro=True):
-    score_macro = pontuar_macro(macro)
-    resultados = []
+    cotacoes = obter_cotacoes(list(carteira.keys()))
+    scores = calcular_scores_universo(cotacoes, macro, usar_pesos_macroeconomicos=usar_pesos_macro)
 
-    for ticker in carteira.keys():
-        setor = setores_por_ticker.get(ticker)
-        if setor is None:
+    sem_setor = scores["setor"].isna()
+    insuficiente = scores["preco_atual"].isna() | scores["preco_alvo"].isna() | (scores["preco_atual"] == 0)
+    for ticker in scores.index[sem_setor | insuficiente]:
+        if sem_setor[ticker]:
             st.warning(f"Setor não encontrado para {ticker}. Ignorando.")
-            continue
-
-        preco_atual = obter_preco_atual(ticker)
-        preco_alvo = obter_preco_alvo(ticker)
-
-        if preco_atual is None or preco_alvo is None or preco_atual == 0:
+        else:
             st.warning(f"Dados insuficientes para {ticker}. Ignorando.")
-            continue
+    validos = scores[~(sem_setor | insuficiente)]
 
-        favorecimento_score = calcular_favorecimento_continuo(setor, score_macro)
-        score, detalhe = calcular_score(preco_atual, preco_alvo, favorecimento_score, ticker, setor, macro, usar_pesos_macro, return_details=True)
-
-        resultados.append({
-            "ticker": ticker,
-            "setor": setor,
-            "preço atual": preco_atual,
-            "preço alvo": preco_alvo,
-            "favorecimento macro": favorecimento_score,
-            "score": score,
-            "detalhe": detalhe
-        })
+    resultados = pd.DataFrame({
+        "ticker": validos.index,
+        "setor": validos["setor"].to_numpy(),
+        "preço atual": validos["preco_atual"].to_numpy(),
+        "preço alvo": validos["preco_alvo"].to_numpy(),
+        "favorecimento macro": validos["favorecimento"].to_numpy(),
+        "score": validos["score"].to_numpy(),
+        "detalhe": validos["detalhe"].to_numpy(),
+    })
 
-    df = pd.DataFrame(resultados).sort_values(by="score", ascending=False)
+    df = resultados.sort_values(by="score", ascending=False)
 
     # Garantir exibição mesmo se algumas colunas estiverem ausentes
     colunas_desejadas = ["ticker", "setor", "preço atual", "preço alvo", "favorecimento macro", "score"]
@@ -718,7 +757,7 @@ def calcular_score(
     if ticker in empresas_exportadoras:
         if macro.get('dolar') and macro['dolar'] > PARAMS["dolar_ideal"]:
             bonus += 0.10
-        if macro.get('petroleo') and macro['petroleo'] > PARAMS["petroleo_ideal"]:
+        if macro.get('petroleo') and PARAMS.get("petroleo_ideal") and macro['petroleo'] > PARAMS["petroleo_ideal"]:
             bonus += 0.05
     bonus = np.clip(bonus, 0, 0.15)
 
@@ -738,6 +777,73 @@ def calcular_score(
 
     return (score_total, detalhe) if return_details else score_total
 
+_calcular_score_padrao = calcular_score
+
+
+def calcular_scores_universo(cotacoes, macro, setores=None, usar_pesos_macroeconomicos=True, favorecimento=None):
+    """
+    Versão em lote de calcular_score para todo o universo de uma vez.
+    cotacoes: DataFrame indexado por ticker com 'preco_atual' e 'preco_alvo' (formato de obter_cotacoes).
+    setores: dict ticker -> setor (padrão: setores_por_ticker).
+    favorecimento: favorecimento por ticker (padrão: matriz_setorial a partir de pontuar_macro(macro)).
+    O score macro é calculado uma única vez (memoizado pelo snapshot), sem alterar o macro recebido.
+    Retorna DataFrame (mesmo índice) com setor, preços, termos do score, 'score' e 'detalhe'.
+    """
+    setores = setores_por_ticker if setores is None else setores
+    tickers = list(cotacoes.index)
+    setor = [setores.get(t) for t in tickers]
+    preco_atual = cotacoes["preco_atual"].to_numpy(dtype="float64")
+    preco_alvo = cotacoes["preco_alvo"].to_numpy(dtype="float64")
+
+    score_indicadores = pontuar_macro(congelar(macro))
+    if favorecimento is None:
+        favorecimento = matriz_setorial.favorecimento_setores(setor, score_indicadores)
+    favorecimento = np.asarray(favorecimento, dtype="float64")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        upside = (preco_alvo - preco_atual) / preco_atual
+    base_score = np.sign(upside) * np.log1p(np.abs(upside)) * 3
+
+    if usar_pesos_macroeconomicos:
+        score_macro = matriz_setorial.por_item(matriz_setorial.bruto(score_indicadores), setor)
+    else:
+        score_macro = np.zeros(len(tickers))
+    score_macro = np.clip(score_macro, -10, 10)
+    favorecimento_peso = 2.0 if usar_pesos_macroeconomicos else 0
+
+    # O bônus de exportadora depende só do macro: calculado uma vez e aplicado por máscara
+    bonus_exportadora = 0
+    if macro.get('dolar') and macro['dolar'] > PARAMS["dolar_ideal"]:
+        bonus_exportadora += 0.10
+    if macro.get('petroleo') and PARAMS.get("petroleo_ideal") and macro['petroleo'] > PARAMS["petroleo_ideal"]:
+        bonus_exportadora += 0.05
+    bonus = np.where(np.isin(tickers, list(empresas_exportadoras)), np.clip(bonus_exportadora, 0, 0.15), 0.0)
+
+    score_total = np.clip(
+        base_score + (0.20 * score_macro) + bonus + (favorecimento * favorecimento_peso), -10, 10
+    )
+    # Preço atual zero: mesmo tratamento de calcular_score
+    zero = preco_atual == 0
+    score_total = np.where(zero, -np.inf, score_total)
+
+    detalhe = [
+        "Preço atual igual a zero" if z else
+        f"upside={u:.2f}, base={b:.2f}, macro={m:.2f}, bonus={bo:.2f}, favorecimento={f:.2f}, score_final={s:.2f}"
+        for z, u, b, m, bo, f, s in zip(zero, upside, base_score, score_macro, bonus, favorecimento, score_total)
+    ]
+    return pd.DataFrame({
+        "setor": setor,
+        "preco_atual": preco_atual,
+        "preco_alvo": preco_alvo,
+        "upside": upside,
+        "base": base_score,
+        "macro": score_macro,
+        "bonus": bonus,
+        "favorecimento": favorecimento,
+        "score": score_total,
+        "detalhe": detalhe,
+    }, index=cotacoes.index)
+
 
 def classificar_cenario_macro(
     ipca, selic, dolar, pib,
@@ -890,18 +996,23 @@ sensibilidade_setorial = {
 }
 # Sugestão: documente/calcule a origem destes valores, e revise-os periodicamente.
 
+# Compilada uma vez (setores x fatores); recompile se sensibilidade_setorial for alterado
+matriz_setorial = MatrizSetorial(sensibilidade_setorial)
+
 def calcular_favorecimento_continuo(setor, score_macro):
     """
     Calcula o favorecimento contínuo do setor com base na sensibilidade setorial e scores macro.
+    Para vários setores de uma vez, use matriz_setorial.favor_por_setor / favorecimento_setores.
     """
-    if setor not in sensibilidade_setorial:
-        return 0
-    sens = sensibilidade_setorial[setor]
-    bruto = sum(score_macro.get(k, 0) * peso for k, peso in sens.items())
-    return np.tanh(bruto / 5) * 2
+    return matriz_setorial.favorecimento_setor(setor, score_macro)
 
 
 def filtrar_ativos_validos(carteira, setores_por_ticker, setores_por_cenario, macro, calcular_score):
+    """
+    Ativos com preço atual e alvo disponíveis, pontuados e ordenados por score.
+    Não é memoizado: lê as cotações ao vivo, e um ticker cuja cotação falhou volta a ser tentado no próximo rerun
+    (a pontuação macro, pura, continua memoizada em pontuar_macro).
+    """
     # Extrair valores individuais do dicionário de pontuação
     score_macro = pontuar_macro(macro)
     ipca = score_macro.get("inflação")
@@ -909,12 +1020,17 @@ def filtrar_ativos_validos(carteira, setores_por_ticker, setores_por_cenario, ma
     dolar = score_macro.get("dolar")
     pib = score_macro.get("pib")
 
+    # Indicadores ausentes entram como 0.0 (validar_macro), como quando pontuar_macro alterava o dict recebido:
+    # vale para o cenário, o favorecimento e o score
+    macro_validado = dict(macro)
+    validar_macro(macro_validado)
+
     # Agora chama a função passando os parâmetros individuais
     cenario = classificar_cenario_macro(ipca, selic, dolar, pib, 
-                                        preco_soja=macro.get("soja"), 
-                                        preco_milho=macro.get("milho"), 
-                                        preco_minerio=macro.get("minerio"), 
-                                        preco_petroleo=macro.get("petroleo"))
+                                        preco_soja=macro_validado.get("soja"), 
+                                        preco_milho=macro_validado.get("milho"), 
+                                        preco_minerio=macro_validado.get("minerio"), 
+                                        preco_petroleo=macro_validado.get("petroleo"))
     
     # Exibir as pontuações e o cenário
 
@@ -923,20 +1039,25 @@ def filtrar_ativos_validos(carteira, setores_por_ticker, setores_por_cenario, ma
     setores_cidos = setores_por_cenario.get(cenario, [])
 
     # Inicializar a lista de ativos válidos
-    ativos_validos = []
-    for ticker in carteira:
-        setor = setores_por_ticker.get(ticker, None)
-        preco_atual = obter_preco_atual(ticker)
-        preco_alvo = obter_preco_alvo(ticker)
-
-        if preco_atual is None or preco_alvo is None:
-            continue
-
-        favorecimento_score = calcular_favorecimento_continuo(setor, macro)
-        score = calcular_score(preco_atual, preco_alvo, favorecimento_score, ticker, setor, macro, usar_pesos_macroeconomicos=True, return_details=False)
-
-        # Adicionar o ativo à lista de ativos válidos
-        ativos_validos.append({
+    cotacoes = obter_cotacoes(list(carteira))
+    cotacoes = cotacoes[cotacoes["preco_atual"].notna() & cotacoes["preco_alvo"].notna()]
+    setores = [setores_por_ticker.get(t, None) for t in cotacoes.index]
+    # O favorecimento aqui é calculado sobre o dict macro (como antes), não sobre os scores
+    favorecimento = matriz_setorial.favorecimento_setores(setores, macro_validado)
+    if calcular_score is _calcular_score_padrao:
+        scores = calcular_scores_universo(
+            cotacoes, macro_validado, setores_por_ticker, True, favorecimento
+        )["score"].tolist()
+    else:
+        scores = [
+            calcular_score(atual, alvo, fav, ticker, setor, macro_validado, usar_pesos_macroeconomicos=True,
+                           return_details=False)
+            for ticker, setor, atual, alvo, fav in zip(
+                cotacoes.index, setores, cotacoes["preco_atual"], cotacoes["preco_alvo"], favorecimento
+            )
+        ]
+    ativos_validos = [
+        {
             "ticker": ticker,
             "setor": setor,
             "cenario": cenario,
@@ -944,7 +1065,11 @@ def filtrar_ativos_validos(carteira, setores_por_ticker, setores_por_cenario, ma
             "preco_alvo": preco_alvo,
             "score": score,
             "favorecido": favorecimento_score
-        })
+        }
+        for ticker, setor, preco_atual, preco_alvo, score, favorecimento_score in zip(
+            cotacoes.index, setores, cotacoes["preco_atual"], cotacoes["preco_alvo"], scores, favorecimento
+        )
+    ]
 
     # Ordenar os ativos válidos pelo score
     ativos_validos.sort(key=lambda x: x['score'], reverse=True)
@@ -952,64 +1077,98 @@ def filtrar_ativos_validos(carteira, setores_por_ticker, setores_por_cenario, ma
     return ativos_validos
 
 
+# ========= MAPA DE REGIMES (WHAT-IF) ==========
+
+# Cada grade padrão ocupa ~28 MB: poucas combinações de fixos/PARAMS ficam guardadas
+@st.cache_resource(ttl=86400, max_entries=4, show_spinner=False)
+def calcular_grade_what_if(fixos, params):
+    """Grade padrão (Selic x IPCA x Dólar) com os demais indicadores fixos; float32 para caber em memória."""
+    return avaliar_grade(EIXOS_PADRAO, params, matriz_setorial, fixos, dtype="float32")
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def simular_cenarios_12m(params, macro_atual, metodo="bootstrap", n_trajetorias=20000):
+    """
+    Probabilidade de cada cenário nos próximos 12 meses, partindo do macro atual e
+    reamostrando as variações mensais do histórico desde 2015 (semente fixa).
+    O IPCA parte da expectativa anual do Focus e varia como o IPCA acumulado em 12 meses do histórico.
+    """
+    historico = warm_up(macro=False, historico=True)["historico"]
+    return simular_cenarios(
+        historico.macro, params, matriz_setorial, n_trajetorias=n_trajetorias, metodo=metodo,
+        inicial=macro_atual, fixos=macro_atual, semente=0
+    )
+
+
 # ========= OTIMIZAÇÃO ==========
 
 
 
 @st.cache_data(ttl=86400)
 def obter_preco_diario_ajustado(tickers):
-    dados_brutos = yf.download(tickers, period="10y", auto_adjust=False)
-
+    """Preços ajustados diários (10 anos) servidos pelo armazenamento local, baixando só o que falta."""
     # Forçar tickers a ser lista, mesmo se for string
     if isinstance(tickers, str):
         tickers = [tickers]
 
-    if isinstance(dados_brutos.columns, pd.MultiIndex):
-        if 'Adj Close' in dados_brutos.columns.get_level_values(0):
-            return dados_brutos['Adj Close']
-        elif 'Close' in dados_brutos.columns.get_level_values(0):
-            return dados_brutos['Close']
-        else:
-            raise ValueError("Colunas 'Adj Close' ou 'Close' não encontradas nos dados.")
-    else:
-        # Apenas um ticker e colunas simples
-        if 'Adj Close' in dados_brutos.columns:
-            return dados_brutos[['Adj Close']].rename(columns={'Adj Close': tickers[0]})
-        elif 'Close' in dados_brutos.columns:
-            return dados_brutos[['Close']].rename(columns={'Close': tickers[0]})
-        else:
-            raise ValueError("Coluna 'Adj Close' ou 'Close' não encontrada nos dados.")
+    dados = carregar_precos(tickers, coluna="Adj Close")
+    if dados.empty:
+        raise ValueError("Colunas 'Adj Close' ou 'Close' não encontradas nos dados.")
+    return dados
+
+@st.cache_resource(ttl=86400, max_entries=32, show_spinner=False)
+def _contexto_do_dia(tickers, dia):
+    return ContextoCarteira(tickers, obter_preco_diario_ajustado, dia)
+
+def obter_contexto(tickers):
+    """
+    ContextoCarteira compartilhado por conjunto de tickers e dia: preços, retornos e covariâncias
+    são carregados/calculados uma vez e reaproveitados por otimizadores, métricas e gráficos.
+    """
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    return _contexto_do_dia(tuple(dict.fromkeys(tickers)), provedor_dados.hoje())
             
-def calcular_fronteira_eficiente_macro(retornos, score_dict, n_portfolios=50000, taxa_risco_livre=0.0):
+def calcular_fronteira_eficiente_macro(retornos, score_dict, n_portfolios=50000, taxa_risco_livre=0.0, semente=None,
+                                       amostrador="uniforme", concentracao=1.0, parar_apos=None, contexto=None):
     """
     Gera portfolios aleatórios usando retornos ajustados pelo score macro.
+    Sorteio em lotes vetorizados (ver fronteira_eficiente): retorna FronteiraMonteCarlo com a melhor
+    carteira (inclusive seus Pesos), as de maior Sharpe, a fronteira de Pareto e uma amostra de pontos para o gráfico.
+    amostrador/concentracao: forma do sorteio dos pesos (fronteira_eficiente.AMOSTRADORES);
+    parar_apos: encerra quando o melhor Sharpe para de melhorar (n_portfolios vira o máximo).
+    contexto: ContextoCarteira dos mesmos retornos; reaproveita a covariância e o fator de Cholesky já calculados.
     """
     media_retorno = get_macro_adjusted_returns(retornos, score_dict)
-    cov = retornos.cov() * 252
-    num_ativos = len(media_retorno)
-    resultados = []
-
-    for _ in range(n_portfolios):
-        pesos = np.random.random(num_ativos)
-        pesos /= np.sum(pesos)
-        ret = np.dot(pesos, media_retorno)
-        vol = np.sqrt(np.dot(pesos.T, np.dot(cov, pesos)))
-        sharpe = (ret - taxa_risco_livre) / vol if vol > 0 else 0
-        resultados.append((vol, ret, sharpe, pesos.copy()))
-
-    df = pd.DataFrame(resultados, columns=['Volatilidade', 'Retorno', 'Sharpe', 'Pesos'])
-    return df
+    cov = retornos.cov() * 252 if contexto is None else contexto.cov
+    return simular_fronteira(
+        media_retorno, cov, n_portfolios, taxa_risco_livre, semente=semente,
+        amostrador=amostrador, concentracao=concentracao, parar_apos=parar_apos,
+        fator=None if contexto is None else contexto.cholesky,
+    )
+
+def calcular_fronteira_exata_macro(retornos, score_dict, n_pontos=100, taxa_risco_livre=0.0, contexto=None):
+    """
+    Fronteira eficiente exata (ver fronteira_exata) com os retornos ajustados pelo score macro
+    e os limites de peso de macro_bounds: uma curva de n_pontos carteiras, com seus pesos.
+    contexto: ContextoCarteira dos mesmos retornos, para reaproveitar a covariância.
+    """
+    media_retorno = get_macro_adjusted_returns(retornos, score_dict)
+    cov = retornos.cov() * 252 if contexto is None else contexto.cov
+    limites = macro_bounds(retornos.columns.tolist(), score_dict)
+    return tracar_fronteira(media_retorno, cov, limites, n_pontos, taxa_risco_livre)
 
-def otimizar_carteira_sharpe(tickers, carteira_atual, taxa_risco_livre=0.0001, favorecimentos=None):
+def otimizar_carteira_sharpe(tickers, carteira_atual, taxa_risco_livre=0.0001, favorecimentos=None, contexto=None):
     """
     Otimiza a carteira com base no índice de Sharpe, agora ajustando retornos, limites e pesos iniciais
     conforme o score macro/setorial de cada ativo.
+    contexto: ContextoCarteira dos tickers (padrão: o compartilhado do dia, ver obter_contexto).
     """
-    dados = obter_preco_diario_ajustado(tickers)
-    dados = dados.ffill().bfill()
+    if contexto is None:
+        contexto = obter_contexto(tickers)
 
     # Retornos logarítmicos
-    retornos = np.log(dados / dados.shift(1)).dropna()
+    retornos = contexto.retornos_log
     tickers_validos = retornos.columns.tolist()
     n = len(tickers_validos)
     if n == 0:
@@ -1045,23 +1204,17 @@ def otimizar_carteira_sharpe(tickers, carteira_atual, taxa_risco_livre=0.0001, f
     else:
         pesos_iniciais = np.ones(n) / n
 
-    # 5. Matriz de covariância robusta
-    cov_matrix = LedoitWolf().fit(retornos).covariance_
-    cov = pd.DataFrame(cov_matrix, index=retornos.columns, columns=retornos.columns)
-
-    def sharpe_neg(pesos):
-        ret = np.dot(pesos, media_retorno_ajustado) - taxa_risco_livre
-        vol = np.sqrt(pesos @ cov.values @ pesos.T)
-        return -ret / vol if vol > 0 else 0
-
-    restricoes = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
+    # 5. Matriz de covariância robusta (Ledoit-Wolf, calculada uma vez por contexto)
+    cov_matrix = contexto.cov_encolhida_log
 
+    # Gradiente analítico do Sharpe e jacobiano constante da soma dos pesos (sem diferenças finitas)
     resultado = minimize(
-        sharpe_neg,
+        sharpe_negativo(media_retorno_ajustado.to_numpy(), cov_matrix, taxa_risco_livre),
         pesos_iniciais,
+        jac=True,
         method='SLSQP',
         bounds=limites,
-        constraints=restricoes,
+        constraints=soma_um(n),
         options={'disp': False, 'maxiter': 1000}
     )
 
@@ -1074,14 +1227,15 @@ def otimizar_carteira_sharpe(tickers, carteira_atual, taxa_risco_livre=0.0001, f
         return completar_pesos(tickers, pesos_uniformes)
 
 
-def otimizar_carteira_retorno_maximo(tickers, carteira_atual, favorecimentos=None):
+def otimizar_carteira_retorno_maximo(tickers, carteira_atual, favorecimentos=None, contexto=None):
     """
     Otimiza a carteira para máximo retorno esperado com limitação máxima de 20% por ativo.
+    contexto: ContextoCarteira dos tickers (padrão: o compartilhado do dia, ver obter_contexto).
     """
-    dados = obter_preco_diario_ajustado(tickers)
-    dados = dados.ffill().bfill()
+    if contexto is None:
+        contexto = obter_contexto(tickers)
 
-    retornos = np.log(dados / dados.shift(1)).dropna()
+    retornos = contexto.retornos_log
     tickers_validos = retornos.columns.tolist()
     n = len(tickers_validos)
 
@@ -1103,19 +1257,15 @@ def otimizar_carteira_retorno_maximo(tickers, carteira_atual, favorecimentos=Non
     # Limite estrito de 20% por ativo
     limites = [(0.0, 0.20) for _ in range(n)]
 
+    # Função objetivo: maximize retorno esperado (minimize negativo do retorno), gradiente constante
     # Restrição: soma dos pesos = 1
-    restricoes = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
-
-    # Função objetivo: maximize retorno esperado (minimize negativo do retorno)
-    def neg_retorno(pesos):
-        return -np.dot(pesos, media_retorno)
-
     resultado = minimize(
-        neg_retorno,
-        pesos_iniciais,
+        retorno_negativo(media_retorno.to_numpy()),
+        np.asarray(pesos_iniciais, dtype=float),
+        jac=True,
         method='SLSQP',
         bounds=limites,
-        constraints=restricoes,
+        constraints=soma_um(n),
         options={'disp': False, 'maxiter': 1000}
     )
 
@@ -1128,60 +1278,24 @@ def otimizar_carteira_retorno_maximo(tickers, carteira_atual, favorecimentos=Non
         return completar_pesos(tickers, pesos_uniformes)
 
 
-def otimizar_carteira_hrp(tickers, carteira_atual, favorecimentos=None):
+def otimizar_carteira_hrp(tickers, carteira_atual, favorecimentos=None, contexto=None):
     """
     Otimiza a carteira com HRP, ajustando os pesos finais com base nos ativos válidos.
+    contexto: ContextoCarteira dos tickers (padrão: o compartilhado do dia, ver obter_contexto).
     """
-    dados = obter_preco_diario_ajustado(tickers)
-    dados = dados.dropna(axis=1, how='any')
-    tickers_validos = dados.columns.tolist()
+    if contexto is None:
+        contexto = obter_contexto(tickers)
+    # Só ativos sem lacunas de preço na janela
+    contexto = contexto.completo
+    tickers_validos = list(contexto.tickers)
 
     if len(tickers_validos) < 2:
         st.error("Número insuficiente de ativos com dados válidos para otimização.")
         return pd.Series(0.0, index=tickers)
 
-    retornos = dados.pct_change().dropna()
-    correlacao = retornos.corr()
-    dist = np.sqrt((1 - correlacao) / 2)
-
-    dist_condensada = squareform(dist.values, checks=False)
-    linkage_matrix = linkage(dist_condensada, method='single')
-
-    def get_quasi_diag(link):
-        link = link.astype(int)
-        sort_ix = pd.Series([link[-1, 0], link[-1, 1]])
-        num_items = link[-1, 3]
-        while sort_ix.max() >= num_items:
-            sort_ix.index = range(0, sort_ix.shape[0]*2, 2)
-            df0 = sort_ix[sort_ix >= num_items]
-            i = df0.index
-            j = df0.values - num_items
-            sort_ix[i] = link[j, 0]
-            df1 = pd.Series(link[j, 1], index=i + 1)
-            sort_ix = pd.concat([sort_ix, df1])
-            sort_ix = sort_ix.sort_index()
-        return sort_ix.tolist()
-
-    def get_recursive_bisection(cov, sort_ix):
-        w = pd.Series(1, index=sort_ix)
-        cluster_items = [sort_ix]
-
-        while len(cluster_items) > 0:
-            cluster_items = [i[j:k] for i in cluster_items for j, k in ((0, len(i) // 2), (len(i) // 2, len(i))) if len(i) > 1]
-            for cluster in cluster_items:
-                c_items = cluster
-                c_var = cov.loc[c_items, c_items].values
-                inv_diag = 1. / np.diag(c_var)
-                parity_w = inv_diag / inv_diag.sum()
-                alloc = parity_w.sum()
-                w[c_items] *= parity_w * alloc
-        return w / w.sum()
-
-    cov_matrix = LedoitWolf().fit(retornos).covariance_
-    cov_df = pd.DataFrame(cov_matrix, index=retornos.columns, columns=retornos.columns)
-    sort_ix = get_quasi_diag(linkage_matrix)
-    ordered_tickers = [retornos.columns[i] for i in sort_ix]
-    pesos_hrp = get_recursive_bisection(cov_df, ordered_tickers)
+    # Ordem quase diagonal direto da árvore de ligação e bissecção vetorizada (ver hrp_vetorizado)
+    hrp = calcular_hrp(contexto.correlacao, contexto.cov_encolhida)
+    pesos_hrp = pd.Series(hrp.pesos, index=contexto.retornos.columns[hrp.ordem])
 
         # --- NOVO: ajuste final pelo favorecimento ---
     if favorecimentos:
@@ -1191,201 +1305,54 @@ def otimizar_carteira_hrp(tickers, carteira_atual, favorecimentos=None):
 
     return completar_pesos(tickers, pesos_hrp)
 
-macro = obter_macro()
-
-historico_7anos = montar_historico_7anos(
-    tickers=list(setores_por_ticker.keys()),
-    setores_por_ticker=setores_por_ticker,
-    start='2015-01-01'
-)
+# ========= ESTADO CARREGADO SOB DEMANDA ==========
 
+# Nada é baixado ao importar este módulo: quem precisar do estado caro chama warm_up()
+_estado = {}
 
+def warm_up(macro=True, historico=False):
+    """
+    Carrega sob demanda as médias móveis de commodities (PARAMS), o snapshot macro e,
+    opcionalmente, o histórico de cenários. Chamadas seguintes no mesmo dia reutilizam o que já foi carregado.
+    Retorna dict com as chaves carregadas ('params', 'macro', 'historico').
+    """
+    hoje = provedor_dados.hoje()
+    if _estado.get("dia") != hoje:
+        _estado.clear()
+        _estado["dia"] = hoje
+    if "params" not in _estado:
+        _estado["params"] = atualizar_parametros_com_medias_moveis()
+    if macro and "macro" not in _estado:
+        _estado["macro"] = carregar_macro()
+    if historico and "historico" not in _estado:
+        # Forma compacta (mês x setor); montar_historico_7anos(..., historico=...) expande por ticker
+        _estado["historico"] = montar_historico_cenarios(start='2015-01-01')
+    return _estado
 
-import matplotlib.pyplot as plt
 
 def calcular_cagr(valor_final, valor_inicial, anos):
     return (valor_final / valor_inicial) ** (1 / anos) - 1
 
-def backtest_portfolio_vs_ibov_duplo(tickers, pesos, start_date='2015-01-01'):
-    df_adj = yf.download(tickers, start=start_date, auto_adjust=True, progress=False)['Close']
-    df_close = yf.download(tickers, start=start_date, auto_adjust=False, progress=False)['Close']
-
-    df_adj = df_adj.ffill().dropna()
-    df_close = df_close.ffill().dropna()
-
-    ibov_adj = yf.download('^BVSP', start=start_date, auto_adjust=True, progress=False)['Close']
-    ibov_close = yf.download('^BVSP', start=start_date, auto_adjust=False, progress=False)['Close']
-
-    ibov_adj = ibov_adj.ffill().dropna()
-    ibov_close = ibov_close.ffill().dropna()
-
-    idx = df_adj.index.intersection(df_close.index).intersection(ibov_adj.index).intersection(ibov_close.index)
-    df_adj, df_close = df_adj.loc[idx], df_close.loc[idx]
-    ibov_adj, ibov_close = ibov_adj.loc[idx], ibov_close.loc[idx]
-
-    df_adj_norm = df_adj / df_adj.iloc[0]
-    df_close_norm = df_close / df_close.iloc[0]
-    ibov_adj_norm = ibov_adj / ibov_adj.iloc[0]
-    ibov_close_norm = ibov_close / ibov_close.iloc[0]
-
-    pesos = np.array(pesos)
-    if len(pesos) != df_adj.shape[1]:
-        pesos = np.ones(df_adj.shape[1]) / df_adj.shape[1]
-
-    port_adj = (df_adj_norm * pesos).sum(axis=1)
-    port_close = (df_close_norm * pesos).sum(axis=1)
-
-    anos = (port_adj.index[-1] - port_adj.index[0]).days / 365.25
-    cagr_port_adj = calcular_cagr(float(port_adj.iloc[-1]), float(port_adj.iloc[0]), anos)
-    cagr_port_close = calcular_cagr(float(port_close.iloc[-1]), float(port_close.iloc[0]), anos)
-    cagr_ibov_adj = calcular_cagr(float(ibov_adj_norm.iloc[-1]), float(ibov_adj_norm.iloc[0]), anos)
-    cagr_ibov_close = calcular_cagr(float(ibov_close_norm.iloc[-1]), float(ibov_close_norm.iloc[0]), anos)
-
-    st.markdown(f"**CAGR Carteira Recomendada (Ajustado):** {100*float(cagr_port_adj):.2f}% ao ano")
-    st.markdown(f"**CAGR Carteira Recomendada (Close):** {100*float(cagr_port_close):.2f}% ao ano")
-    st.markdown(f"**CAGR IBOV (Ajustado):** {100*float(cagr_ibov_adj):.2f}% ao ano")
-    st.markdown(f"**CAGR IBOV (Close):** {100*float(cagr_ibov_close):.2f}% ao ano")
-
-    fig, ax = plt.subplots(figsize=(10, 6))
-    port_adj.plot(ax=ax, label='Carteira Recomendada (Ajustado)')
-    port_close.plot(ax=ax, label='Carteira Recomendada (Close)')
-    ibov_adj_norm.plot(ax=ax, label='IBOV (Ajustado)')
-    ibov_close_norm.plot(ax=ax, label='IBOV (Close)')
-    ax.set_title('Backtest: Carteira Recomendada vs IBOV (10 anos)')
-    ax.set_ylabel('Retorno acumulado')
-    ax.set_xlabel('Ano')
-    ax.legend()
-    st.pyplot(fig)
-
-
-# ========= STREAMLIT ==========
-# ========= STREAMLIT ==========
-
-
-st.title("📊 Sugestão e Otimização de Carteira: Cenário Projetado")
-
-st.markdown("---")
-
-# Sempre use o macro atualizado
-macro = obter_macro()
-
-with st.sidebar:
-    st.header("Ajuste Manual dos Indicadores Macro")
-    macro_manual = {}
-    for indicador in ["ipca", "selic", "pib", "dolar"]:
-        macro_manual[indicador] = st.number_input(
-            f"{indicador.upper()} (ajuste, opcional)", 
-            value=macro[indicador] if macro[indicador] else 0.0,
-            step=0.01
-        )
-    usar_macro_manual = st.checkbox("Usar ajustes manuais acima?")
-    if usar_macro_manual:
-        macro.update(macro_manual)
-
-cenario_atual = classificar_cenario_macro(
-    ipca=macro.get("ipca"),
-    selic=macro.get("selic"),
-    dolar=macro.get("dolar"),
-    pib=macro.get("pib"),
-    preco_soja=macro.get("soja"),
-    preco_milho=macro.get("milho"),
-    preco_minerio=macro.get("minerio"),
-    preco_petroleo=macro.get("petroleo")
-)
-
-score_macro = pontuar_macro(macro)
-score_medio = round(np.mean(list(score_macro.values())), 2)
-st.markdown(f"### 🧭 Cenário Macroeconômico Atual: **{cenario_atual}**")
-st.markdown("### 📉 Indicadores Macroeconômicos")
-col1, col2, col3, col4, col5 = st.columns(5)
-col1.metric("Selic (%)", f"{macro['selic']:.2f}" if macro.get("selic") is not None else "N/A")
-col2.metric("IPCA (%)", f"{macro['ipca']:.2f}" if macro.get("ipca") is not None else "N/A")
-col3.metric("PIB (%)", f"{macro['pib']:.2f}" if macro.get("pib") is not None else "N/A")
-col4.metric("Dólar (R$)", f"{macro['dolar']:.2f}" if macro.get("dolar") is not None else "N/A")
-col5.metric("Petróleo (US$)", f"{macro['petroleo']:.2f}" if macro.get("petroleo") else "N/A")
-
-# --- SIDEBAR ---
-with st.sidebar:
-    st.header("Parâmetros")
-    percentual_minimo = st.number_input(
-        "Percentual mínimo de alocação por ativo (%)",
-        min_value=0.00,
-        max_value=100.0,
-        value=0.01,
-        step=0.01,
-        help="Percentual mínimo exibido para cada ativo na carteira otimizada completa."
-    )
-    percentual_maximo = st.number_input(
-        "Percentual máximo de alocação por ativo (%)",
-        min_value=percentual_minimo,
-        max_value=100.0,
-        value=100.0,
-        step=0.01,
-        help="Percentual máximo exibido para cada ativo na carteira otimizada completa."
-    )
-    st.markdown("### Dados dos Ativos")
-    tickers_default = [
-        "AGRO3.SA", "BBAS3.SA", "BBSE3.SA", "BPAC11.SA", "EGIE3.SA",
-        "ITUB4.SA", "PRIO3.SA", "PSSA3.SA", "SAPR11.SA", "SBSP3.SA",
-        "VIVT3.SA", "WEGE3.SA", "TOTS3.SA", "B3SA3.SA", "TAEE11.SA"
-    ]
-    pesos_default = [
-        0.07, 0.06, 0.07, 0.07, 0.08,
-        0.07, 0.12, 0.09, 0.06, 0.04,
-        0.1, 0.18, 0.04, 0.01, 0.02
-    ]
-    if "num_ativos" not in st.session_state:
-        st.session_state.num_ativos = len(tickers_default)
-    col1, col2 = st.columns([1, 1])
-    with col1:
-        if st.button("( + )", key="add_ativo"):
-            st.session_state.num_ativos += 1
-    with col2:
-        if st.button("( - )", key="remove_ativo") and st.session_state.num_ativos > 1:
-            st.session_state.num_ativos -= 1
-    tickers = []
-    pesos = []
-    for i in range(st.session_state.num_ativos):
-        col1, col2 = st.columns(2)
-        with col1:
-            ticker_default = tickers_default[i] if i < len(tickers_default) else ""
-            ticker = st.text_input(f"Ticker do Ativo {i+1}", value=ticker_default, key=f"ticker_{i}").upper()
-        with col2:
-            peso_default = pesos_default[i] if i < len(pesos_default) else 1.0
-            peso = st.number_input(f"Peso do Ativo {i+1}", min_value=0.0, step=0.01, value=peso_default, key=f"peso_{i}")
-        if ticker:
-            tickers.append(ticker)
-            pesos.append(peso)
-    pesos_array = np.array(pesos)
-    if pesos_array.sum() > 0:
-        pesos_atuais = pesos_array / pesos_array.sum()
-    else:
-        st.error("A soma dos pesos deve ser maior que 0.")
-        st.stop()
-
-# ==================== GERAÇÃO DO RANKING E OTIMIZAÇÃO ====================
-
-st.subheader("🏆 Ranking Geral de Ações (com base no score)")
-carteira = dict(zip(tickers, pesos_atuais))
-ranking_df = gerar_ranking_acoes(carteira, macro, usar_pesos_macro=True)
-
-aporte = st.number_input("💰 Valor do aporte mensal (R$)", min_value=100.0, value=1000.0, step=100.0)
-
-# Novo: seleção do método de otimização
-
-ativos_validos = filtrar_ativos_validos(carteira, setores_por_ticker, setores_por_cenario, macro, calcular_score)
-favorecimentos = {a['ticker']: a['favorecido'] for a in ativos_validos}
-
-
-
+@st.cache_data(ttl=86400)
+def obter_precos_carteira_e_benchmark(tickers, start_date='2015-01-01', benchmark='^BVSP'):
+    """
+    Uma única consulta (via armazenamento local) para carteira e benchmark.
+    Retorna (ajustado, close) com os tickers e o benchmark como colunas.
+    """
+    tickers = list(dict.fromkeys(list(tickers) + [benchmark]))
+    close, fator = carregar_close_e_fator(tickers, inicio=start_date)
+    return close * fator, close
 
+def _alinhar_carteira_e_benchmark(precos, tickers, benchmark='^BVSP'):
+    tickers = [t for t in dict.fromkeys(tickers) if t in precos.columns and t != benchmark]
+    carteira = precos[tickers].dropna(how='all').ffill().dropna()
+    bench = precos[benchmark].dropna().ffill()
+    return carteira, bench
 
 # Função para calcular métricas da carteira (CAGR, risco, Sharpe)
 def calcular_metricas_carteira(tickers, pesos, start_date='2015-01-01', rf=0):
-    import yfinance as yf
-    df_adj = yf.download(tickers, start=start_date, auto_adjust=True, progress=False)['Close']
-    df_adj = df_adj.ffill().dropna()
-    df_adj = df_adj.loc[:, ~df_adj.columns.duplicated()]  # Remove duplicadas
+    precos_adj, _ = obter_precos_carteira_e_benchmark(tuple(tickers), start_date)
+    df_adj, _ = _alinhar_carteira_e_benchmark(precos_adj, tickers)
     df_pct = df_adj.pct_change().dropna()
     port_retorno = (df_pct * pesos).sum(axis=1)
     port_valor = (1 + port_retorno).cumprod()
@@ -1397,11 +1364,8 @@ def calcular_metricas_carteira(tickers, pesos, start_date='2015-01-01', rf=0):
 
 # Função para backtest plug and play (ajuste para seu fluxo)
 def backtest_portfolio_vs_ibov_duplo(tickers, pesos, start_date='2015-01-01'):
-    import yfinance as yf
-    df_adj = yf.download(tickers, start=start_date, auto_adjust=True, progress=False)['Close']
-    ibov_adj = yf.download('^BVSP', start=start_date, auto_adjust=True, progress=False)['Close']
-    df_adj = df_adj.ffill().dropna()
-    ibov_adj = ibov_adj.ffill().dropna()
+    precos_adj, _ = obter_precos_carteira_e_benchmark(tuple(tickers), start_date)
+    df_adj, ibov_adj = _alinhar_carteira_e_benchmark(precos_adj, tickers)
     idx = df_adj.index.intersection(ibov_adj.index)
     df_adj, ibov_adj = df_adj.loc[idx], ibov_adj.loc[idx]
     df_adj_norm = df_adj / df_adj.iloc[0]
@@ -1415,6 +1379,7 @@ def backtest_portfolio_vs_ibov_duplo(tickers, pesos, start_date='2015-01-01'):
     cagr_ibov_adj = (float(ibov_adj_norm.iloc[-1]) / float(ibov_adj_norm.iloc[0])) ** (1 / anos) - 1
     st.markdown(f"**CAGR Carteira Recomendada:** {100*float(cagr_port_adj):.2f}% ao ano")
     st.markdown(f"**CAGR IBOV:** {100*float(cagr_ibov_adj):.2f}% ao ano")
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(figsize=(10, 6))
     port_adj.plot(ax=ax, label='Carteira Recomendada')
     ibov_adj_norm.plot(ax=ax, label='IBOV')
@@ -1424,317 +1389,511 @@ def backtest_portfolio_vs_ibov_duplo(tickers, pesos, start_date='2015-01-01'):
     ax.legend()
     st.pyplot(fig)
 
-# --- Lista dos métodos de alocação ---
-metodos_aporte = [
-    "Sharpe (macro)",
-    "Sharpe (Monte Carlo)",
-    "HRP",
-    "Monte Carlo (Melhor Simulada)",
-    "HRP + Monte Carlo"
-]
-metodo_escolha = st.selectbox(
-    "Qual carteira usar para recomendação de aporte?",
-    metodos_aporte,
-    key="metodo_aporte"
-)
-
-# Slider para o alpha HRP+MonteCarlo somente se selecionado
-if st.session_state.get("metodo_aporte") == "HRP + Monte Carlo":
-    alpha = st.slider(
-        "Ajuste a combinação: 0 = só Monte Carlo • 1 = só HRP",
-        min_value=0.0, max_value=1.0, value=0.5, step=0.05,
-        help="Ajuste o quanto a alocação final deve ser influenciada pelo HRP ou pelo Monte Carlo"
+
+# ========= STREAMLIT ==========
+
+def main():
+    st.set_page_config(page_title="Sugestão de Carteira", layout="wide")
+    warm_up(macro=True)
+
+    st.title("📊 Sugestão e Otimização de Carteira: Cenário Projetado")
+
+    st.markdown("---")
+
+    # Sempre use o macro atualizado
+    macro = obter_macro()
+
+    with st.sidebar:
+        st.header("Ajuste Manual dos Indicadores Macro")
+        macro_manual = {}
+        for indicador in ["ipca", "selic", "pib", "dolar"]:
+            macro_manual[indicador] = st.number_input(
+                f"{indicador.upper()} (ajuste, opcional)", 
+                value=macro[indicador] if macro[indicador] else 0.0,
+                step=0.01
+            )
+        usar_macro_manual = st.checkbox("Usar ajustes manuais acima?")
+        if usar_macro_manual:
+            macro = macro.substituir(**macro_manual)
+
+    cenario_atual = classificar_cenario_macro(
+        ipca=macro.get("ipca"),
+        selic=macro.get("selic"),
+        dolar=macro.get("dolar"),
+        pib=macro.get("pib"),
+        preco_soja=macro.get("soja"),
+        preco_milho=macro.get("milho"),
+        preco_minerio=macro.get("minerio"),
+        preco_petroleo=macro.get("petroleo")
     )
-else:
-    alpha = 0.5  # valor padrão
 
-if st.button("Gerar Alocação Otimizada"):
-    try:
-        # --- Coletar ativos válidos e retornos ---
-        ativos_validos = filtrar_ativos_validos(
-            carteira, setores_por_ticker, setores_por_cenario, macro, calcular_score
+    score_macro = pontuar_macro(macro)
+    score_medio = round(np.mean(list(score_macro.values())), 2)
+    st.markdown(f"### 🧭 Cenário Macroeconômico Atual: **{cenario_atual}**")
+    st.markdown("### 📉 Indicadores Macroeconômicos")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Selic (%)", f"{macro['selic']:.2f}" if macro.get("selic") is not None else "N/A")
+    col2.metric("IPCA (%)", f"{macro['ipca']:.2f}" if macro.get("ipca") is not None else "N/A")
+    col3.metric("PIB (%)", f"{macro['pib']:.2f}" if macro.get("pib") is not None else "N/A")
+    col4.metric("Dólar (R$)", f"{macro['dolar']:.2f}" if macro.get("dolar") is not None else "N/A")
+    col5.metric("Petróleo (US$)", f"{macro['petroleo']:.2f}" if macro.get("petroleo") else "N/A")
+    falhas = carregar_macro().falhas
+    if falhas:
+        st.warning(
+            f"Indicadores indisponíveis no momento ({', '.join(d.fonte for d in falhas)}): "
+            f"o score macro pode estar distorcido; nova tentativa em até {TTL_MACRO_INCOMPLETO // 60} minutos."
         )
-        if not ativos_validos:
-            st.warning("Nenhum ativo com preço atual abaixo do preço-alvo dos analistas.")
-            st.session_state['pesos_opcoes'] = None
-            st.session_state['ativos_validos_aporte'] = None
-            st.session_state['aporte_valor'] = None
-            st.stop()
-        
-        favorecimentos = {a['ticker']: a['favorecido'] for a in ativos_validos}
-        tickers_validos = [a['ticker'] for a in ativos_validos]
-        retornos = obter_preco_diario_ajustado(tickers_validos).pct_change().dropna()
-        media_retorno = retornos.mean() * 252
-        cov = retornos.cov() * 252
-
-        # --- Simulação Monte Carlo (Fronteira Eficiente) ---
-        df_front = calcular_fronteira_eficiente_macro(
-            retornos=retornos,
-            score_dict=favorecimentos,
-            n_portfolios=100000
+    with st.expander("⏱️ Latência das fontes macro"):
+        st.dataframe(pd.DataFrame(carregar_macro().fontes), use_container_width=True)
+    with st.expander("🗺️ Mapa de regimes (what-if)"):
+        fixos = {k: macro.get(k) for k in ("pib", "soja", "milho", "minerio", "petroleo")}
+        grade = calcular_grade_what_if(fixos, dict(PARAMS))
+        niveis_dolar = [float(v) for v in grade.eixos["dolar"]]
+        dolar_atual = macro.get("dolar") or niveis_dolar[len(niveis_dolar) // 2]
+        col_mapa, col_dolar = st.columns(2)
+        escolha = col_mapa.selectbox("Mapa", ["Cenário"] + list(grade.setores))
+        nivel_dolar = col_dolar.select_slider(
+            "Dólar (R$)", options=niveis_dolar,
+            value=min(niveis_dolar, key=lambda v: abs(v - dolar_atual))
         )
-        melhor_carteira = df_front.loc[df_front['Sharpe'].idxmax()]
-
-        # --- Otimização Sharpe padrão ---
-        pesos_sharpe = otimizar_carteira_sharpe(
-            tickers_validos, carteira, favorecimentos=favorecimentos
+        if escolha == "Cenário":
+            st.dataframe(tabela(grade, "cenario", "selic", "ipca", dolar=nivel_dolar), use_container_width=True)
+        else:
+            mapa = tabela(grade, escolha, "selic", "ipca", dolar=nivel_dolar)
+            st.dataframe(
+                mapa.style.background_gradient(cmap="RdYlGn", vmin=-2, vmax=2).format("{:.2f}"),
+                use_container_width=True
+            )
+        st.caption("Linhas: Selic (%) | Colunas: IPCA (%) | Demais indicadores fixos no valor atual.")
+    with st.expander("🎲 Probabilidade dos cenários nos próximos 12 meses"):
+        metodo_simulacao = st.radio(
+            "Dinâmica", ["bootstrap", "var"], horizontal=True,
+            help="bootstrap: blocos de variações mensais observadas | var: VAR(1) com resíduos reamostrados"
         )
-
-        # --- Otimização Sharpe usando seed Monte Carlo ---
-        from scipy.optimize import minimize
-        def sharpe_neg(pesos):
-            retorno = np.dot(pesos, media_retorno)
-            risco = np.sqrt(np.dot(pesos.T, np.dot(cov, pesos)))
-            return - (retorno / risco) if risco > 0 else 0
-        limites = tuple((0, 1) for _ in range(len(tickers_validos)))
-        restricoes = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
-        pesos_seed_mc = np.array(melhor_carteira['Pesos'])
-        res_mc = minimize(
-            sharpe_neg,
-            pesos_seed_mc,
-            method='SLSQP',
-            bounds=limites,
-            constraints=restricoes,
-            options={'disp': False, 'maxiter': 1000}
+        if st.button("Simular trajetórias macro"):
+            macro_atual = {k: macro.get(k) for k in pv.INDICADORES}
+            with st.spinner("Simulando trajetórias..."):
+                try:
+                    simulacao = simular_cenarios_12m(dict(PARAMS), macro_atual, metodo_simulacao)
+                except ValueError as e:
+                    st.warning(f"{e}. Simulando com bootstrap.")
+                    simulacao = simular_cenarios_12m(dict(PARAMS), macro_atual, "bootstrap")
+            st.area_chart(simulacao.probabilidades)
+            st.markdown("**Favorecimento setorial no mês 12 (distribuição)**")
+            st.dataframe(quantis_favor(simulacao).round(2), use_container_width=True)
+
+    # --- SIDEBAR ---
+    with st.sidebar:
+        st.header("Parâmetros")
+        percentual_minimo = st.number_input(
+            "Percentual mínimo de alocação por ativo (%)",
+            min_value=0.00,
+            max_value=100.0,
+            value=0.01,
+            step=0.01,
+            help="Percentual mínimo exibido para cada ativo na carteira otimizada completa."
         )
-        if res_mc.success:
-            pesos_sharpe_mc = res_mc.x
-        else:
-            pesos_sharpe_mc = pesos_sharpe.to_numpy()
-
-        # --- HRP ---
-        pesos_hrp = otimizar_carteira_hrp(
-            tickers_validos, carteira, favorecimentos=favorecimentos
+        percentual_maximo = st.number_input(
+            "Percentual máximo de alocação por ativo (%)",
+            min_value=percentual_minimo,
+            max_value=100.0,
+            value=100.0,
+            step=0.01,
+            help="Percentual máximo exibido para cada ativo na carteira otimizada completa."
         )
+        st.markdown("### Dados dos Ativos")
+        tickers_default = [
+            "AGRO3.SA", "BBAS3.SA", "BBSE3.SA", "BPAC11.SA", "EGIE3.SA",
+            "ITUB4.SA", "PRIO3.SA", "PSSA3.SA", "SAPR11.SA", "SBSP3.SA",
+            "VIVT3.SA", "WEGE3.SA", "TOTS3.SA", "B3SA3.SA", "TAEE11.SA"
+        ]
+        pesos_default = [
+            0.07, 0.06, 0.07, 0.07, 0.08,
+            0.07, 0.12, 0.09, 0.06, 0.04,
+            0.1, 0.18, 0.04, 0.01, 0.02
+        ]
+        if "num_ativos" not in st.session_state:
+            st.session_state.num_ativos = len(tickers_default)
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            if st.button("( + )", key="add_ativo"):
+                st.session_state.num_ativos += 1
+        with col2:
+            if st.button("( - )", key="remove_ativo") and st.session_state.num_ativos > 1:
+                st.session_state.num_ativos -= 1
+        tickers = []
+        pesos = []
+        for i in range(st.session_state.num_ativos):
+            col1, col2 = st.columns(2)
+            with col1:
+                ticker_default = tickers_default[i] if i < len(tickers_default) else ""
+                ticker = st.text_input(f"Ticker do Ativo {i+1}", value=ticker_default, key=f"ticker_{i}").upper()
+            with col2:
+                peso_default = pesos_default[i] if i < len(pesos_default) else 1.0
+                peso = st.number_input(f"Peso do Ativo {i+1}", min_value=0.0, step=0.01, value=peso_default, key=f"peso_{i}")
+            if ticker:
+                tickers.append(ticker)
+                pesos.append(peso)
+        pesos_array = np.array(pesos)
+        if pesos_array.sum() > 0:
+            pesos_atuais = pesos_array / pesos_array.sum()
+        else:
+            st.error("A soma dos pesos deve ser maior que 0.")
+            st.stop()
 
-        # --- Monte Carlo puro (Fronteira) ---
-        pesos_mc = pd.Series(melhor_carteira['Pesos'], index=retornos.columns)
-        pesos_hrp_series = pesos_hrp if isinstance(pesos_hrp, pd.Series) else pd.Series(pesos_hrp, index=retornos.columns)
-
-        # --- HRP + Monte Carlo combinado ---
-        pesos_combinados = alpha * pesos_hrp_series + (1 - alpha) * pesos_mc
-        pesos_combinados /= pesos_combinados.sum()
-
-        # --- Dicionário de opções ---
-        pesos_opcoes = {
-            "Sharpe (macro)": pesos_sharpe,
-            "Sharpe (Monte Carlo)": pd.Series(pesos_sharpe_mc, index=retornos.columns),
-            "HRP": pesos_hrp_series,
-            "Monte Carlo (Melhor Simulada)": pesos_mc,
-            "HRP + Monte Carlo": pesos_combinados
-        }
-        st.session_state['pesos_opcoes'] = pesos_opcoes
-        st.session_state['ativos_validos_aporte'] = ativos_validos
-        st.session_state['aporte_valor'] = aporte
-        st.session_state['pesos_mc'] = pesos_mc
-        st.session_state['melhor_carteira'] = melhor_carteira
-    except Exception as e:
-        st.error(f"Erro na otimização: {str(e)}")
-        st.session_state['pesos_opcoes'] = None
-        st.session_state['ativos_validos_aporte'] = None
-        st.session_state['aporte_valor'] = None
-
-# --- Exibir tabela de aportes sempre que houver resultado salvo ---
-if (
-    st.session_state.get('pesos_opcoes')
-    and st.session_state.get('ativos_validos_aporte')
-    and st.session_state.get('aporte_valor')
-):
-    pesos_recomendados = st.session_state['pesos_opcoes'][st.session_state['metodo_aporte']]
-    ativos_validos = st.session_state['ativos_validos_aporte']
-    aporte = st.session_state['aporte_valor']
-
-    df_validos = pd.DataFrame(ativos_validos)
-    df_resultado = df_validos[['ticker', 'setor', 'preco_atual', 'preco_alvo', 'score']].copy()
-    df_resultado["peso_otimizado"] = df_resultado["ticker"].map(pesos_recomendados).fillna(0)
-    df_resultado["Valor Alocado Bruto (R$)"] = df_resultado["peso_otimizado"] * aporte
-    df_resultado["Qtd. Ações"] = (df_resultado["Valor Alocado Bruto (R$)"] / df_resultado["preco_atual"])\
-        .replace([np.inf, -np.inf], 0).fillna(0).apply(np.floor)
-    df_resultado["Valor Alocado (R$)"] = (df_resultado["Qtd. Ações"] * df_resultado["preco_atual"]).round(2)
-    df_resultado = df_resultado[df_resultado["Qtd. Ações"] > 0]
-
-    st.subheader("📈 Ativos Recomendados para Novo Aporte")
-    st.dataframe(df_resultado[[
-        "ticker", "setor", "preco_atual", "preco_alvo", "score", "Qtd. Ações",
-        "Valor Alocado (R$)"
-    ]], use_container_width=True)
-    valor_utilizado = df_resultado["Valor Alocado (R$)"].sum()
-    troco = aporte - valor_utilizado
-
-    # --- Métricas da carteira após aporte ---
-    tickers_aporte = df_resultado["ticker"].tolist()
-    pesos_aporte = df_resultado["peso_otimizado"].values
-    if len(tickers_aporte) >= 2:
-        cagr, risco, sharpe = calcular_metricas_carteira(tickers_aporte, pesos_aporte)
-        st.markdown(f"💰 **Valor utilizado no aporte:** R$ {valor_utilizado:,.2f}")
-        st.markdown(f"🔁 **Troco (não alocado):** R$ {troco:,.2f}")
-        st.markdown(f"**CAGR estimado (10 anos):** {100*cagr:.2f}% ao ano")
-        st.markdown(f"**Risco anualizado:** {100*risco:.2f}%")
-        st.markdown(f"**Índice de Sharpe:** {sharpe:.2f}")
-    else:
-        st.markdown(f"💰 **Valor utilizado no aporte:** R$ {valor_utilizado:,.2f}")
-        st.markdown(f"🔁 **Troco (não alocado):** R$ {troco:,.2f}")
-        st.info("Métricas da carteira precisam de pelo menos 2 ativos.")
+    # ==================== GERAÇÃO DO RANKING E OTIMIZAÇÃO ====================
 
-    st.subheader("📦 Carteira Inicial e Ajustada Após o Aporte")
+    st.subheader("🏆 Ranking Geral de Ações (com base no score)")
+    carteira = dict(zip(tickers, pesos_atuais))
+    ranking_df = gerar_ranking_acoes(carteira, macro, usar_pesos_macro=True)
 
-    # Valor fictício para simular o valor da carteira inicial
-    valor_inicial_simulado = 100_000  # Pode ser input do usuário se desejar
+    aporte = st.number_input("💰 Valor do aporte mensal (R$)", min_value=100.0, value=1000.0, step=100.0)
 
-    # Calcula a quantidade inicial de cada ativo baseada no peso inicial e preço atual
-    quantidade_inicial = [
-        int(round(peso * valor_inicial_simulado / df_validos.loc[df_validos['ticker'] == ticker, 'preco_atual'].values[0]))
-        for peso, ticker in zip(pesos_atuais, tickers)
-    ]
+    # Novo: seleção do método de otimização
 
-    # Quantidade comprada no aporte (já calculada na tabela de aporte, se não existir para um ticker, é zero)
-    quantidades_aporte = {
-        ticker: int(df_resultado[df_resultado["ticker"] == ticker]["Qtd. Ações"].values[0])
-        if ticker in df_resultado["ticker"].values else 0
-        for ticker in tickers
-    }
+    ativos_validos = filtrar_ativos_validos(carteira, setores_por_ticker, setores_por_cenario, macro, calcular_score)
+    favorecimentos = {a['ticker']: a['favorecido'] for a in ativos_validos}
 
-    # Preenche carteira_integral com dados dos ativos
-    carteira_integral = {}
-    for i, ticker in enumerate(tickers):
-        row = df_validos[df_validos['ticker'] == ticker].iloc[0] if ticker in df_validos['ticker'].values else {}
-        q_inicial = quantidade_inicial[i] if i < len(quantidade_inicial) else 0
-        q_aporte = quantidades_aporte.get(ticker, 0)
-        quantidade_final = q_inicial + q_aporte
-        preco_atual = row["preco_atual"] if "preco_atual" in row else 0
-        carteira_integral[ticker] = {
-            "quantidade_inicial": q_inicial,
-            "quantidade_comprada": q_aporte,
-            "quantidade_final": quantidade_final,
-            "preco_atual": preco_atual,
-            "preco_alvo": row["preco_alvo"] if "preco_alvo" in row else 0,
-            "setor": row["setor"] if "setor" in row else "",
-            "score": row["score"] if "score" in row else 0,
-        }
 
-    # Valor total inicial e final
-    valor_total_inicial = sum(
-        v["quantidade_inicial"] * v["preco_atual"] for v in carteira_integral.values()
-    )
-    valor_total_final = sum(
-        v["quantidade_final"] * v["preco_atual"] for v in carteira_integral.values()
-    )
 
-    # Monta tabela de exibição
-    dados_integral = []
-    for i, t in enumerate(tickers):
-        v = carteira_integral.get(t, {})
-        preco_atual = v.get("preco_atual", 0)
-        peso_inicial = (v.get("quantidade_inicial", 0) * preco_atual) / valor_total_inicial if valor_total_inicial > 0 else 0
-        peso_recomendado = pesos_recomendados.get(t, 0)
-        peso_final = (v.get("quantidade_final", 0) * preco_atual) / valor_total_final if valor_total_final > 0 else 0
-        dados = {
-            "ticker": t,
-            "setor": v.get("setor", ""),
-            "quantidade_inicial": v.get("quantidade_inicial", 0),
-            "quantidade_comprada": v.get("quantidade_comprada", 0),
-            "quantidade_final": v.get("quantidade_final", 0),
-            "preco_atual": preco_atual,
-            "preco_alvo": v.get("preco_alvo", 0),
-            "score": v.get("score", 0),
-            "peso_inicial (%)": round(peso_inicial * 100, 2),
-            "peso_recomendado (%)": round(peso_recomendado * 100, 2),
-            "peso_final (%)": round(peso_final * 100, 2),
-        }
-        dados_integral.append(dados)
 
-    df_carteira_integral = pd.DataFrame(dados_integral)
 
-    colunas = [
-        "ticker", "setor", "quantidade_comprada", "preco_atual", "preco_alvo", "peso_inicial (%)", "peso_final (%)"
+    # --- Lista dos métodos de alocação ---
+    metodos_aporte = [
+        "Sharpe (macro)",
+        "Sharpe (Monte Carlo)",
+        "HRP",
+        "Monte Carlo (Melhor Simulada)",
+        "HRP + Monte Carlo",
+        "Fronteira exata (Sharpe máximo)"
     ]
-
-    st.dataframe(
-        df_carteira_integral[colunas].sort_values(by="peso_final (%)", ascending=False),
-        use_container_width=True
+    metodo_escolha = st.selectbox(
+        "Qual carteira usar para recomendação de aporte?",
+        metodos_aporte,
+        key="metodo_aporte"
     )
 
-    # --- Indicadores da carteira ajustada (após o aporte) ---
-    def prob_retornos_12m(retornos, pesos):
-        from scipy.stats import norm
-        port_ret_diario = (retornos * pesos).sum(axis=1)
-        media_anual = port_ret_diario.mean() * 252
-        std_anual = port_ret_diario.std() * np.sqrt(252)
-        p_positivo = 1 - norm.cdf(0, loc=media_anual, scale=std_anual)
-        p_negativo = norm.cdf(0, loc=media_anual, scale=std_anual)
-        p_neutro = norm.cdf(0.02, loc=media_anual, scale=std_anual) - norm.cdf(-0.02, loc=media_anual, scale=std_anual)
-        return p_positivo, p_negativo, p_neutro, media_anual, std_anual
-
-    tickers_validos = df_carteira_integral["ticker"].tolist()
-    pesos_finais = df_carteira_integral["peso_final (%)"].values / 100  # volta para fração
-    if sum(pesos_finais) > 0 and len(tickers_validos) >= 2:
-        pesos_finais_norm = pesos_finais / sum(pesos_finais)
-        retornos = obter_preco_diario_ajustado(tickers_validos).pct_change().dropna()
-        cagr, risco, sharpe = calcular_metricas_carteira(tickers_validos, pesos_finais_norm)
-        p_pos, p_neg, p_neu, media_anual, std_anual = prob_retornos_12m(retornos, pesos_finais_norm)
-
-        st.markdown("### 📊 Indicadores da Carteira Ajustada Após o Aporte")
-        st.markdown(f"**CAGR estimado (10 anos):** {100*cagr:.2f}% ao ano")
-        st.markdown(f"**Risco anualizado:** {100*risco:.2f}%")
-        st.markdown(f"**Índice de Sharpe:** {sharpe:.2f}")
-        st.markdown("---")
-        st.markdown(f"📊 **Probabilidade de Retorno Próximos 12 meses:**")
-        st.markdown(f"- Probabilidade de retorno **positivo**: `{100*p_pos:.1f}%`")
-        st.markdown(f"- Probabilidade de retorno **negativo**: `{100*p_neg:.1f}%`")
-        st.markdown(f"- Probabilidade de retorno **neutro** (-2% a +2%): `{100*p_neu:.1f}%`")
-        st.markdown(f"- Média esperada anual: `{100*media_anual:.2f}%` &nbsp;&nbsp; Desvio padrão anual: `{100*std_anual:.2f}%`")
+    # Slider para o alpha HRP+MonteCarlo somente se selecionado
+    if st.session_state.get("metodo_aporte") == "HRP + Monte Carlo":
+        alpha = st.slider(
+            "Ajuste a combinação: 0 = só Monte Carlo • 1 = só HRP",
+            min_value=0.0, max_value=1.0, value=0.5, step=0.05,
+            help="Ajuste o quanto a alocação final deve ser influenciada pelo HRP ou pelo Monte Carlo"
+        )
     else:
-        st.info("Métricas da carteira precisam de pelo menos 2 ativos com peso não-nulo.")
+        alpha = 0.5  # valor padrão
+
+    if st.button("Gerar Alocação Otimizada"):
+        try:
+            # --- Coletar ativos válidos e retornos ---
+            ativos_validos = filtrar_ativos_validos(
+                carteira, setores_por_ticker, setores_por_cenario, macro, calcular_score
+            )
+            if not ativos_validos:
+                st.warning("Nenhum ativo com preço atual abaixo do preço-alvo dos analistas.")
+                st.session_state['pesos_opcoes'] = None
+                st.session_state['ativos_validos_aporte'] = None
+                st.session_state['aporte_valor'] = None
+                st.stop()
+
+            favorecimentos = {a['ticker']: a['favorecido'] for a in ativos_validos}
+            tickers_validos = [a['ticker'] for a in ativos_validos]
+            # Preços, retornos e covariâncias carregados/calculados uma vez para todo o clique
+            contexto = obter_contexto(tickers_validos)
+            retornos = contexto.retornos
+            media_retorno = contexto.media
+            cov = contexto.cov
+
+            # --- Simulação Monte Carlo (Fronteira Eficiente) ---
+            fronteira = calcular_fronteira_eficiente_macro(
+                retornos=retornos,
+                score_dict=favorecimentos,
+                n_portfolios=100000,
+                # Mistura com carteiras concentradas: melhor Sharpe com menos sorteios que o uniforme normalizado
+                amostrador="cantos",
+                parar_apos=30000,
+                contexto=contexto
+            )
+            melhor_carteira = fronteira.melhor
+
+            # --- Otimização Sharpe padrão ---
+            pesos_sharpe = otimizar_carteira_sharpe(
+                tickers_validos, carteira, favorecimentos=favorecimentos, contexto=contexto
+            )
+
+            # --- Otimização Sharpe usando seed Monte Carlo ---
+            limites = tuple((0, 1) for _ in range(len(tickers_validos)))
+            pesos_seed_mc = np.array(melhor_carteira['Pesos'])
+            res_mc = minimize(
+                sharpe_negativo(media_retorno.to_numpy(), cov.to_numpy()),
+                pesos_seed_mc,
+                jac=True,
+                method='SLSQP',
+                bounds=limites,
+                constraints=soma_um(len(tickers_validos)),
+                options={'disp': False, 'maxiter': 1000}
+            )
+            if res_mc.success:
+                pesos_sharpe_mc = res_mc.x
+            else:
+                pesos_sharpe_mc = pesos_sharpe.to_numpy()
+
+            # --- HRP ---
+            pesos_hrp = otimizar_carteira_hrp(
+                tickers_validos, carteira, favorecimentos=favorecimentos, contexto=contexto
+            )
+
+            # --- Monte Carlo puro (Fronteira) ---
+            pesos_mc = pd.Series(melhor_carteira['Pesos'], index=retornos.columns)
+            pesos_hrp_series = pesos_hrp if isinstance(pesos_hrp, pd.Series) else pd.Series(pesos_hrp, index=retornos.columns)
+
+            # --- HRP + Monte Carlo combinado ---
+            pesos_combinados = alpha * pesos_hrp_series + (1 - alpha) * pesos_mc
+            pesos_combinados /= pesos_combinados.sum()
+
+            # --- Fronteira exata (limites de macro_bounds) ---
+            try:
+                fronteira_exata = calcular_fronteira_exata_macro(retornos, favorecimentos, contexto=contexto)
+                pesos_fronteira = melhor_sharpe(fronteira_exata)['Pesos']
+            except ValueError as e:
+                st.warning(f"Fronteira exata indisponível ({e}). Usando Sharpe (macro).")
+                fronteira_exata = None
+                pesos_fronteira = pesos_sharpe
+
+            # --- Dicionário de opções ---
+            pesos_opcoes = {
+                "Sharpe (macro)": pesos_sharpe,
+                "Sharpe (Monte Carlo)": pd.Series(pesos_sharpe_mc, index=retornos.columns),
+                "HRP": pesos_hrp_series,
+                "Monte Carlo (Melhor Simulada)": pesos_mc,
+                "HRP + Monte Carlo": pesos_combinados,
+                "Fronteira exata (Sharpe máximo)": pesos_fronteira
+            }
+            st.session_state['pesos_opcoes'] = pesos_opcoes
+            st.session_state['ativos_validos_aporte'] = ativos_validos
+            st.session_state['aporte_valor'] = aporte
+            st.session_state['pesos_mc'] = pesos_mc
+            st.session_state['melhor_carteira'] = melhor_carteira
+            st.session_state['fronteira_exata'] = fronteira_exata
+        except Exception as e:
+            st.error(f"Erro na otimização: {str(e)}")
+            st.session_state['pesos_opcoes'] = None
+            st.session_state['ativos_validos_aporte'] = None
+            st.session_state['aporte_valor'] = None
+
+    # --- Exibir tabela de aportes sempre que houver resultado salvo ---
+    if (
+        st.session_state.get('pesos_opcoes')
+        and st.session_state.get('ativos_validos_aporte')
+        and st.session_state.get('aporte_valor')
+    ):
+        pesos_recomendados = st.session_state['pesos_opcoes'][st.session_state['metodo_aporte']]
+        ativos_validos = st.session_state['ativos_validos_aporte']
+        aporte = st.session_state['aporte_valor']
+
+        df_validos = pd.DataFrame(ativos_validos)
+        df_resultado = df_validos[['ticker', 'setor', 'preco_atual', 'preco_alvo', 'score']].copy()
+        df_resultado["peso_otimizado"] = df_resultado["ticker"].map(pesos_recomendados).fillna(0)
+        df_resultado["Valor Alocado Bruto (R$)"] = df_resultado["peso_otimizado"] * aporte
+        df_resultado["Qtd. Ações"] = (df_resultado["Valor Alocado Bruto (R$)"] / df_resultado["preco_atual"])\
+            .replace([np.inf, -np.inf], 0).fillna(0).apply(np.floor)
+        df_resultado["Valor Alocado (R$)"] = (df_resultado["Qtd. Ações"] * df_resultado["preco_atual"]).round(2)
+        df_resultado = df_resultado[df_resultado["Qtd. Ações"] > 0]
+
+        st.subheader("📈 Ativos Recomendados para Novo Aporte")
+        st.dataframe(df_resultado[[
+            "ticker", "setor", "preco_atual", "preco_alvo", "score", "Qtd. Ações",
+            "Valor Alocado (R$)"
+        ]], use_container_width=True)
+        if st.session_state.get('fronteira_exata') is not None:
+            with st.expander("📐 Fronteira eficiente exata (retornos e limites ajustados pelo score macro)"):
+                pontos = st.session_state['fronteira_exata'].pontos
+                st.line_chart(pontos.set_index('Volatilidade')['Retorno'])
+                melhor = pontos.loc[pontos['Sharpe'].idxmax()]
+                st.caption(
+                    f"Sharpe máximo na curva: {melhor['Sharpe']:.2f} "
+                    f"(retorno {100*melhor['Retorno']:.2f}%, volatilidade {100*melhor['Volatilidade']:.2f}%)"
+                )
+        valor_utilizado = df_resultado["Valor Alocado (R$)"].sum()
+        troco = aporte - valor_utilizado
+
+        # --- Métricas da carteira após aporte ---
+        tickers_aporte = df_resultado["ticker"].tolist()
+        pesos_aporte = df_resultado["peso_otimizado"].values
+        if len(tickers_aporte) >= 2:
+            cagr, risco, sharpe = calcular_metricas_carteira(tickers_aporte, pesos_aporte)
+            st.markdown(f"💰 **Valor utilizado no aporte:** R$ {valor_utilizado:,.2f}")
+            st.markdown(f"🔁 **Troco (não alocado):** R$ {troco:,.2f}")
+            st.markdown(f"**CAGR estimado (10 anos):** {100*cagr:.2f}% ao ano")
+            st.markdown(f"**Risco anualizado:** {100*risco:.2f}%")
+            st.markdown(f"**Índice de Sharpe:** {sharpe:.2f}")
+        else:
+            st.markdown(f"💰 **Valor utilizado no aporte:** R$ {valor_utilizado:,.2f}")
+            st.markdown(f"🔁 **Troco (não alocado):** R$ {troco:,.2f}")
+            st.info("Métricas da carteira precisam de pelo menos 2 ativos.")
+
+        st.subheader("📦 Carteira Inicial e Ajustada Após o Aporte")
+
+        # Valor fictício para simular o valor da carteira inicial
+        valor_inicial_simulado = 100_000  # Pode ser input do usuário se desejar
+
+        # Calcula a quantidade inicial de cada ativo baseada no peso inicial e preço atual
+        quantidade_inicial = [
+            int(round(peso * valor_inicial_simulado / df_validos.loc[df_validos['ticker'] == ticker, 'preco_atual'].values[0]))
+            for peso, ticker in zip(pesos_atuais, tickers)
+        ]
+
+        # Quantidade comprada no aporte (já calculada na tabela de aporte, se não existir para um ticker, é zero)
+        quantidades_aporte = {
+            ticker: int(df_resultado[df_resultado["ticker"] == ticker]["Qtd. Ações"].values[0])
+            if ticker in df_resultado["ticker"].values else 0
+            for ticker in tickers
+        }
 
-    # --- Carteira Otimizada Completa: mostrando TODOS os ativos indicados pelo usuário ---
-    st.subheader("🧮 Carteira Otimizada Ideal")
+        # Preenche carteira_integral com dados dos ativos
+        carteira_integral = {}
+        for i, ticker in enumerate(tickers):
+            row = df_validos[df_validos['ticker'] == ticker].iloc[0] if ticker in df_validos['ticker'].values else {}
+            q_inicial = quantidade_inicial[i] if i < len(quantidade_inicial) else 0
+            q_aporte = quantidades_aporte.get(ticker, 0)
+            quantidade_final = q_inicial + q_aporte
+            preco_atual = row["preco_atual"] if "preco_atual" in row else 0
+            carteira_integral[ticker] = {
+                "quantidade_inicial": q_inicial,
+                "quantidade_comprada": q_aporte,
+                "quantidade_final": quantidade_final,
+                "preco_atual": preco_atual,
+                "preco_alvo": row["preco_alvo"] if "preco_alvo" in row else 0,
+                "setor": row["setor"] if "setor" in row else "",
+                "score": row["score"] if "score" in row else 0,
+            }
+
+        # Valor total inicial e final
+        valor_total_inicial = sum(
+            v["quantidade_inicial"] * v["preco_atual"] for v in carteira_integral.values()
+        )
+        valor_total_final = sum(
+            v["quantidade_final"] * v["preco_atual"] for v in carteira_integral.values()
+        )
 
-    # Pegue os pesos recomendados do método escolhido
-    pesos_otimizados = st.session_state['pesos_opcoes'][st.session_state['metodo_aporte']]
-    if hasattr(pesos_otimizados, 'to_dict'):
-        pesos_otimizados = pesos_otimizados.to_dict()
+        # Monta tabela de exibição
+        dados_integral = []
+        for i, t in enumerate(tickers):
+            v = carteira_integral.get(t, {})
+            preco_atual = v.get("preco_atual", 0)
+            peso_inicial = (v.get("quantidade_inicial", 0) * preco_atual) / valor_total_inicial if valor_total_inicial > 0 else 0
+            peso_recomendado = pesos_recomendados.get(t, 0)
+            peso_final = (v.get("quantidade_final", 0) * preco_atual) / valor_total_final if valor_total_final > 0 else 0
+            dados = {
+                "ticker": t,
+                "setor": v.get("setor", ""),
+                "quantidade_inicial": v.get("quantidade_inicial", 0),
+                "quantidade_comprada": v.get("quantidade_comprada", 0),
+                "quantidade_final": v.get("quantidade_final", 0),
+                "preco_atual": preco_atual,
+                "preco_alvo": v.get("preco_alvo", 0),
+                "score": v.get("score", 0),
+                "peso_inicial (%)": round(peso_inicial * 100, 2),
+                "peso_recomendado (%)": round(peso_recomendado * 100, 2),
+                "peso_final (%)": round(peso_final * 100, 2),
+            }
+            dados_integral.append(dados)
+
+        df_carteira_integral = pd.DataFrame(dados_integral)
+
+        colunas = [
+            "ticker", "setor", "quantidade_comprada", "preco_atual", "preco_alvo", "peso_inicial (%)", "peso_final (%)"
+        ]
+
+        st.dataframe(
+            df_carteira_integral[colunas].sort_values(by="peso_final (%)", ascending=False),
+            use_container_width=True
+        )
 
-    # Lista dos ativos definidos pelo usuário (na ordem do input)
-    tickers_usuario = tickers
+        # --- Indicadores da carteira ajustada (após o aporte) ---
+        def prob_retornos_12m(retornos, pesos):
+            from scipy.stats import norm
+            port_ret_diario = (retornos * pesos).sum(axis=1)
+            media_anual = port_ret_diario.mean() * 252
+            std_anual = port_ret_diario.std() * np.sqrt(252)
+            p_positivo = 1 - norm.cdf(0, loc=media_anual, scale=std_anual)
+            p_negativo = norm.cdf(0, loc=media_anual, scale=std_anual)
+            p_neutro = norm.cdf(0.02, loc=media_anual, scale=std_anual) - norm.cdf(-0.02, loc=media_anual, scale=std_anual)
+            return p_positivo, p_negativo, p_neutro, media_anual, std_anual
+
+        tickers_validos = df_carteira_integral["ticker"].tolist()
+        pesos_finais = df_carteira_integral["peso_final (%)"].values / 100  # volta para fração
+        if sum(pesos_finais) > 0 and len(tickers_validos) >= 2:
+            pesos_finais_norm = pesos_finais / sum(pesos_finais)
+            retornos = obter_contexto(tickers_validos).retornos
+            cagr, risco, sharpe = calcular_metricas_carteira(tickers_validos, pesos_finais_norm)
+            p_pos, p_neg, p_neu, media_anual, std_anual = prob_retornos_12m(retornos, pesos_finais_norm)
+
+            st.markdown("### 📊 Indicadores da Carteira Ajustada Após o Aporte")
+            st.markdown(f"**CAGR estimado (10 anos):** {100*cagr:.2f}% ao ano")
+            st.markdown(f"**Risco anualizado:** {100*risco:.2f}%")
+            st.markdown(f"**Índice de Sharpe:** {sharpe:.2f}")
+            st.markdown("---")
+            st.markdown(f"📊 **Probabilidade de Retorno Próximos 12 meses:**")
+            st.markdown(f"- Probabilidade de retorno **positivo**: `{100*p_pos:.1f}%`")
+            st.markdown(f"- Probabilidade de retorno **negativo**: `{100*p_neg:.1f}%`")
+            st.markdown(f"- Probabilidade de retorno **neutro** (-2% a +2%): `{100*p_neu:.1f}%`")
+            st.markdown(f"- Média esperada anual: `{100*media_anual:.2f}%` &nbsp;&nbsp; Desvio padrão anual: `{100*std_anual:.2f}%`")
+        else:
+            st.info("Métricas da carteira precisam de pelo menos 2 ativos com peso não-nulo.")
+
+        # --- Carteira Otimizada Completa: mostrando TODOS os ativos indicados pelo usuário ---
+        st.subheader("🧮 Carteira Otimizada Ideal")
+
+        # Pegue os pesos recomendados do método escolhido
+        pesos_otimizados = st.session_state['pesos_opcoes'][st.session_state['metodo_aporte']]
+        if hasattr(pesos_otimizados, 'to_dict'):
+            pesos_otimizados = pesos_otimizados.to_dict()
+
+        # Lista dos ativos definidos pelo usuário (na ordem do input)
+        tickers_usuario = tickers
+
+        # Aplica limites mínimo e máximo definidos pelo usuário
+        percentuais = [
+            min(max(100 * pesos_otimizados.get(t, 0), percentual_minimo), percentual_maximo)
+            for t in tickers_usuario
+        ]
+
+        df_carteira_ideal = pd.DataFrame({
+            "ticker": tickers_usuario,
+            "% Alocado": percentuais
+        }).sort_values("% Alocado", ascending=False)
+
+        st.dataframe(df_carteira_ideal, use_container_width=True)
+
+        # --- Indicadores da carteira otimizada (usando todos os ativos do usuário, pesos REAIS) ---
+        if sum([pesos_otimizados.get(t, 0) for t in tickers_usuario]) > 0 and len(tickers_usuario) >= 2:
+            pesos_otimizados_lista = [pesos_otimizados.get(t, 0) for t in tickers_usuario]
+            cagr, risco, sharpe = calcular_metricas_carteira(tickers_usuario, pesos_otimizados_lista)
+            retornos = obter_contexto(tickers_usuario).retornos
+            p_pos, p_neg, p_neu, media_anual, std_anual = prob_retornos_12m(retornos, pesos_otimizados_lista)
+
+            st.markdown("### 📊 Indicadores da Carteira Otimizada")
+            st.markdown(f"**CAGR estimado (10 anos):** {100*cagr:.2f}% ao ano")
+            st.markdown(f"**Risco anualizado:** {100*risco:.2f}%")
+            st.markdown(f"**Índice de Sharpe:** {sharpe:.2f}")
+            st.markdown("---")
+            st.markdown(f"📊 **Probabilidade de Retorno Próximos 12 meses:**")
+            st.markdown(f"- Probabilidade de retorno **positivo**: `{100*p_pos:.1f}%`")
+            st.markdown(f"- Probabilidade de retorno **negativo**: `{100*p_neg:.1f}%`")
+            st.markdown(f"- Probabilidade de retorno **neutro** (-2% a +2%): `{100*p_neu:.1f}%`")
+            st.markdown(f"- Média esperada anual: `{100*media_anual:.2f}%` &nbsp;&nbsp; Desvio padrão anual: `{100*std_anual:.2f}%`")
+        else:
+            st.info("Métricas da carteira precisam de pelo menos 2 ativos com peso não-nulo.")
 
-    # Aplica limites mínimo e máximo definidos pelo usuário
-    percentuais = [
-        min(max(100 * pesos_otimizados.get(t, 0), percentual_minimo), percentual_maximo)
-        for t in tickers_usuario
-    ]
 
-    df_carteira_ideal = pd.DataFrame({
-        "ticker": tickers_usuario,
-        "% Alocado": percentuais
-    }).sort_values("% Alocado", ascending=False)
-
-    st.dataframe(df_carteira_ideal, use_container_width=True)
-
-    # --- Indicadores da carteira otimizada (usando todos os ativos do usuário, pesos REAIS) ---
-    if sum([pesos_otimizados.get(t, 0) for t in tickers_usuario]) > 0 and len(tickers_usuario) >= 2:
-        pesos_otimizados_lista = [pesos_otimizados.get(t, 0) for t in tickers_usuario]
-        cagr, risco, sharpe = calcular_metricas_carteira(tickers_usuario, pesos_otimizados_lista)
-        retornos = obter_preco_diario_ajustado(tickers_usuario).pct_change().dropna()
-        p_pos, p_neg, p_neu, media_anual, std_anual = prob_retornos_12m(retornos, pesos_otimizados_lista)
-
-        st.markdown("### 📊 Indicadores da Carteira Otimizada")
-        st.markdown(f"**CAGR estimado (10 anos):** {100*cagr:.2f}% ao ano")
-        st.markdown(f"**Risco anualizado:** {100*risco:.2f}%")
-        st.markdown(f"**Índice de Sharpe:** {sharpe:.2f}")
-        st.markdown("---")
-        st.markdown(f"📊 **Probabilidade de Retorno Próximos 12 meses:**")
-        st.markdown(f"- Probabilidade de retorno **positivo**: `{100*p_pos:.1f}%`")
-        st.markdown(f"- Probabilidade de retorno **negativo**: `{100*p_neg:.1f}%`")
-        st.markdown(f"- Probabilidade de retorno **neutro** (-2% a +2%): `{100*p_neu:.1f}%`")
-        st.markdown(f"- Média esperada anual: `{100*media_anual:.2f}%` &nbsp;&nbsp; Desvio padrão anual: `{100*std_anual:.2f}%`")
-    else:
-        st.info("Métricas da carteira precisam de pelo menos 2 ativos com peso não-nulo.")
- 
+        # --- Backtest plug and play ---
+        if len(df_resultado) >= 2:
+            st.subheader("📊 Backtest: Carteira Recomendada vs IBOV (10 anos)")
+            tickers_bt = df_resultado["ticker"].tolist()
+            pesos_bt = df_resultado["peso_otimizado"].values
+            backtest_portfolio_vs_ibov_duplo(tickers_bt, pesos_bt)
 
-    # --- Backtest plug and play ---
-    if len(df_resultado) >= 2:
-        st.subheader("📊 Backtest: Carteira Recomendada vs IBOV (10 anos)")
-        tickers_bt = df_resultado["ticker"].tolist()
-        pesos_bt = df_resultado["peso_otimizado"].values
-        backtest_portfolio_vs_ibov_duplo(tickers_bt, pesos_bt)
 
+if __name__ == "__main__":
+    main()
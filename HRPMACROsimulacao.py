@@ -10,6 +10,10 @@ from sklearn.covariance import LedoitWolf
 from scipy.cluster.hierarchy import linkage, dendrogram
 from scipy.spatial.distance import squareform
 from scipy.optimize import minimize
+from armazenamento_historico import atualizar_historico, impressao_digital
+from historico_cenarios import HistoricoCenarios, expandir_para_tickers
+from pontuacao_vetorizada import CENARIOS
+from fronteira_eficiente import simular_fronteira
 
 st.set_page_config(page_title="Sugestão de Carteira", layout="wide")
 
@@ -33,12 +37,15 @@ def obter_preco_petroleo_hist(start, end):
         return df['Close']
     return pd.Series(dtype=float)
 
-def montar_historico_7anos(tickers, setores_por_ticker, start='2018-01-01'):
-    """Gera histórico dos últimos 7 anos (em memória, sem salvar em CSV)."""
+def montar_macro_mensal(start='2018-01-01', anterior=None):
+    """
+    Indicadores macro mensais (fim de mês) desde start. anterior: meses já montados antes de start;
+    as novas linhas são preenchidas para frente a partir do último deles.
+    """
     hoje = datetime.date.today()
     inicio = pd.to_datetime(start)
     final = hoje
-    datas = pd.date_range(inicio, final, freq='M').normalize()
+    datas = pd.date_range(inicio, final, freq='ME').normalize()
     
     # Baixar séries macro históricas do BCB
     selic_hist = get_bcb_hist(432, inicio.strftime('%d/%m/%Y'), final.strftime('%d/%m/%Y'))
@@ -57,10 +64,15 @@ def montar_historico_7anos(tickers, setores_por_ticker, start='2018-01-01'):
     macro_df['ipca'] = ipca_hist.reindex(datas, method='ffill')
     macro_df['dolar'] = dolar_hist.reindex(datas, method='ffill')
     macro_df['petroleo'] = petroleo_hist.reindex(datas, method='ffill')
-    macro_df = macro_df.fillna(method='ffill').fillna(method='bfill')
-
-    historico = []
-    for data in datas:
+    if anterior is not None:
+        macro_df = pd.concat([anterior[macro_df.columns].iloc[-1:], macro_df]).ffill().iloc[1:]
+    return macro_df.ffill().bfill()
+
+def pontuar_historico(macro_df):
+    """Cenário e favorecimento por setor de cada mês de macro_df (histórico compacto)."""
+    cenarios = []
+    favor = []
+    for data in macro_df.index:
         macro = {
             "ipca": macro_df.loc[data, "ipca"],
             "selic": macro_df.loc[data, "selic"],
@@ -71,7 +83,7 @@ def montar_historico_7anos(tickers, setores_por_ticker, start='2018-01-01'):
             "milho": None,
             "minerio": None
         }
-        cenario = classificar_cenario_macro(
+        cenarios.append(classificar_cenario_macro(
             ipca=macro["ipca"],
             selic=macro["selic"],
             dolar=macro["dolar"],
@@ -80,20 +92,26 @@ def montar_historico_7anos(tickers, setores_por_ticker, start='2018-01-01'):
             preco_milho=macro["milho"],
             preco_minerio=macro["minerio"],
             preco_petroleo=macro["petroleo"]
-        )
+        ))
         score_macro = pontuar_macro(macro)
-        for ticker in tickers:
-            setor = setores_por_ticker.get(ticker, None)
-            favorecido = calcular_favorecimento_continuo(setor, score_macro)
-            historico.append({
-                "data": str(data.date()),
-                "cenario": cenario,
-                "ticker": ticker,
-                "setor": setor,
-                "favorecido": favorecido
-            })
-    df_hist = pd.DataFrame(historico)
-    return df_hist
+        favor.append([calcular_favorecimento_continuo(setor, score_macro) for setor in sensibilidade_setorial])
+    cenario = pd.Series(pd.Categorical(cenarios, categories=CENARIOS), index=macro_df.index, name="cenario")
+    favor = pd.DataFrame(favor, index=macro_df.index, columns=list(sensibilidade_setorial), dtype="float64")
+    return HistoricoCenarios(macro_df, cenario, favor)
+
+def montar_historico_7anos(tickers, setores_por_ticker, start='2018-01-01'):
+    """
+    Gera histórico dos últimos 7 anos, uma linha por mês x ticker.
+    O histórico por mês fica salvo em disco e só os meses em aberto são recalculados a cada chamada.
+    """
+    historico = atualizar_historico(
+        "simulacao", start,
+        montar_macro=montar_macro_mensal,
+        pontuar=pontuar_historico,
+        impressao=impressao_digital(sorted(PARAMS.items()), sensibilidade_setorial),
+        hoje=datetime.date.today(),
+    )
+    return expandir_para_tickers(historico, tickers, setores_por_ticker)
 
 # ========= DICIONÁRIOS ==========
 
@@ -975,25 +993,21 @@ def obter_preco_diario_ajustado(tickers):
         else:
             raise ValueError("Coluna 'Adj Close' ou 'Close' não encontrada nos dados.")
             
-def calcular_fronteira_eficiente_macro(retornos, score_dict, n_portfolios=100, taxa_risco_livre=0.0):
+def calcular_fronteira_eficiente_macro(retornos, score_dict, n_portfolios=100, taxa_risco_livre=0.0, semente=None,
+                                       amostrador="uniforme", concentracao=1.0, parar_apos=None):
     """
     Gera portfolios aleatórios usando retornos ajustados pelo score macro.
+    Sorteio em lotes vetorizados (ver fronteira_eficiente): retorna FronteiraMonteCarlo com a melhor
+    carteira (inclusive seus Pesos), as de maior Sharpe, a fronteira de Pareto e uma amostra de pontos para o gráfico.
+    amostrador/concentracao: forma do sorteio dos pesos (fronteira_eficiente.AMOSTRADORES);
+    parar_apos: encerra quando o melhor Sharpe para de melhorar (n_portfolios vira o máximo).
     """
     media_retorno = get_macro_adjusted_returns(retornos, score_dict)
     cov = retornos.cov() * 252
-    num_ativos = len(media_retorno)
-    resultados = []
-
-    for _ in range(n_portfolios):
-        pesos = np.random.random(num_ativos)
-        pesos /= np.sum(pesos)
-        ret = np.dot(pesos, media_retorno)
-        vol = np.sqrt(np.dot(pesos.T, np.dot(cov, pesos)))
-        sharpe = (ret - taxa_risco_livre) / vol if vol > 0 else 0
-        resultados.append((vol, ret, sharpe, pesos.copy()))
-
-    df = pd.DataFrame(resultados, columns=['Volatilidade', 'Retorno', 'Sharpe', 'Pesos'])
-    return df
+    return simular_fronteira(
+        media_retorno, cov, n_portfolios, taxa_risco_livre, semente=semente,
+        amostrador=amostrador, concentracao=concentracao, parar_apos=parar_apos,
+    )
 
 def otimizar_carteira_sharpe(tickers, carteira_atual, taxa_risco_livre=0.0001, favorecimentos=None):
     """
@@ -1387,11 +1401,12 @@ if st.button("Gerar Alocação Otimizada"):
 
         # ====== SIMULAÇÃO MONTE CARLO ======
         st.subheader("Simulação: Fronteira Eficiente (Monte Carlo) + Recomendações")
-        df_front = calcular_fronteira_eficiente_macro(
+        fronteira = calcular_fronteira_eficiente_macro(
             retornos=retornos,
             score_dict=favorecimentos,
             n_portfolios=50000
         )
+        df_front = fronteira.pontos
 
         import matplotlib.pyplot as plt
         fig, ax = plt.subplots(figsize=(10, 6))
@@ -1400,6 +1415,7 @@ if st.button("Gerar Alocação Otimizada"):
         ax.set_ylabel('Retorno Esperado')
         ax.set_title('Fronteira Eficiente (Monte Carlo) - Carteiras Aleatórias com Score Macro')
         plt.colorbar(scatter, label='Sharpe')
+        ax.plot(fronteira.pareto['Volatilidade'], fronteira.pareto['Retorno'], c='black', lw=1, label='Fronteira (não dominadas)')
 
         # Dados auxiliares
         media_retorno = retornos.mean() * 252
@@ -1416,7 +1432,7 @@ if st.button("Gerar Alocação Otimizada"):
         ax.scatter(vol_hrp, ret_hrp, c='blue', s=100, marker='^', label='HRP')
 
         # Melhor simulação Monte Carlo
-        melhor_carteira = df_front.loc[df_front['Sharpe'].idxmax()]
+        melhor_carteira = fronteira.melhor
         sharpe_mc = melhor_carteira['Sharpe']
         ret_mc = melhor_carteira['Retorno']
         vol_mc = melhor_carteira['Volatilidade']
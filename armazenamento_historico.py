@@ -0,0 +1,130 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+import provedor_dados
+import pontuacao_vetorizada as pv
+from armazenamento_precos import DIRETORIO_CACHE
+from historico_cenarios import HistoricoCenarios
+
+DIRETORIO_HISTORICO = os.path.join(DIRETORIO_CACHE, "historico_cenarios")
+# O IPCA de um mês só é divulgado no mês seguinte: um mês só é considerado fechado (e entra na
+# marca d'água) quando o mês seguinte também terminou. Os meses em aberto são recalculados a cada atualização.
+MESES_EM_ABERTO = 2
+
+_locks = {}
+_lock_global = threading.Lock()
+
+
+def _lock_historico(nome):
+    with _lock_global:
+        return _locks.setdefault(nome, threading.Lock())
+
+
+def _caminhos(nome):
+    base = os.path.join(DIRETORIO_HISTORICO, nome)
+    return f"{base}.parquet", f"{base}.json"
+
+
+def marca_dagua(hoje=None, meses_em_aberto=MESES_EM_ABERTO):
+    """Último fim de mês considerado fechado na data de referência."""
+    mes = pd.Timestamp(hoje or provedor_dados.hoje()).to_period("M")
+    return (mes - meses_em_aberto).to_timestamp(how="end").normalize()
+
+
+def impressao_digital(*partes):
+    """Hash (hex) do que determina a pontuação (parâmetros, sensibilidades...); mudou, a pontuação é refeita."""
+    conteudo = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=repr)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+def _ler(nome):
+    arquivo, arquivo_meta = _caminhos(nome)
+    if not (os.path.exists(arquivo) and os.path.exists(arquivo_meta)):
+        return None, {}
+    try:
+        with open(arquivo_meta) as f:
+            meta = json.load(f)
+        tabela = pd.read_parquet(arquivo)
+    except Exception as e:
+        print(f"Histórico de cenários '{nome}' corrompido, será recalculado: {e}")
+        return None, {}
+    cenario = pd.Series(
+        pd.Categorical.from_codes(tabela["cenario"]["codigo"].to_numpy(), categories=pv.CENARIOS),
+        index=tabela.index, name="cenario",
+    )
+    return HistoricoCenarios(tabela["macro"], cenario, tabela["favor"]), meta
+
+
+def _salvar(nome, historico, meta):
+    os.makedirs(DIRETORIO_HISTORICO, exist_ok=True)
+    arquivo, arquivo_meta = _caminhos(nome)
+    codigos = pd.DataFrame({"codigo": historico.cenario.cat.codes.astype("int8")}, index=historico.cenario.index)
+    tabela = pd.concat({"macro": historico.macro, "cenario": codigos, "favor": historico.favor}, axis=1)
+    temporario = f"{arquivo}.{os.getpid()}.tmp"
+    tabela.to_parquet(temporario)
+    os.replace(temporario, arquivo)
+    with open(f"{arquivo_meta}.{os.getpid()}.tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(f"{arquivo_meta}.{os.getpid()}.tmp", arquivo_meta)
+
+
+def _ate(historico, data):
+    return HistoricoCenarios(historico.macro.loc[:data], historico.cenario.loc[:data], historico.favor.loc[:data])
+
+
+def _concatenar(anterior, novo):
+    return HistoricoCenarios(
+        pd.concat([anterior.macro, novo.macro]),
+        pd.Series(
+            pd.Categorical.from_codes(
+                np.concatenate([anterior.cenario.cat.codes, novo.cenario.cat.codes]), categories=pv.CENARIOS
+            ),
+            index=anterior.cenario.index.append(novo.cenario.index), name="cenario",
+        ),
+        pd.concat([anterior.favor, novo.favor]),
+    )
+
+
+def atualizar_historico(nome, start, montar_macro, pontuar, impressao, hoje=None):
+    """
+    Histórico compacto de cenários persistido em disco com marca d'água (último mês fechado).
+    Cada atualização monta e pontua só os meses depois da marca d'água (os meses em aberto);
+    o custo não cresce com o tamanho do histórico.
+    montar_macro(inicio, anterior): DataFrame mensal (fim de mês) de inicio até hoje; anterior são os meses
+        já salvos (None na carga inicial), usados só para o preenchimento para frente das novas linhas.
+    pontuar(macro_df): HistoricoCenarios dos meses de macro_df (ex.: calcular_historico com PARAMS).
+    impressao: impressao_digital de parâmetros e sensibilidades; se mudou, os meses salvos são
+        repontuados a partir dos indicadores salvos, sem nova consulta.
+    Mudança de start (ou arquivo ausente/corrompido) refaz o histórico inteiro.
+    """
+    hoje = pd.Timestamp(hoje or provedor_dados.hoje()).normalize()
+    inicio = pd.Timestamp(start).normalize()
+    fechado_ate = marca_dagua(hoje)
+    with _lock_historico(nome):
+        salvo, meta = _ler(nome)
+        if salvo is None or meta.get("inicio") != str(inicio):
+            historico = pontuar(montar_macro(inicio, None))
+        else:
+            # No modo reproduzir a data de referência pode ser anterior à marca d'água salva
+            ultima = min(pd.Timestamp(meta["marca_dagua"]), fechado_ate)
+            base = _ate(salvo, ultima)
+            if meta.get("impressao") != impressao:
+                base = pontuar(base.macro)
+            novos = montar_macro(max(ultima + pd.Timedelta(days=1), inicio), base.macro if len(base.macro) else None)
+            historico = _concatenar(base, pontuar(novos)) if len(novos) else base
+
+        fechados = historico.macro.index[historico.macro.index <= fechado_ate]
+        meta = {
+            "inicio": str(inicio),
+            "marca_dagua": str(fechados.max() if len(fechados) else inicio - pd.Timedelta(days=1)),
+            "impressao": impressao,
+            "atualizado_em": str(hoje),
+        }
+        try:
+            _salvar(nome, historico, meta)
+        except Exception as e:
+            print(f"Falha ao salvar o histórico de cenários '{nome}': {e}")
+    return historico
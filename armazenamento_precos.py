@@ -0,0 +1,197 @@
+import os
+import datetime
+import threading
+import pandas as pd
+import provedor_dados
+
+# Diretório raiz dos dados persistidos localmente (preços, séries macro, etc.)
+DIRETORIO_CACHE = os.environ.get(
+    "HRPMACRO_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_cache")
+)
+DIRETORIO_PRECOS = os.path.join(DIRETORIO_CACHE, "precos")
+
+COLUNAS_PRECO = ["Close", "Adj Close"]
+PERIODO_INICIAL = "10y"
+# Primeira carga de um ticker: cobre os 10 anos das otimizações e o início dos backtests
+INICIO_HISTORICO = "2015-01-01"
+# Atualizações baixam de novo as últimas barras salvas: o histórico antigo só é reescalado (provento,
+# desdobramento) quando a razão novo/salvo é a mesma em todas elas
+BARRAS_SOBREPOSTAS = 5
+TOLERANCIA_RAZAO = 1e-5
+
+_lock = threading.Lock()
+
+
+def _caminho_ticker(ticker):
+    nome = "".join(c if c.isalnum() or c in ".-" else "_" for c in ticker)
+    return os.path.join(DIRETORIO_PRECOS, f"{nome}.parquet")
+
+
+def ler_precos_locais(ticker):
+    """Lê o histórico salvo de um ticker (Close e Adj Close). Retorna DataFrame vazio se não existir."""
+    caminho = _caminho_ticker(ticker)
+    if not os.path.exists(caminho):
+        return pd.DataFrame(columns=COLUNAS_PRECO, dtype=float)
+    try:
+        return pd.read_parquet(caminho)
+    except Exception as e:
+        print(f"Arquivo de preços corrompido para {ticker}, será baixado novamente: {e}")
+        return pd.DataFrame(columns=COLUNAS_PRECO, dtype=float)
+
+
+def _salvar_precos(ticker, df):
+    os.makedirs(DIRETORIO_PRECOS, exist_ok=True)
+    caminho = _caminho_ticker(ticker)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    df.to_parquet(temporario)
+    os.replace(temporario, caminho)
+
+
+def _atualizado_hoje(ticker):
+    caminho = _caminho_ticker(ticker)
+    if not os.path.exists(caminho):
+        return False
+    modificado = datetime.date.fromtimestamp(os.path.getmtime(caminho))
+    return modificado >= provedor_dados.hoje()
+
+
+def _separar_por_ticker(dados, tickers):
+    """Converte o retorno do yf.download em {ticker: DataFrame[Close, Adj Close]}."""
+    resultado = {}
+    if dados is None or dados.empty:
+        return resultado
+    for ticker in tickers:
+        if isinstance(dados.columns, pd.MultiIndex):
+            if ticker not in dados.columns.get_level_values(1):
+                continue
+            df = dados.xs(ticker, axis=1, level=1)
+        else:
+            df = dados
+        colunas = [c for c in COLUNAS_PRECO if c in df.columns]
+        if not colunas:
+            continue
+        df = df[colunas].astype("float64").dropna(how="all")
+        if "Adj Close" not in df.columns:
+            df["Adj Close"] = df["Close"]
+        df.index = pd.to_datetime(df.index).tz_localize(None).normalize()
+        df.index.name = "Date"
+        resultado[ticker] = df[COLUNAS_PRECO]
+    return resultado
+
+
+def _baixar(tickers, inicio=None):
+    """
+    Barras diárias fechadas dos tickers desde inicio (padrão: INICIO_HISTORICO).
+    A barra de hoje fica de fora: durante o pregão ela ainda muda e, salva, só seria refeita no dia seguinte.
+    """
+    dados = provedor_dados.download(tickers, start=inicio or INICIO_HISTORICO, auto_adjust=False, progress=False)
+    hoje = pd.Timestamp(provedor_dados.hoje())
+    fechadas = {t: df.loc[df.index < hoje] for t, df in _separar_por_ticker(dados, tickers).items()}
+    return {t: df for t, df in fechadas.items() if not df.empty}
+
+
+def _mesclar(existente, novo):
+    """
+    Junta as barras novas ao histórico salvo. As barras sobrepostas (as últimas salvas, baixadas de novo)
+    são usadas para reescalar o histórico antigo quando ele mudou desde a última carga: o Adj Close após
+    novo provento e também o Close, que no yfinance é ajustado por desdobramentos/grupamentos.
+    Só há reescala quando a razão novo/salvo é a mesma em pelo menos duas barras sobrepostas; uma barra
+    isolada diferente (correção de dado) é apenas substituída.
+    """
+    if existente.empty:
+        return novo
+    sobreposicao = existente.index.intersection(novo.index)
+    for coluna in COLUNAS_PRECO:
+        antigo, atual = existente.loc[sobreposicao, coluna], novo.loc[sobreposicao, coluna]
+        razoes = (atual / antigo)[antigo.ne(0) & antigo.notna() & atual.notna()]
+        if len(razoes) < 2:
+            continue
+        razao = razoes.median()
+        consistente = (razoes / razao - 1).abs().max() <= TOLERANCIA_RAZAO
+        if consistente and abs(razao - 1) > TOLERANCIA_RAZAO:
+            existente = existente.copy()
+            existente[coluna] *= razao
+    df = pd.concat([existente, novo])
+    return df[~df.index.duplicated(keep="last")].sort_index()
+
+
+def atualizar_precos(tickers):
+    """
+    Garante que o armazenamento local tenha o histórico de todos os tickers.
+    Tickers novos baixam o histórico desde INICIO_HISTORICO; os demais baixam a partir das últimas
+    BARRAS_SOBREPOSTAS barras salvas. Cada ticker é verificado no máximo uma vez por dia.
+    """
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    with _lock:
+        pendentes = [t for t in dict.fromkeys(tickers) if not _atualizado_hoje(t)]
+        if not pendentes:
+            return
+
+        existentes = {t: ler_precos_locais(t) for t in pendentes}
+        novos = [t for t in pendentes if existentes[t].empty]
+        # Agrupa os tickers pela data de início da sobreposição: uma requisição por grupo
+        por_inicio = {}
+        for t in pendentes:
+            if not existentes[t].empty:
+                inicio = existentes[t].index[-BARRAS_SOBREPOSTAS:].min().strftime("%Y-%m-%d")
+                por_inicio.setdefault(inicio, []).append(t)
+
+        lotes = [(novos, None)] if novos else []
+        lotes += [(grupo, inicio) for inicio, grupo in por_inicio.items()]
+        for grupo, inicio in lotes:
+            try:
+                baixados = _baixar(grupo, inicio)
+            except Exception as e:
+                print(f"Falha ao atualizar preços de {grupo}: {e}")
+                continue
+            for t in grupo:
+                if t in baixados:
+                    _salvar_precos(t, _mesclar(existentes[t], baixados[t]))
+                elif not existentes[t].empty:
+                    # Nada novo (fim de semana/feriado): marca como verificado hoje
+                    os.utime(_caminho_ticker(t))
+
+
+def carregar_precos(tickers, coluna="Adj Close", periodo=PERIODO_INICIAL):
+    """
+    Retorna um DataFrame (datas x tickers) com a coluna pedida ('Close' ou 'Adj Close'),
+    atualizando antes apenas os tickers que ainda não foram verificados hoje.
+    """
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    atualizar_precos(tickers)
+    series = {}
+    for t in dict.fromkeys(tickers):
+        df = ler_precos_locais(t)
+        if not df.empty:
+            series[t] = df[coluna]
+    if not series:
+        return pd.DataFrame()
+    precos = pd.DataFrame(series).sort_index()
+    if periodo:
+        anos = int(periodo.rstrip("y"))
+        precos = precos.loc[precos.index >= pd.Timestamp(provedor_dados.hoje()) - pd.DateOffset(years=anos)]
+    return precos.dropna(how="all")
+
+
+def carregar_close_e_fator(tickers, inicio=None):
+    """
+    Close bruto e fator de ajuste (Adj Close / Close) dos tickers, com uma única atualização do armazenamento.
+    As visões ajustada (close * fator) e não ajustada são derivadas localmente por quem chama.
+    """
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    atualizar_precos(tickers)
+    close, fator = {}, {}
+    for t in dict.fromkeys(tickers):
+        df = ler_precos_locais(t)
+        if df.empty:
+            continue
+        close[t] = df["Close"]
+        fator[t] = df["Adj Close"] / df["Close"]
+    close, fator = pd.DataFrame(close).sort_index(), pd.DataFrame(fator).sort_index()
+    if inicio is not None:
+        close, fator = close.loc[pd.Timestamp(inicio):], fator.loc[pd.Timestamp(inicio):]
+    return close, fator
@@ -0,0 +1,206 @@
+"""
+Medições de desempenho das versões vetorizadas contra as implementações anteriores (sem rede).
+A conferência de resultados fica nos testes (tests/); aqui só se mede tempo e memória.
+
+    python benchmarks/medir.py                 # todas as medições
+    python benchmarks/medir.py hrp fronteira   # só as escolhidas
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, "tests")]
+
+import numpy as np
+import pandas as pd
+
+import referencia as ref
+
+
+def _tempo(funcao, repeticoes=1):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes, resultado
+
+
+def _hrpmacro():
+    """HRPMACRO.py com os ideais das commodities fixos, como na fixture hrp dos testes."""
+    import HRPMACRO
+    HRPMACRO.PARAMS.update(ref.IDEAIS_COMMODITIES)
+    return HRPMACRO
+
+
+def medir_pontuacao(n=1_000_000):
+    """Funções escalares do HRPMACRO.py em laço x kernels vetorizados em 10^6 entradas."""
+    import pontuacao_vetorizada as pv
+    hrp = _hrpmacro()
+    rng = np.random.default_rng(1)
+    for nome, valores in [("ipca", rng.uniform(-2, 12, n)), ("selic", rng.uniform(0, 16, n)),
+                          ("dolar", rng.uniform(2, 9, n)), ("petroleo", rng.uniform(20, 140, n))]:
+        escalar, vetorial = getattr(hrp, f"pontuar_{nome}"), getattr(pv, f"pontuar_{nome}")
+        t_escalar, _ = _tempo(lambda: [escalar(v) for v in valores])
+        t_vetorial, _ = _tempo(lambda: vetorial(valores, hrp.PARAMS))
+        print(f"pontuação {nome}: escalar {t_escalar:.2f}s | vetorial {t_vetorial * 1000:.1f}ms "
+              f"| {t_escalar / t_vetorial:.0f}x")
+
+
+def medir_matriz():
+    """Favorecimento do universo do app: laço por ticker x uma chamada matricial."""
+    from test_matriz_setorial import MACRO, favorecimento_laco
+    hrp = _hrpmacro()
+    score = hrp.pontuar_macro(MACRO)
+    setores = list(hrp.setores_por_ticker.values())
+    t_laco, _ = _tempo(lambda: [favorecimento_laco(s, score, hrp.sensibilidade_setorial) for s in setores], 2000)
+    t_matriz, _ = _tempo(lambda: hrp.matriz_setorial.favorecimento_setores(setores, score), 2000)
+    print(f"favorecimento de {len(setores)} tickers: laço {t_laco * 1e6:.1f} µs | matricial {t_matriz * 1e6:.1f} µs")
+
+
+def medir_grade():
+    """Grade what-if padrão (100 x 100 x 50)."""
+    from grade_cenarios import EIXOS_PADRAO, avaliar_grade
+    hrp = _hrpmacro()
+    fixos = {"pib": 2.1, "soja": 11.0, "milho": None, "minerio": 98.0, "petroleo": 80.0}
+    duracao, grade = _tempo(lambda: avaliar_grade(EIXOS_PADRAO, hrp.PARAMS, hrp.matriz_setorial, fixos))
+    print(f"grade {grade.cenario.shape} x {len(grade.setores)} setores: {duracao:.3f}s")
+
+
+def medir_simulador(n_trajetorias=50000):
+    """Trajetórias macro sobre um histórico sintético."""
+    from simulador_macro import HORIZONTE, simular_cenarios
+    from test_simulador_macro import macro_sintetico
+    hrp = _hrpmacro()
+    macro = macro_sintetico()
+    for metodo in ("bootstrap", "var"):
+        duracao, sim = _tempo(lambda: simular_cenarios(macro, hrp.PARAMS, hrp.matriz_setorial,
+                                                       n_trajetorias=n_trajetorias, metodo=metodo, semente=42))
+        print(f"simulação {metodo}: {sim.n_trajetorias} trajetórias x {HORIZONTE} meses em {duracao:.2f}s")
+
+
+def medir_fronteira():
+    """Laço original do Monte Carlo x lotes em fluxo (tempo e pico de memória) e qualidade por amostrador."""
+    from fronteira_eficiente import simular_fronteira
+    n_ativos = 15
+    retornos = ref.retornos_sinteticos(n_ativos, n_dias=2500)
+    media_retorno, cov = retornos.mean() * 252, retornos.cov() * 252
+
+    def laco(n_portfolios):
+        resultados = []
+        for _ in range(n_portfolios):
+            pesos = np.random.random(n_ativos)
+            pesos /= np.sum(pesos)
+            ret = np.dot(pesos, media_retorno)
+            vol = np.sqrt(np.dot(pesos.T, np.dot(cov, pesos)))
+            resultados.append((vol, ret, ret / vol if vol > 0 else 0, pesos.copy()))
+        return pd.DataFrame(resultados, columns=["Volatilidade", "Retorno", "Sharpe", "Pesos"])
+
+    for nome, funcao, n_portfolios in [
+        ("laço", laco, 100_000),
+        ("lotes", lambda n: simular_fronteira(media_retorno, cov, n, semente=1), 100_000),
+        ("lotes", lambda n: simular_fronteira(media_retorno, cov, n, semente=1), 10_000_000),
+    ]:
+        tracemalloc.start()
+        duracao, _ = _tempo(lambda: funcao(n_portfolios))
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"fronteira {nome}: {duracao:.2f}s, pico {pico / 2**20:.1f} MB ({n_portfolios} carteiras)")
+
+    retornos = ref.retornos_sinteticos(40, n_dias=2500, semente=2)
+    media_retorno, cov = retornos.mean() * 252, retornos.cov() * 252
+    for amostrador, concentracao in [("uniforme", 1.0), ("dirichlet", 1.0), ("dirichlet", 0.3),
+                                     ("sobol", 1.0), ("halton", 1.0), ("cantos", 1.0)]:
+        melhores = [
+            simular_fronteira(media_retorno, cov, n, amostrador=amostrador, concentracao=concentracao,
+                              semente=1).melhor["Sharpe"]
+            for n in (10_000, 100_000, 1_000_000)
+        ]
+        parada = simular_fronteira(media_retorno, cov, 1_000_000, amostrador=amostrador,
+                                   concentracao=concentracao, semente=1, parar_apos=50_000)
+        print(f"{amostrador}({concentracao}): Sharpe com 10k/100k/1M = "
+              + " / ".join(f"{m:.3f}" for m in melhores)
+              + f" | parada antecipada: {parada.n_simuladas} sorteios, Sharpe {parada.melhor['Sharpe']:.3f}")
+
+
+def medir_fronteira_exata():
+    """Fronteira exata com warm start x cada ponto resolvido do zero."""
+    from fronteira_exata import _resolver, tracar_fronteira
+    for n_ativos in (15, 50):
+        retornos = ref.retornos_sinteticos(n_ativos, n_dias=2500)
+        media_retorno, cov = retornos.mean() * 252, retornos.cov() * 252
+        mu, sigma = media_retorno.to_numpy(), cov.to_numpy()
+        limites = [(0.0, 1.0)] * n_ativos
+        duracao, fronteira = _tempo(lambda: tracar_fronteira(media_retorno, cov, limites, n_pontos=100))
+
+        def do_zero():
+            for alvo in fronteira.pontos["Retorno"].to_numpy()[1::10]:
+                restricoes = [{"type": "eq", "fun": lambda w: w.sum() - 1, "jac": lambda w: np.ones(n_ativos)},
+                              {"type": "eq", "fun": lambda w, a=alvo: w @ mu - a, "jac": lambda w: mu}]
+                _resolver(sigma, restricoes, limites, np.full(n_ativos, 1 / n_ativos))
+
+        duracao_zero, _ = _tempo(do_zero)
+        print(f"fronteira exata {n_ativos} ativos: 100 pontos em {duracao * 1000:.0f} ms com warm start "
+              f"(~{duracao_zero * 10 * 1000:.0f} ms resolvendo do zero)")
+
+
+def medir_objetivos():
+    """SLSQP com diferenças finitas x gradientes analíticos: iterações, avaliações e tempo."""
+    from scipy.optimize import minimize
+    from objetivos_carteira import retorno_negativo, sharpe_negativo, soma_um
+    for n in (15, 50, 200):
+        retornos = ref.retornos_sinteticos(n, n_dias=2500).to_numpy()
+        mu, cov = retornos.mean(axis=0) * 252, np.cov(retornos, rowvar=False) * 252
+        limites = [(0.01, 0.3)] * n if n <= 50 else [(0.0, 0.05)] * n
+        inicial = np.full(n, 1 / n)
+
+        def sharpe_neg(pesos):
+            vol = np.sqrt(pesos @ cov @ pesos)
+            return -(pesos @ mu - 0.0001) / vol if vol > 0 else 0
+
+        soma = {"type": "eq", "fun": lambda x: np.sum(x) - 1}
+        for nome, antes, depois in [
+            ("sharpe", (sharpe_neg, {}, soma), (sharpe_negativo(mu, cov, 0.0001), {"jac": True}, soma_um(n))),
+            ("retorno", (lambda w: -(w @ mu), {}, soma), (retorno_negativo(mu), {"jac": True}, soma_um(n))),
+        ]:
+            linha = []
+            for funcao, extra, restricao in (antes, depois):
+                duracao, resultado = _tempo(lambda: minimize(
+                    funcao, inicial, method="SLSQP", bounds=limites, constraints=restricao,
+                    options={"disp": False, "maxiter": 1000}, **extra))
+                linha.append(f"{resultado.nit} it, {resultado.nfev} aval., {duracao * 1000:.0f} ms")
+            print(f"{n} ativos, {nome}: numérico [{linha[0]}] -> analítico [{linha[1]}]")
+
+
+def medir_hrp():
+    """HRP com Series do pandas x arrays."""
+    from sklearn.covariance import LedoitWolf
+    from hrp_vetorizado import calcular_hrp
+    for n_ativos in (15, 60, 180, 500):
+        retornos = ref.retornos_sinteticos(n_ativos)
+        correlacao = retornos.corr()
+        cov = pd.DataFrame(LedoitWolf().fit(retornos).covariance_, index=retornos.columns, columns=retornos.columns)
+        t_pandas, _ = _tempo(lambda: ref.hrp_pandas(correlacao, cov))
+        t_vetorizado, _ = _tempo(lambda: calcular_hrp(correlacao, cov), 20)
+        print(f"HRP {n_ativos} ativos: pandas {t_pandas * 1000:.1f} ms -> vetorizado {t_vetorizado * 1000:.2f} ms")
+
+
+MEDICOES = {
+    "pontuacao": medir_pontuacao,
+    "matriz": medir_matriz,
+    "grade": medir_grade,
+    "simulador": medir_simulador,
+    "fronteira": medir_fronteira,
+    "exata": medir_fronteira_exata,
+    "objetivos": medir_objetivos,
+    "hrp": medir_hrp,
+}
+
+
+if __name__ == "__main__":
+    escolhidas = sys.argv[1:] or list(MEDICOES)
+    desconhecidas = [m for m in escolhidas if m not in MEDICOES]
+    if desconhecidas:
+        sys.exit(f"Medições desconhecidas: {desconhecidas} (opções: {', '.join(MEDICOES)})")
+    for nome in escolhidas:
+        MEDICOES[nome]()
@@ -0,0 +1,67 @@
+import time
+import datetime
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from snapshot_macro import MacroSnapshot
+
+MAX_WORKERS = 8
+TIMEOUT_PADRAO = 15.0
+
+
+# latencia: segundos até o resultado (ou até o timeout); erro: vazio quando a fonte respondeu normalmente
+DiagnosticoFonte = namedtuple("DiagnosticoFonte", ["fonte", "latencia", "erro"])
+
+
+class SnapshotMacro(namedtuple("SnapshotMacro", ["valores", "fontes", "carregado_em"])):
+    """Resultado imutável de uma carga macro: valores por indicador (MacroSnapshot) e diagnóstico de cada fonte."""
+    __slots__ = ()
+
+    @property
+    def falhas(self):
+        return tuple(d for d in self.fontes if d.erro)
+
+
+def _executar(func):
+    inicio = time.perf_counter()
+    try:
+        valor, erro = func(), ""
+    except Exception as e:
+        valor, erro = None, str(e) or type(e).__name__
+    return valor, time.perf_counter() - inicio, erro
+
+
+def carregar_snapshot_macro(fontes, timeouts=None, max_workers=MAX_WORKERS, timeout_padrao=TIMEOUT_PADRAO):
+    """
+    Dispara todas as fontes em paralelo e devolve um SnapshotMacro.
+    fontes: dict {indicador: função sem argumentos}
+    timeouts: dict opcional {indicador: segundos}; fontes que estouram o prazo ficam com valor None.
+    O tempo total fica limitado pela fonte mais lenta, e não pela soma de todas.
+    """
+    timeouts = timeouts or {}
+    inicio = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, max(1, len(fontes))), thread_name_prefix="macro")
+    futuros = {nome: pool.submit(_executar, func) for nome, func in fontes.items()}
+
+    valores, diagnosticos = {}, []
+    try:
+        for nome, futuro in futuros.items():
+            prazo = inicio + timeouts.get(nome, timeout_padrao)
+            try:
+                valor, latencia, erro = futuro.result(timeout=max(0.0, prazo - time.perf_counter()))
+            except FuturesTimeoutError:
+                valor, latencia, erro = None, time.perf_counter() - inicio, "timeout"
+            valores[nome] = valor
+            diagnosticos.append(DiagnosticoFonte(nome, latencia, erro))
+    finally:
+        # Não espera fontes atrasadas: elas terminam em segundo plano e alimentam os caches locais
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    for d in diagnosticos:
+        if d.erro:
+            print(f"Fonte macro '{d.fonte}' falhou ({d.erro}) após {d.latencia:.2f}s")
+
+    return SnapshotMacro(
+        valores=MacroSnapshot(valores),
+        fontes=tuple(diagnosticos),
+        carregado_em=datetime.datetime.now(),
+    )
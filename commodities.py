@@ -0,0 +1,65 @@
+import threading
+import pandas as pd
+import provedor_dados
+
+# Cesta de commodities usada no score macro: indicador -> ticker no Yahoo Finance
+CESTA_COMMODITIES = {
+    "soja": "ZS=F",
+    "milho": "ZC=F",
+    "minerio": "TIO=F",
+    "petroleo": "BZ=F",
+}
+PERIODO_CESTA = "13mo"
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _baixar_cesta(simbolos):
+    dados = provedor_dados.download(simbolos, period=PERIODO_CESTA, interval="1d", auto_adjust=False, progress=False)
+    if dados is None or dados.empty:
+        return pd.DataFrame(columns=simbolos, dtype=float)
+    close = dados["Close"]
+    if isinstance(close, pd.Series):
+        close = close.to_frame(simbolos[0])
+    close.index = pd.to_datetime(close.index).tz_localize(None).normalize()
+    return close.reindex(columns=simbolos).astype("float64")
+
+
+def carregar_cesta(simbolos=None):
+    """
+    Fechamentos diários de toda a cesta em um único download, memorizados durante o dia.
+    Chamadas concorrentes esperam a mesma carga em vez de baixar de novo.
+    """
+    simbolos = tuple(simbolos or CESTA_COMMODITIES.values())
+    chave = (simbolos, provedor_dados.hoje())
+    with _lock:
+        if chave in _cache:
+            return _cache[chave]
+        cesta = _baixar_cesta(list(simbolos))
+        if not cesta.empty:
+            _cache.clear()
+            _cache[chave] = cesta
+        return cesta
+
+
+def historico_mensal(diario):
+    """Fechamento mensal (último pregão de cada mês, rotulado no início do mês)."""
+    return diario.resample("MS").last()
+
+
+def precos_spot(diario=None):
+    """Último fechamento disponível de cada símbolo da cesta."""
+    diario = carregar_cesta() if diario is None else diario
+    ultimos = diario.ffill().iloc[-1] if not diario.empty else pd.Series(dtype=float)
+    return {s: (float(v) if pd.notna(v) else None) for s, v in ultimos.items()}
+
+
+def medias_moveis_12m(diario=None):
+    """Média dos fechamentos mensais dos últimos 12 meses (mês corrente incluído), por símbolo."""
+    diario = carregar_cesta() if diario is None else diario
+    mensal = historico_mensal(diario)
+    # Mês corrente e os 11 anteriores: 12 fechamentos mensais
+    inicio = (pd.Timestamp(provedor_dados.hoje()).to_period("M") - 11).to_timestamp()
+    medias = mensal.loc[mensal.index >= inicio].mean()
+    return {s: (float(v) if pd.notna(v) else None) for s, v in medias.items()}
@@ -0,0 +1,99 @@
+from functools import cached_property
+import numpy as np
+import provedor_dados
+from fronteira_eficiente import fator_risco
+
+
+class ContextoCarteira:
+    """
+    Dados de um conjunto de tickers numa data de referência, calculados sob demanda e guardados:
+    preços, retornos (simples e log), média e covariância anualizadas, covariância encolhida (Ledoit-Wolf),
+    correlação e fator de Cholesky. Otimizadores, métricas e gráficos do mesmo clique compartilham
+    o mesmo contexto, então cada preço é carregado e cada álgebra linear roda uma vez só.
+    carregar_precos(tickers) -> DataFrame (datas x tickers), como obter_preco_diario_ajustado.
+    Dois contextos com os mesmos tickers e data são iguais (e têm o mesmo hash), servindo de chave de cache.
+    """
+
+    def __init__(self, tickers, carregar_precos, data_referencia=None, precos=None):
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        self.tickers = tuple(dict.fromkeys(tickers))
+        self.data_referencia = data_referencia or provedor_dados.hoje()
+        self._carregar_precos = carregar_precos
+        if precos is not None:
+            self.__dict__["precos"] = precos
+
+    def __eq__(self, outro):
+        if not isinstance(outro, ContextoCarteira):
+            return NotImplemented
+        return (self.tickers, self.data_referencia) == (outro.tickers, outro.data_referencia)
+
+    def __hash__(self):
+        return hash((self.tickers, self.data_referencia))
+
+    def __repr__(self):
+        return f"ContextoCarteira({len(self.tickers)} tickers, {self.data_referencia})"
+
+    @cached_property
+    def precos(self):
+        return self._carregar_precos(list(self.tickers))
+
+    def subconjunto(self, tickers):
+        """Contexto de parte dos tickers reaproveitando os preços já carregados (sem nova consulta)."""
+        tickers = list(dict.fromkeys([tickers] if isinstance(tickers, str) else tickers))
+        if not set(tickers) <= set(self.precos.columns):
+            return ContextoCarteira(tickers, self._carregar_precos, self.data_referencia)
+        return ContextoCarteira(tickers, self._carregar_precos, self.data_referencia,
+                                precos=self.precos[tickers].dropna(how="all"))
+
+    @cached_property
+    def completo(self):
+        """Contexto só com os tickers sem nenhuma lacuna de preço na janela (como exige o HRP)."""
+        precos = self.precos.dropna(axis=1, how="any")
+        return ContextoCarteira(precos.columns, self._carregar_precos, self.data_referencia, precos=precos)
+
+    @cached_property
+    def precos_preenchidos(self):
+        return self.precos.ffill().bfill()
+
+    @cached_property
+    def retornos(self):
+        """Retornos simples diários nas datas com preço para todos os tickers."""
+        return self.precos.pct_change().dropna()
+
+    @cached_property
+    def retornos_log(self):
+        """Retornos logarítmicos diários sobre os preços preenchidos para frente/trás."""
+        precos = self.precos_preenchidos
+        return np.log(precos / precos.shift(1)).dropna()
+
+    @cached_property
+    def media(self):
+        """Retorno simples médio anualizado (Series)."""
+        return self.retornos.mean() * 252
+
+    @cached_property
+    def cov(self):
+        """Covariância amostral anualizada dos retornos simples (DataFrame)."""
+        return self.retornos.cov() * 252
+
+    @cached_property
+    def correlacao(self):
+        return self.retornos.corr()
+
+    @cached_property
+    def cholesky(self):
+        """Fator L de cov = L Lᵀ (ver fronteira_eficiente.fator_risco)."""
+        return fator_risco(self.cov)
+
+    @cached_property
+    def cov_encolhida(self):
+        """Covariância Ledoit-Wolf diária dos retornos simples (ndarray)."""
+        from sklearn.covariance import LedoitWolf
+        return LedoitWolf().fit(self.retornos).covariance_
+
+    @cached_property
+    def cov_encolhida_log(self):
+        """Covariância Ledoit-Wolf diária dos retornos logarítmicos (ndarray)."""
+        from sklearn.covariance import LedoitWolf
+        return LedoitWolf().fit(self.retornos_log).covariance_
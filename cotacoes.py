@@ -0,0 +1,86 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import provedor_dados
+
+FUSO_B3 = "America/Sao_Paulo"
+MAX_CONEXOES = 8
+
+# Cache em memória compartilhado entre reruns do Streamlit: {ticker: (preco_atual, preco_alvo)} da sessão corrente
+_cache = {}
+_sessao_cache = None
+_lock = threading.Lock()
+# Preço-alvo cuja consulta falhou (diferente de um ticker sem targetMeanPrice, que fica None no cache)
+_FALHA = object()
+
+
+def sessao_atual():
+    """Data do pregão corrente da B3 (fins de semana contam como a última sexta-feira)."""
+    if provedor_dados.MODO == "reproduzir":
+        hoje = pd.Timestamp(provedor_dados.hoje())
+    else:
+        hoje = pd.Timestamp.now(tz=FUSO_B3).normalize().tz_localize(None)
+    if hoje.weekday() >= 5:
+        hoje = hoje - pd.offsets.BDay(1)
+    return hoje.date()
+
+
+def _baixar_precos_atuais(tickers):
+    """Último fechamento de todos os tickers em um único yf.download."""
+    dados = provedor_dados.download(tickers, period="5d", auto_adjust=False, progress=False)
+    if dados is None or dados.empty:
+        return {}
+    close = dados["Close"]
+    if isinstance(close, pd.Series):
+        close = close.to_frame(tickers[0])
+    ultimos = close.ffill().iloc[-1]
+    return {t: float(v) for t, v in ultimos.items() if pd.notna(v)}
+
+
+def _baixar_preco_alvo(ticker):
+    try:
+        return provedor_dados.info(ticker).get("targetMeanPrice", None)
+    except Exception as e:
+        print(f"Erro ao obter preço-alvo de {ticker}: {e}")
+        return _FALHA
+
+
+def _baixar_cotacoes(tickers):
+    with ThreadPoolExecutor(max_workers=min(MAX_CONEXOES, len(tickers))) as pool:
+        alvos_futuros = pool.map(_baixar_preco_alvo, tickers)
+        try:
+            atuais = _baixar_precos_atuais(tickers)
+        except Exception as e:
+            print(f"Erro ao obter preços atuais de {tickers}: {e}")
+            atuais = {}
+        alvos = dict(zip(tickers, alvos_futuros))
+    return {t: (atuais.get(t), alvos.get(t)) for t in tickers}
+
+
+def obter_cotacoes(tickers):
+    """
+    Retorna DataFrame indexado por ticker com 'preco_atual' e 'preco_alvo' (targetMeanPrice).
+    Os valores ficam em cache durante o pregão; só os tickers ainda não consultados na sessão são baixados.
+    O lock protege só a leitura e a atualização do cache: o download corre fora dele, e uma sessão
+    do Streamlit não espera a consulta lenta de outra (dois reruns simultâneos podem baixar o mesmo ticker).
+    """
+    global _sessao_cache
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    tickers = list(dict.fromkeys(tickers))
+    with _lock:
+        sessao = sessao_atual()
+        if sessao != _sessao_cache:
+            _cache.clear()
+            _sessao_cache = sessao
+        conhecidos = {t: _cache[t] for t in tickers if t in _cache}
+    faltantes = [t for t in tickers if t not in conhecidos]
+    baixados = _baixar_cotacoes(faltantes) if faltantes else {}
+    with _lock:
+        # Falhas (preço atual ausente ou consulta do alvo com erro) não entram no cache
+        # para serem tentadas de novo no próximo rerun; nem cotações de um pregão que já virou
+        if _sessao_cache == sessao:
+            _cache.update({t: v for t, v in baixados.items() if v[0] is not None and v[1] is not _FALHA})
+    linhas = [conhecidos.get(t, baixados.get(t)) for t in tickers]
+    linhas = [(atual, None if alvo is _FALHA else alvo) for atual, alvo in linhas]
+    return pd.DataFrame(linhas, index=pd.Index(tickers, name="ticker"), columns=["preco_atual", "preco_alvo"])
@@ -0,0 +1,157 @@
+import os
+import datetime
+import threading
+import pandas as pd
+import provedor_dados
+from armazenamento_precos import DIRETORIO_CACHE
+from http_cliente import obter_json
+
+URL_BASE = "https://olinda.bcb.gov.br/olinda/servico/Expectativas/versao/v1/odata/"
+RECURSO = "ExpectativasMercadoTop5Anuais"
+CAMPOS = "Indicador,Data,DataReferencia,Mediana"
+INDICADORES = ["IPCA", "Selic", "PIB Total", "Câmbio"]
+TAMANHO_PAGINA = 10000
+
+ARQUIVO_HISTORICO = os.path.join(DIRETORIO_CACHE, "focus", "top5_anuais.parquet")
+
+_historico = None
+_lock = threading.Lock()
+_sincronizacao = None
+_lock_sincronizacao = threading.Lock()
+
+
+def _consultar(filtro, ordem=None, top=TAMANHO_PAGINA, skip=0):
+    params = {
+        "$filter": filtro,
+        "$format": "json",
+        "$select": CAMPOS,
+        "$top": top,
+    }
+    if ordem:
+        params["$orderby"] = ordem
+    if skip:
+        params["$skip"] = skip
+    return obter_json(URL_BASE + RECURSO, params=params)["value"]
+
+
+def _filtro_indicadores(indicadores):
+    return "(" + " or ".join(f"Indicador eq '{i}'" for i in indicadores) + ")"
+
+
+def buscar_mediana_focus(indicador, ano):
+    """Mediana mais recente do Focus para indicador/ano, com filtro, ordenação e top=1 feitos no servidor."""
+    filtro = f"Indicador eq '{indicador}' and DataReferencia eq '{ano}'"
+    dados = _consultar(filtro, ordem="Data desc", top=1)
+    if not dados:
+        return None
+    return float(dados[0]["Mediana"])
+
+
+def _para_dataframe(dados):
+    df = pd.DataFrame(dados, columns=CAMPOS.split(","))
+    df["Data"] = pd.to_datetime(df["Data"])
+    df["DataReferencia"] = df["DataReferencia"].astype(str)
+    df["Mediana"] = pd.to_numeric(df["Mediana"], errors="coerce")
+    return df
+
+
+def _baixar_a_partir_de(data_inicial):
+    """
+    Baixa, paginando, todas as expectativas dos indicadores com Data a partir de data_inicial (inclusive):
+    o BCB pode publicar depois mais linhas para a última data salva; a sobreposição sai no drop_duplicates.
+    """
+    filtro = _filtro_indicadores(INDICADORES)
+    if data_inicial is not None:
+        filtro += f" and Data ge '{data_inicial.strftime('%Y-%m-%d')}'"
+    paginas = []
+    skip = 0
+    while True:
+        dados = _consultar(filtro, ordem="Data asc", skip=skip)
+        paginas.extend(dados)
+        if len(dados) < TAMANHO_PAGINA:
+            break
+        skip += TAMANHO_PAGINA
+    return _para_dataframe(paginas)
+
+
+def _atualizado_hoje():
+    if not os.path.exists(ARQUIVO_HISTORICO):
+        return False
+    return datetime.date.fromtimestamp(os.path.getmtime(ARQUIVO_HISTORICO)) >= provedor_dados.hoje()
+
+
+def carregar_historico_focus():
+    """
+    Histórico local das expectativas anuais (Top 5) dos indicadores usados no app.
+    Atualiza no máximo uma vez por dia, baixando apenas as linhas a partir da última Data salva.
+    """
+    global _historico
+    with _lock:
+        if _historico is not None and _atualizado_hoje():
+            return _historico
+        if os.path.exists(ARQUIVO_HISTORICO):
+            historico = pd.read_parquet(ARQUIVO_HISTORICO)
+        else:
+            historico = _para_dataframe([])
+        if not _atualizado_hoje():
+            ultima = historico["Data"].max() if not historico.empty else None
+            try:
+                novos = _baixar_a_partir_de(ultima)
+                if not novos.empty:
+                    historico = pd.concat([historico, novos], ignore_index=True).drop_duplicates(ignore_index=True)
+                os.makedirs(os.path.dirname(ARQUIVO_HISTORICO), exist_ok=True)
+                temporario = f"{ARQUIVO_HISTORICO}.{os.getpid()}.tmp"
+                historico.to_parquet(temporario)
+                os.replace(temporario, ARQUIVO_HISTORICO)
+            except Exception as e:
+                print(f"Falha ao atualizar histórico do Focus, usando cópia local: {e}")
+        _historico = historico
+        return _historico
+
+
+def _historico_local():
+    """Histórico já em memória ou em disco, sem consultar a rede (None se ainda não há cópia local)."""
+    if _historico is not None:
+        return _historico
+    if not os.path.exists(ARQUIVO_HISTORICO):
+        return None
+    try:
+        return pd.read_parquet(ARQUIVO_HISTORICO)
+    except Exception as e:
+        print(f"Histórico local do Focus ilegível: {e}")
+        return None
+
+
+def sincronizar_em_segundo_plano():
+    """Dispara carregar_historico_focus numa thread (uma por vez) sem esperar a carga paginada terminar."""
+    global _sincronizacao
+    with _lock_sincronizacao:
+        if _sincronizacao is None or not _sincronizacao.is_alive():
+            _sincronizacao = threading.Thread(target=carregar_historico_focus, name="focus", daemon=True)
+            _sincronizacao.start()
+
+
+def obter_mediana_focus(indicador, ano):
+    """
+    Mediana mais recente para indicador/ano. Com o histórico local já sincronizado hoje, lê dele;
+    senão faz a consulta top=1 (rápida) e deixa a sincronização do histórico em segundo plano,
+    sem prender a carga do snapshot macro ao primeiro download completo. Se a consulta falhar,
+    usa a cópia local desatualizada, quando houver.
+    """
+    if _atualizado_hoje():
+        historico = _historico_local()
+    else:
+        sincronizar_em_segundo_plano()
+        try:
+            return buscar_mediana_focus(indicador, ano)
+        except Exception as e:
+            historico = _historico_local()
+            if historico is None:
+                raise
+            print(f"Falha na consulta do Focus ({indicador} {ano}), usando histórico local: {e}")
+    if historico is None:
+        return buscar_mediana_focus(indicador, ano)
+    selecao = historico[(historico["Indicador"] == indicador) & (historico["DataReferencia"] == str(ano))]
+    if selecao.empty:
+        return buscar_mediana_focus(indicador, ano)
+    return float(selecao.loc[selecao["Data"].idxmax(), "Mediana"])
@@ -0,0 +1,200 @@
+import heapq
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# Carteiras sorteadas por lote: a memória dos pesos fica limitada a (TAMANHO_LOTE x ativos)
+TAMANHO_LOTE = 10000
+# Quantas carteiras de maior Sharpe manter (com pesos) e quantos pontos guardar para o gráfico
+TOP_K = 50
+PONTOS_GRAFICO = 5000
+COLUNAS = ["Volatilidade", "Retorno", "Sharpe"]
+# "uniforme": np.random.random(n) / soma (concentra perto da carteira igualitária, como o sorteio original)
+# "dirichlet": Dirichlet(concentracao) — 1 é uniforme no simplex; < 1 favorece carteiras concentradas
+# "sobol" / "halton": sequências de baixa discrepância levadas ao simplex (Dirichlet(concentracao) pela inversa)
+# "cantos": mistura de Dirichlet(concentracao) com Dirichlet esparsa (perto dos vértices e arestas)
+AMOSTRADORES = ("uniforme", "dirichlet", "sobol", "halton", "cantos")
+CONCENTRACAO_CANTOS = 0.1
+
+# pontos: amostra uniforme (reservatório) das carteiras simuladas, para o gráfico de dispersão
+# melhor: Series (Volatilidade, Retorno, Sharpe, Pesos) da carteira simulada de maior Sharpe
+# topo / pesos_topo: as TOP_K carteiras de maior Sharpe (ordem decrescente) e seus pesos (carteira x ativo)
+# pareto / pesos_pareto: carteiras não dominadas em (risco, retorno), por volatilidade crescente
+# n_simuladas: total de carteiras sorteadas
+FronteiraMonteCarlo = namedtuple(
+    "FronteiraMonteCarlo", ["pontos", "melhor", "topo", "pesos_topo", "pareto", "pesos_pareto", "n_simuladas"]
+)
+
+
+def fator_risco(cov):
+    """
+    Fator L com cov = L Lᵀ, de modo que a volatilidade de cada linha de W é ‖W L‖.
+    Usa Cholesky; se a covariância for só semidefinida (ativos colineares, poucas observações),
+    cai para a decomposição espectral com autovalores negativos zerados.
+    """
+    cov = np.asarray(cov, dtype="float64")
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        autovalores, autovetores = np.linalg.eigh(cov)
+        return autovetores * np.sqrt(np.clip(autovalores, 0, None))
+
+
+def metricas_lote(pesos, media_retorno, fator, taxa_risco_livre=0.0):
+    """Retorno (W·μ), volatilidade (‖W L‖) e Sharpe de cada linha de pesos (carteiras x ativos)."""
+    retorno = pesos @ media_retorno
+    risco = pesos @ fator
+    volatilidade = np.sqrt(np.einsum("ij,ij->i", risco, risco))
+    sharpe = np.divide(retorno - taxa_risco_livre, volatilidade,
+                       out=np.zeros_like(retorno), where=volatilidade > 0)
+    return retorno, volatilidade, sharpe
+
+
+def _dirichlet(rng, concentracao, tamanho, n_ativos):
+    gamas = rng.standard_gamma(concentracao, size=(tamanho, n_ativos))
+    somas = gamas.sum(axis=1, keepdims=True)
+    # Concentração muito baixa pode zerar a linha inteira: vira um vértice sorteado
+    vazias = somas[:, 0] == 0
+    if vazias.any():
+        gamas[vazias, rng.integers(0, n_ativos, size=int(vazias.sum()))] = 1.0
+        somas[vazias] = 1.0
+    return gamas / somas
+
+
+def criar_amostrador(nome, n_ativos, rng, concentracao=1.0, fracao_cantos=0.5):
+    """
+    Função tamanho -> pesos (tamanho x ativos), cada linha no simplex (long-only, soma 1).
+    Todo o sorteio sai de rng (np.random.Generator), inclusive o embaralhamento das sequências Sobol/Halton.
+    """
+    if nome == "uniforme":
+        def amostrar(tamanho):
+            pesos = rng.random((tamanho, n_ativos))
+            return pesos / pesos.sum(axis=1, keepdims=True)
+    elif nome == "dirichlet":
+        def amostrar(tamanho):
+            return _dirichlet(rng, concentracao, tamanho, n_ativos)
+    elif nome in ("sobol", "halton"):
+        from scipy.stats import qmc, gamma
+        motor = (qmc.Sobol if nome == "sobol" else qmc.Halton)(d=n_ativos, scramble=True, seed=rng)
+
+        def amostrar(tamanho):
+            u = np.clip(motor.random(tamanho), 1e-12, 1 - 1e-12)
+            # Exponenciais (ou gamas) normalizadas: uniforme no simplex preservando a baixa discrepância
+            gamas = -np.log1p(-u) if concentracao == 1.0 else gamma.ppf(u, concentracao)
+            return gamas / gamas.sum(axis=1, keepdims=True)
+    elif nome == "cantos":
+        def amostrar(tamanho):
+            n_cantos = rng.binomial(tamanho, fracao_cantos)
+            pesos = np.vstack([
+                _dirichlet(rng, CONCENTRACAO_CANTOS, n_cantos, n_ativos),
+                _dirichlet(rng, concentracao, tamanho - n_cantos, n_ativos),
+            ])
+            return pesos[rng.permutation(tamanho)]
+    else:
+        raise ValueError(f"Amostrador desconhecido: {nome} (opções: {', '.join(AMOSTRADORES)})")
+    return amostrar
+
+
+def nao_dominados(volatilidade, retorno):
+    """Índices das carteiras não dominadas (nenhuma outra com risco <= e retorno >=), por volatilidade crescente."""
+    ordem = np.lexsort((-retorno, volatilidade))
+    retorno = retorno[ordem]
+    melhor_anterior = np.concatenate([[-np.inf], np.maximum.accumulate(retorno)[:-1]])
+    return ordem[retorno > melhor_anterior]
+
+
+class _Acumulador:
+    """Resultados em fluxo, lote a lote: top-k por Sharpe (heap), fronteira de Pareto e amostra para o gráfico."""
+
+    def __init__(self, n_ativos, top_k, pontos_grafico, rng):
+        self.top_k, self.pontos_grafico, self.rng = top_k, pontos_grafico, rng
+        self.heap = []
+        self.pareto = np.empty((0, 3))
+        self.pesos_pareto = np.empty((0, n_ativos))
+        self.amostra = np.empty((pontos_grafico, 3))
+        self.vistos = 0
+        self.melhor_sharpe = -np.inf
+
+    def adicionar(self, pesos, metricas):
+        n = len(metricas)
+        self.melhor_sharpe = max(self.melhor_sharpe, np.nanmax(metricas[:, 2]))
+        # Top-k: só os k melhores do lote disputam lugar no heap (mínimo na raiz)
+        candidatos = np.argpartition(-metricas[:, 2], self.top_k - 1)[:self.top_k] if n > self.top_k else range(n)
+        for i in candidatos:
+            # Em empate de Sharpe fica a carteira sorteada antes (como idxmax)
+            item = (metricas[i, 2], -(self.vistos + int(i)))
+            if len(self.heap) < self.top_k:
+                heapq.heappush(self.heap, item + (metricas[i].copy(), pesos[i].copy()))
+            elif item > self.heap[0][:2]:
+                heapq.heapreplace(self.heap, item + (metricas[i].copy(), pesos[i].copy()))
+
+        # Fronteira: não dominados do lote unidos aos atuais e filtrados de novo
+        frente = nao_dominados(metricas[:, 0], metricas[:, 1])
+        metricas_frente = np.vstack([self.pareto, metricas[frente]])
+        pesos_frente = np.vstack([self.pesos_pareto, pesos[frente]])
+        manter = nao_dominados(metricas_frente[:, 0], metricas_frente[:, 1])
+        self.pareto, self.pesos_pareto = metricas_frente[manter], pesos_frente[manter]
+
+        # Amostragem por reservatório: cada carteira simulada tem a mesma chance de ir para o gráfico
+        posicao = self.vistos + np.arange(n)
+        enche = posicao < self.pontos_grafico
+        self.amostra[posicao[enche]] = metricas[enche]
+        sorteio = self.rng.integers(0, posicao[~enche] + 1)
+        troca = sorteio < self.pontos_grafico
+        self.amostra[sorteio[troca]] = metricas[~enche][troca]
+        self.vistos += n
+
+
+def simular_fronteira(media_retorno, cov, n_portfolios=50000, taxa_risco_livre=0.0,
+                      tamanho_lote=TAMANHO_LOTE, semente=None, top_k=TOP_K, pontos_grafico=PONTOS_GRAFICO,
+                      amostrador="uniforme", concentracao=1.0, parar_apos=None, tolerancia=1e-4, fator=None):
+    """
+    Fronteira eficiente por Monte Carlo, sorteada em lotes (lote x ativos) com o amostrador escolhido
+    (ver AMOSTRADORES; o padrão reproduz np.random.random(n) / soma). Nada cresce com n_portfolios: de cada lote
+    ficam só as top_k carteiras de maior Sharpe, a fronteira não dominada (risco x retorno) e uma amostra
+    de pontos_grafico pontos.
+    parar_apos: encerra o sorteio quando o melhor Sharpe não melhora mais que `tolerancia` (relativa)
+    em parar_apos carteiras seguidas (verificado a cada lote); n_portfolios passa a ser o máximo.
+    media_retorno: Series (ou array) de retornos esperados anualizados; cov: covariância anualizada;
+    fator: fator_risco(cov) já calculado, se houver.
+    """
+    tickers = media_retorno.index if isinstance(media_retorno, pd.Series) else None
+    mu = np.asarray(media_retorno, dtype="float64")
+    fator = fator_risco(cov) if fator is None else np.asarray(fator, dtype="float64")
+    rng = np.random.default_rng(semente)
+    amostrar = criar_amostrador(amostrador, len(mu), rng, concentracao)
+    if amostrador in ("sobol", "halton"):
+        # Lotes em potência de 2 preservam o equilíbrio da sequência de Sobol
+        tamanho_lote = 1 << (max(tamanho_lote, 2).bit_length() - 1)
+    acumulador = _Acumulador(len(mu), top_k, pontos_grafico, rng)
+
+    referencia, sem_melhora = -np.inf, 0
+    for inicio in range(0, n_portfolios, tamanho_lote):
+        pesos = amostrar(min(tamanho_lote, n_portfolios - inicio))
+        retorno, volatilidade, sharpe = metricas_lote(pesos, mu, fator, taxa_risco_livre)
+        acumulador.adicionar(pesos, np.column_stack([volatilidade, retorno, sharpe]))
+        if not np.isfinite(referencia) or acumulador.melhor_sharpe > referencia + tolerancia * abs(referencia):
+            referencia, sem_melhora = acumulador.melhor_sharpe, 0
+        else:
+            sem_melhora += len(pesos)
+        if parar_apos is not None and sem_melhora >= parar_apos:
+            break
+
+    topo = sorted(acumulador.heap, reverse=True)
+    if not topo or not np.isfinite(topo[0][0]):
+        raise ValueError("Nenhuma carteira simulada com Sharpe válido")
+    indice_topo = pd.Index([-item[1] for item in topo], name="simulacao")
+    pesos_topo = pd.DataFrame(np.array([item[3] for item in topo]), index=indice_topo, columns=tickers)
+    melhor = pd.Series({
+        **dict(zip(COLUNAS, topo[0][2])),
+        "Pesos": topo[0][3] if tickers is None else pd.Series(topo[0][3], index=tickers),
+    }, name=indice_topo[0])
+    return FronteiraMonteCarlo(
+        pontos=pd.DataFrame(acumulador.amostra[:min(acumulador.vistos, pontos_grafico)], columns=COLUNAS),
+        melhor=melhor,
+        topo=pd.DataFrame(np.array([item[2] for item in topo]), index=indice_topo, columns=COLUNAS),
+        pesos_topo=pesos_topo,
+        pareto=pd.DataFrame(acumulador.pareto, columns=COLUNAS),
+        pesos_pareto=pd.DataFrame(acumulador.pesos_pareto, columns=tickers),
+        n_simuladas=acumulador.vistos,
+    )
@@ -0,0 +1,123 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+N_PONTOS = 100
+
+# pontos: DataFrame (Volatilidade, Retorno, Sharpe) por retorno-alvo crescente, da variância mínima ao retorno máximo
+# pesos: DataFrame (ponto x ativo) com a carteira de cada ponto
+FronteiraExata = namedtuple("FronteiraExata", ["pontos", "pesos"])
+
+
+def _limites(limites, n):
+    limites = np.asarray(limites, dtype="float64").reshape(n, 2)
+    inferior = limites[:, 0]
+    # macro_bounds pode dar máximo abaixo do mínimo para score muito negativo: o ativo fica no mínimo
+    superior = np.maximum(limites[:, 1], inferior)
+    if inferior.sum() > 1 + 1e-12 or superior.sum() < 1 - 1e-12:
+        raise ValueError(
+            f"Limites de peso inviáveis: soma dos mínimos {inferior.sum():.2f}, soma dos máximos {superior.sum():.2f}"
+        )
+    return inferior, superior
+
+
+def _retorno_maximo(media_retorno, inferior, superior):
+    """Carteira de maior retorno com soma 1 e limites: parte dos mínimos e enche os ativos de maior retorno."""
+    pesos = inferior.copy()
+    resta = 1 - pesos.sum()
+    for i in np.argsort(-media_retorno, kind="stable"):
+        acrescimo = min(superior[i] - inferior[i], resta)
+        pesos[i] += acrescimo
+        resta -= acrescimo
+        if resta <= 0:
+            break
+    return pesos
+
+
+def _resolver(cov, restricoes, limites, inicial):
+    """QP por SLSQP: variância com gradiente analítico; restrições lineares com jacobiano constante. None se falhar."""
+    resultado = minimize(
+        lambda w: w @ cov @ w,
+        inicial,
+        jac=lambda w: 2 * cov @ w,
+        method="SLSQP",
+        bounds=limites,
+        constraints=restricoes,
+        options={"ftol": 1e-12, "maxiter": 500},
+    )
+    return resultado.x if resultado.success else None
+
+
+def tracar_fronteira(media_retorno, cov, limites, n_pontos=N_PONTOS, taxa_risco_livre=0.0):
+    """
+    Fronteira eficiente exata (long-only, com limites por ativo): para cada retorno-alvo entre o da carteira
+    de variância mínima e o máximo viável, resolve min wᵀΣw sujeito a soma 1, wᵀμ = alvo e limites.
+    Cada problema parte da solução do alvo anterior (warm start), então poucos passos bastam; se o SLSQP
+    não convergir, tenta de novo do ponto de partida neutro e, falhando outra vez, o alvo fica fora da curva.
+    media_retorno: Series (ou array) de retornos esperados anualizados; cov: covariância anualizada;
+    limites: (mínimo, máximo) por ativo, como em macro_bounds.
+    ValueError se os limites forem inviáveis ou a carteira de variância mínima não convergir.
+    """
+    tickers = media_retorno.index if isinstance(media_retorno, pd.Series) else None
+    mu = np.asarray(media_retorno, dtype="float64")
+    cov = np.asarray(cov, dtype="float64")
+    n = len(mu)
+    inferior, superior = _limites(limites, n)
+    limites = list(zip(inferior, superior))
+    uns = np.ones(n)
+    soma_um = {"type": "eq", "fun": lambda w: w.sum() - 1, "jac": lambda w: uns}
+
+    # Ponto de partida viável: mínimos + sobra distribuída proporcionalmente à folga de cada ativo
+    folga = superior - inferior
+    inicial = inferior + (1 - inferior.sum()) * folga / folga.sum() if folga.sum() > 0 else inferior
+    minima = _resolver(cov, [soma_um], limites, inicial)
+    if minima is None:
+        raise ValueError("Otimização da carteira de variância mínima não convergiu")
+    maxima = _retorno_maximo(mu, inferior, superior)
+
+    alvos = np.linspace(mu @ minima, mu @ maxima, n_pontos)
+    pesos = [minima]
+    for alvo in alvos[1:]:
+        retorno_alvo = {"type": "eq", "fun": lambda w, a=alvo: w @ mu - a, "jac": lambda w: mu}
+        solucao = _resolver(cov, [soma_um, retorno_alvo], limites, pesos[-1])
+        if solucao is None:
+            solucao = _resolver(cov, [soma_um, retorno_alvo], limites, inicial)
+        if solucao is not None:
+            pesos.append(solucao)
+    # Recorte do ruído numérico nos limites e soma 1 de novo
+    pesos = np.clip(np.array(pesos), inferior, superior)
+    pesos /= pesos.sum(axis=1, keepdims=True)
+
+    retorno = pesos @ mu
+    volatilidade = np.sqrt(np.einsum("ij,jk,ik->i", pesos, cov, pesos))
+    sharpe = np.divide(retorno - taxa_risco_livre, volatilidade,
+                       out=np.zeros_like(retorno), where=volatilidade > 0)
+    return FronteiraExata(
+        pontos=pd.DataFrame({"Volatilidade": volatilidade, "Retorno": retorno, "Sharpe": sharpe}),
+        pesos=pd.DataFrame(pesos, columns=tickers),
+    )
+
+
+def melhor_sharpe(fronteira):
+    """Ponto de maior Sharpe da fronteira: Series (Volatilidade, Retorno, Sharpe, Pesos)."""
+    i = int(fronteira.pontos["Sharpe"].to_numpy().argmax())
+    return pd.Series({**fronteira.pontos.iloc[i].to_dict(), "Pesos": fronteira.pesos.iloc[i].rename(None)}, name=i)
+
+
+def pesos_para_retorno(fronteira, retorno):
+    """Carteira da fronteira com o retorno pedido (dentro da faixa traçada), por interpolação entre pontos vizinhos."""
+    retornos = fronteira.pontos["Retorno"].to_numpy()
+    retorno = float(np.clip(retorno, retornos[0], retornos[-1]))
+    # Entre dois pontos vizinhos a carteira ótima varia linearmente com o retorno-alvo
+    k = int(np.clip(np.searchsorted(retornos, retorno), 1, len(retornos) - 1))
+    t = 0.0 if retornos[k] == retornos[k - 1] else (retorno - retornos[k - 1]) / (retornos[k] - retornos[k - 1])
+    pesos = (1 - t) * fronteira.pesos.iloc[k - 1] + t * fronteira.pesos.iloc[k]
+    return pesos.rename(None)
+
+
+def pesos_para_volatilidade(fronteira, volatilidade):
+    """Carteira da fronteira de maior retorno com volatilidade até a pedida."""
+    volatilidades = np.maximum.accumulate(fronteira.pontos["Volatilidade"].to_numpy())
+    retornos = fronteira.pontos["Retorno"].to_numpy()
+    return pesos_para_retorno(fronteira, np.interp(volatilidade, volatilidades, retornos))
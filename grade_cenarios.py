@@ -0,0 +1,98 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import pontuacao_vetorizada as pv
+from matriz_setorial import compilar
+
+# Grade "what-if" de cenários macro
+# eixos: dict indicador -> níveis, na ordem das dimensões | cenario: índice em CENARIOS (formato da grade)
+# total: pontuação de classificar_cenario_macro | favor: formato da grade + (setor,) | setores: ordem da última dimensão
+GradeCenarios = namedtuple("GradeCenarios", ["eixos", "cenario", "total", "favor", "setores"])
+
+# Grade padrão: 100 Selic x 100 IPCA x 50 níveis de dólar
+EIXOS_PADRAO = {
+    "selic": np.round(np.linspace(2.0, 16.0, 100), 2),
+    "ipca": np.round(np.linspace(0.0, 10.0, 100), 2),
+    "dolar": np.round(np.linspace(4.0, 7.0, 50), 2),
+}
+
+
+def avaliar_grade(eixos, params, sensibilidade_setorial, fixos=None, dtype="float64"):
+    """
+    Avalia todos os pontos da grade de uma vez (mesmas regras de classificar_cenario_macro,
+    pontuar_macro e calcular_favorecimento_continuo).
+    eixos: dict indicador -> níveis (1D), ex. {"selic": [...], "ipca": [...], "dolar": [...]}.
+    fixos: valores dos indicadores fora dos eixos (ex.: o macro atual); ausente/None conta como sem dado.
+    sensibilidade_setorial: dict ou MatrizSetorial já compilada.
+    """
+    nomes = list(eixos)
+    desconhecidos = [n for n in nomes if n not in pv.INDICADORES]
+    if desconhecidos:
+        raise ValueError(f"Indicadores desconhecidos na grade: {desconhecidos}")
+    niveis = [np.asarray(eixos[n], dtype="float64").ravel() for n in nomes]
+    formato = tuple(len(n) for n in niveis)
+    # Malha esparsa: cada eixo fica com formato (1, ..., n, ..., 1) e o broadcasting monta a grade
+    malha = dict(zip(nomes, np.meshgrid(*niveis, indexing="ij", sparse=True)))
+    fixos = fixos or {}
+    valores = {k: malha[k] if k in malha else pv._array(fixos.get(k)) for k in pv.INDICADORES}
+
+    total = np.broadcast_to(pv.pontuacao_total_cenario(
+        params, valores["ipca"], valores["selic"], valores["dolar"], valores["pib"],
+        preco_soja=valores["soja"], preco_milho=valores["milho"],
+        preco_minerio=valores["minerio"], preco_petroleo=valores["petroleo"],
+    ), formato)
+    cenario = pv.classificar_cenario_codigos(total).astype(np.int8)
+
+    # Cada score depende só do seu eixo: soma primeiro as parcelas de mesmo formato (esparsas)
+    # e só no fim expande para a grade inteira, sem materializar (grade x fatores)
+    matriz = compilar(sensibilidade_setorial)
+    score = pv.pontuar_macro(valores, params)
+    parcelas = {}
+    for j, fator in enumerate(matriz.fatores):
+        parcela = np.asarray(score[fator])[..., None] * matriz.matriz[:, j]
+        parcelas[parcela.shape] = parcelas.get(parcela.shape, 0) + parcela
+    bruto = 0
+    for forma in sorted(parcelas, key=lambda f: np.prod(f)):
+        bruto = bruto + parcelas[forma]
+    favor = np.broadcast_to(bruto, formato + (len(matriz.setores),)).astype(dtype)
+    np.tanh(favor / 5, out=favor)
+    favor *= 2
+    eixos = {n: v for n, v in zip(nomes, niveis)}
+    return GradeCenarios(eixos, cenario, total, favor, matriz.setores)
+
+
+def rotulos_cenario(grade):
+    """Nome do cenário em cada ponto da grade (array de strings)."""
+    return np.asarray(pv.CENARIOS, dtype=object)[grade.cenario]
+
+
+def _indice_mais_proximo(niveis, valor):
+    return int(np.abs(niveis - valor).argmin())
+
+
+def tabela(grade, valor, linhas, colunas, **fixar):
+    """
+    Corte 2D da grade para mapa de calor: DataFrame (níveis de `linhas` x níveis de `colunas`).
+    valor: "cenario" (rótulos), "total" (pontuação) ou o nome de um setor (favorecimento).
+    fixar: nível de cada eixo restante (usa o nível mais próximo da grade); sem valor, o primeiro nível.
+    """
+    nomes = list(grade.eixos)
+    indice = []
+    for nome in nomes:
+        if nome in (linhas, colunas):
+            indice.append(slice(None))
+        else:
+            indice.append(_indice_mais_proximo(grade.eixos[nome], fixar.get(nome, grade.eixos[nome][0])))
+    if valor == "cenario":
+        dados = rotulos_cenario(grade)[tuple(indice)]
+    elif valor == "total":
+        dados = grade.total[tuple(indice)]
+    else:
+        dados = grade.favor[tuple(indice) + (list(grade.setores).index(valor),)]
+    if nomes.index(linhas) > nomes.index(colunas):
+        dados = dados.T
+    return pd.DataFrame(
+        dados,
+        index=pd.Index(grade.eixos[linhas], name=linhas),
+        columns=pd.Index(grade.eixos[colunas], name=colunas),
+    )
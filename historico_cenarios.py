@@ -0,0 +1,66 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import pontuacao_vetorizada as pv
+from matriz_setorial import compilar
+
+# Histórico compacto: uma linha por mês, sem repetir por ticker
+# macro: DataFrame (mês x indicador) | cenario: Series categórica por mês | favor: DataFrame (mês x setor)
+HistoricoCenarios = namedtuple("HistoricoCenarios", ["macro", "cenario", "favor"])
+
+
+def calcular_historico(macro_df, params, sensibilidade_setorial):
+    """
+    Pontua todos os meses de macro_df de uma vez (colunas ausentes equivalem a None).
+    sensibilidade_setorial pode ser o dict ou uma MatrizSetorial já compilada.
+    Mesmas regras de classificar_cenario_macro, pontuar_macro e calcular_favorecimento_continuo.
+    """
+    n = len(macro_df)
+    entradas = {
+        k: macro_df[k].to_numpy(dtype="float64") if k in macro_df else np.full(n, np.nan)
+        for k in pv.INDICADORES
+    }
+    total = pv.pontuacao_total_cenario(
+        params, entradas["ipca"], entradas["selic"], entradas["dolar"], entradas["pib"],
+        preco_soja=entradas["soja"], preco_milho=entradas["milho"],
+        preco_minerio=entradas["minerio"], preco_petroleo=entradas["petroleo"],
+    )
+    cenario = pd.Series(
+        pd.Categorical.from_codes(pv.classificar_cenario_codigos(total), categories=pv.CENARIOS),
+        index=macro_df.index, name="cenario",
+    )
+    matriz = compilar(sensibilidade_setorial)
+    scores = pv.matriz_scores(pv.pontuar_macro(entradas, params))
+    favor = pd.DataFrame(matriz.favorecimento(scores), index=macro_df.index, columns=list(matriz.setores))
+    return HistoricoCenarios(macro_df, cenario, favor)
+
+
+def favor_por_ticker(historico, tickers, setores_por_ticker):
+    """Matriz (mês x ticker) de favorecimento; setor ausente ou sem sensibilidade vale 0."""
+    tickers = list(tickers)
+    posicoes = historico.favor.columns.get_indexer([setores_por_ticker.get(t) for t in tickers])
+    # Coluna extra de zeros para os setores não encontrados (posição -1)
+    valores = np.hstack([historico.favor.to_numpy(), np.zeros((len(historico.favor), 1))])
+    return pd.DataFrame(valores[:, posicoes], index=historico.favor.index, columns=tickers)
+
+
+def expandir_para_tickers(historico, tickers, setores_por_ticker):
+    """
+    Formato longo (data, cenario, ticker, setor, favorecido), uma linha por mês x ticker,
+    na mesma ordem do histórico original. Cenário, ticker e setor são categóricos;
+    data segue como texto 'AAAA-MM-DD', como no histórico original.
+    """
+    tickers = list(tickers)
+    n_meses, n_tickers = len(historico.cenario), len(tickers)
+    codigos_ticker, nomes_ticker = pd.factorize(pd.Index(tickers))
+    codigos_setor, nomes_setor = pd.factorize(pd.Index([setores_por_ticker.get(t) for t in tickers], dtype=object))
+    favor = favor_por_ticker(historico, tickers, setores_por_ticker).to_numpy()
+    return pd.DataFrame({
+        "data": np.repeat(historico.cenario.index.strftime("%Y-%m-%d").to_numpy(dtype=object), n_tickers),
+        "cenario": pd.Categorical.from_codes(
+            np.repeat(historico.cenario.cat.codes.to_numpy(), n_tickers), categories=pv.CENARIOS
+        ),
+        "ticker": pd.Categorical.from_codes(np.tile(codigos_ticker, n_meses), categories=nomes_ticker),
+        "setor": pd.Categorical.from_codes(np.tile(codigos_setor, n_meses), categories=nomes_setor),
+        "favorecido": favor.ravel(),
+    })
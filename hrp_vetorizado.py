@@ -0,0 +1,60 @@
+from collections import namedtuple
+import numpy as np
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+
+# ordem: posições dos ativos (nas colunas de entrada) na ordem quase diagonal
+# pesos: peso HRP de cada ativo, alinhado a ordem (soma 1)
+PesosHRP = namedtuple("PesosHRP", ["ordem", "pesos"])
+
+
+def ordem_quase_diagonal(correlacao):
+    """
+    Ordem das folhas do agrupamento hierárquico (ligação simples, distância √((1 - ρ)/2)),
+    lida direto da árvore: a mesma ordem do antigo laço de quasi-diagonalização com Series.
+    """
+    correlacao = np.asarray(correlacao, dtype="float64")
+    # Arredondamento pode deixar ρ um pouco acima de 1 na diagonal: distância 0, não NaN
+    dist = np.sqrt(np.clip((1 - correlacao) / 2, 0, None))
+    return leaves_list(linkage(squareform(dist, checks=False), method="single"))
+
+
+def bissecao_recursiva(variancias):
+    """
+    Bissecção recursiva sobre as variâncias já na ordem quase diagonal. Cada cluster é dividido ao meio
+    e o peso de cada ativo é multiplicado pela sua paridade de inverso da variância dentro de cada
+    subcluster que o contém (como no HRP original deste app). Todos os clusters de um nível são
+    tratados de uma vez, como faixas contíguas [inicio, fim) do vetor: ~log2(n) passos vetorizados.
+    """
+    inversa = 1.0 / np.asarray(variancias, dtype="float64")
+    n = len(inversa)
+    pesos = np.ones(n)
+    # Zero no fim: reduceat aceita fim = n como índice
+    inversa_estendida = np.append(inversa, 0.0)
+    inicios, fins = np.array([0]), np.array([n])
+    while True:
+        divide = fins - inicios > 1
+        inicios, fins = inicios[divide], fins[divide]
+        if not len(inicios):
+            break
+        meios = (inicios + fins) // 2
+        inicios = np.column_stack([inicios, meios]).ravel()
+        fins = np.column_stack([meios, fins]).ravel()
+
+        # Soma dos inversos de cada subcluster (posições pares; as ímpares são os vãos entre faixas)
+        somas = np.add.reduceat(inversa_estendida, np.column_stack([inicios, fins]).ravel())[::2]
+        tamanhos = fins - inicios
+        deslocamento = np.repeat(inicios - (np.cumsum(tamanhos) - tamanhos), tamanhos)
+        posicoes = np.arange(tamanhos.sum()) + deslocamento
+        pesos[posicoes] *= inversa[posicoes] / np.repeat(somas, tamanhos)
+    return pesos / pesos.sum()
+
+
+def calcular_hrp(correlacao, cov):
+    """
+    Pesos HRP a partir da correlação e da covariância (arrays ou DataFrames, mesma ordem de ativos).
+    Só a diagonal da covariância entra na bissecção.
+    """
+    ordem = ordem_quase_diagonal(correlacao)
+    variancias = np.diag(np.asarray(cov, dtype="float64"))[ordem]
+    return PesosHRP(ordem, bissecao_recursiva(variancias))
@@ -0,0 +1,119 @@
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import provedor_dados
+
+# (conexão, leitura) em segundos
+TIMEOUT = (5, 30)
+TENTATIVAS = 3
+BACKOFF = 0.5
+FALHAS_PARA_ABRIR = 3
+ESPERA_CIRCUITO = 60.0
+# Últimas respostas válidas guardadas para quando o endpoint cair (as menos usadas saem primeiro)
+MAX_RESPOSTAS_GUARDADAS = 256
+
+
+class CircuitoAberto(requests.exceptions.ConnectionError):
+    """Endpoint marcado como fora do ar; nenhuma requisição é feita até o fim da espera."""
+
+
+def _criar_sessao():
+    sessao = requests.Session()
+    retry = Retry(
+        total=TENTATIVAS,
+        connect=TENTATIVAS,
+        read=TENTATIVAS,
+        backoff_factor=BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+
+_sessao = _criar_sessao()
+_lock = threading.Lock()
+_circuitos = {}       # host -> [falhas consecutivas, aberto_ate]
+_ultimas_respostas = OrderedDict()  # (url, params) -> última resposta válida, em ordem de uso
+
+
+def _chave(url, params):
+    return url, tuple(sorted((params or {}).items()))
+
+
+def _registrar(host, sucesso):
+    with _lock:
+        estado = _circuitos.setdefault(host, [0, 0.0])
+        if sucesso:
+            estado[0], estado[1] = 0, 0.0
+        else:
+            estado[0] += 1
+            if estado[0] >= FALHAS_PARA_ABRIR:
+                estado[1] = time.monotonic() + ESPERA_CIRCUITO
+
+
+def circuito_aberto(host):
+    with _lock:
+        estado = _circuitos.get(host)
+        return estado is not None and estado[1] > time.monotonic()
+
+
+def obter_json(url, params=None, timeout=TIMEOUT):
+    """
+    GET JSON via provedor_dados (que pode gravar ou reproduzir a resposta), ver _obter_json_rede.
+    """
+    return provedor_dados.json_http(lambda u, p: _obter_json_rede(u, p, timeout), url, params)
+
+
+def _obter_json_rede(url, params, timeout):
+    """
+    GET com sessão compartilhada (keep-alive), timeouts explícitos e retries com backoff exponencial.
+    Se o endpoint estiver fora do ar (ou o circuito do host estiver aberto), devolve a última
+    resposta válida da mesma consulta; sem resposta anterior, propaga o erro.
+    Respostas 4xx não contam como falha do endpoint e são propagadas como HTTPError.
+    """
+    host = urlsplit(url).netloc
+    chave = _chave(url, params)
+    try:
+        if circuito_aberto(host):
+            raise CircuitoAberto(f"Circuito aberto para {host}")
+        try:
+            resposta = _sessao.get(url, params=params, timeout=timeout)
+        except requests.exceptions.RequestException:
+            _registrar(host, False)
+            raise
+        if resposta.status_code >= 500 or resposta.status_code == 429:
+            _registrar(host, False)
+            resposta.raise_for_status()
+        _registrar(host, True)
+        resposta.raise_for_status()
+        dados = resposta.json()
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code < 500 and e.response.status_code != 429:
+            raise
+        return _ultima_resposta(chave, e)
+    except requests.exceptions.RequestException as e:
+        return _ultima_resposta(chave, e)
+    with _lock:
+        _ultimas_respostas[chave] = dados
+        _ultimas_respostas.move_to_end(chave)
+        while len(_ultimas_respostas) > MAX_RESPOSTAS_GUARDADAS:
+            _ultimas_respostas.popitem(last=False)
+    return dados
+
+
+def _ultima_resposta(chave, erro):
+    with _lock:
+        if chave in _ultimas_respostas:
+            print(f"Usando última resposta em cache para {chave[0]}: {erro}")
+            _ultimas_respostas.move_to_end(chave)
+            return _ultimas_respostas[chave]
+    raise erro
@@ -0,0 +1,68 @@
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+from pontuacao_vetorizada import FATORES
+
+
+class MatrizSetorial:
+    """
+    Sensibilidade setorial compilada em uma matriz densa (setores x fatores), com a ordem de FATORES.
+    O favorecimento de todos os setores (ou de todas as datas x setores) sai de um único produto
+    matricial seguido do tanh, com a mesma regra de calcular_favorecimento_continuo.
+    A matriz é uma cópia: alterações posteriores no dict de origem exigem compilar de novo.
+    """
+
+    def __init__(self, sensibilidade_setorial, fatores=FATORES):
+        self.fatores = tuple(fatores)
+        self.setores = tuple(sensibilidade_setorial)
+        self.matriz = np.array(
+            [[sensibilidade_setorial[s].get(f, 0.0) for f in self.fatores] for s in self.setores],
+            dtype="float64",
+        ).reshape(len(self.setores), len(self.fatores))
+        self.matriz.setflags(write=False)
+        self._posicao = {s: i for i, s in enumerate(self.setores)}
+
+    def vetor_scores(self, score_macro):
+        """dict/Mapping fator -> score (fatores ausentes valem 0) ou array (..., fatores) -> ndarray float64."""
+        if isinstance(score_macro, Mapping):
+            return np.array([score_macro.get(f, 0) for f in self.fatores], dtype="float64")
+        return np.asarray(score_macro, dtype="float64")
+
+    def bruto(self, score_macro):
+        """Soma ponderada sensibilidade x score por setor: (..., fatores) -> (..., setores)."""
+        return self.vetor_scores(score_macro) @ self.matriz.T
+
+    def favorecimento(self, score_macro):
+        """Favorecimento contínuo tanh(bruto/5)*2 de todos os setores: (..., fatores) -> (..., setores)."""
+        return np.tanh(self.bruto(score_macro) / 5) * 2
+
+    def favor_por_setor(self, score_macro):
+        """Favorecimento de todos os setores para um único conjunto de scores, como Series indexada por setor."""
+        return pd.Series(self.favorecimento(score_macro), index=list(self.setores))
+
+    def posicoes(self, setores):
+        """Linha de cada setor na matriz; -1 para setor ausente (None ou sem sensibilidade)."""
+        return np.array([self._posicao.get(s, -1) for s in setores], dtype=np.intp)
+
+    def por_item(self, valores_setor, setores):
+        """Seleciona, na última dimensão de valores_setor (..., setores), a coluna de cada item; ausentes valem 0."""
+        valores_setor = np.asarray(valores_setor, dtype="float64")
+        com_zero = np.concatenate([valores_setor, np.zeros(valores_setor.shape[:-1] + (1,))], axis=-1)
+        return com_zero[..., self.posicoes(setores)]
+
+    def favorecimento_setores(self, setores, score_macro):
+        """Favorecimento de cada setor da lista (ex.: setor de cada ticker); ausentes valem 0."""
+        return self.por_item(self.favorecimento(score_macro), setores)
+
+    def favorecimento_setor(self, setor, score_macro):
+        if setor not in self._posicao:
+            return 0
+        linha = self.matriz[self._posicao[setor]]
+        return float(np.tanh(self.vetor_scores(score_macro) @ linha / 5) * 2)
+
+
+def compilar(sensibilidade_setorial):
+    """Aceita o dict de sensibilidades ou uma MatrizSetorial já compilada."""
+    if isinstance(sensibilidade_setorial, MatrizSetorial):
+        return sensibilidade_setorial
+    return MatrizSetorial(sensibilidade_setorial)
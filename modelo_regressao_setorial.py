@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
+import provedor_dados
 import statsmodels.api as sm
 from dados_setoriais import setores_por_ticker
 
@@ -10,7 +10,7 @@ def filtrar_tickers_com_dados(tickers, periodo="2y", intervalo="1mo"):
     tickers_validos = []
     for ticker in tickers:
         try:
-            dados = yf.download(ticker, period=periodo, interval=intervalo, progress=False)
+            dados = provedor_dados.download(ticker, period=periodo, interval=intervalo, progress=False)
             if not dados.empty and (("Close" in dados.columns) or ("Adj Close" in dados.columns)):
                 tickers_validos.append(ticker)
         except Exception:
@@ -21,7 +21,7 @@ def baixar_dados_validos(tickers, period="2y", interval="1mo"):
     """Baixa dados do Yahoo Finance para tickers válidos, retorna DataFrame de preços de fechamento."""
     if not tickers:
         return pd.DataFrame()
-    dados = yf.download(tickers, period=period, interval=interval, group_by="ticker", auto_adjust=True, progress=False)
+    dados = provedor_dados.download(tickers, period=period, interval=interval, group_by="ticker", auto_adjust=True, progress=False)
     # Se for MultiIndex, pegar Close/Adj Close
     if isinstance(dados.columns, pd.MultiIndex):
         if "Close" in dados.columns.get_level_values(0):
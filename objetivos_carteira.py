@@ -0,0 +1,34 @@
+import numpy as np
+
+
+def sharpe_negativo(media_retorno, cov, taxa_risco_livre=0.0):
+    """
+    Objetivo -Sharpe com gradiente analítico, para minimize(..., jac=True).
+    S = (wᵀμ - rf) / σ, σ = √(wᵀΣw)  =>  ∇S = μ/σ - (wᵀμ - rf) Σw / σ³.
+    Carteira de volatilidade nula vale 0 (gradiente nulo), como nos objetivos originais.
+    """
+    mu = np.asarray(media_retorno, dtype="float64")
+    cov = np.asarray(cov, dtype="float64")
+
+    def objetivo(pesos):
+        sigma_w = cov @ pesos
+        variancia = pesos @ sigma_w
+        if variancia <= 0:
+            return 0.0, np.zeros_like(pesos)
+        vol = np.sqrt(variancia)
+        excesso = pesos @ mu - taxa_risco_livre
+        return -excesso / vol, -(mu / vol - excesso * sigma_w / (vol * variancia))
+
+    return objetivo
+
+
+def retorno_negativo(media_retorno):
+    """Objetivo -retorno esperado (linear) com gradiente constante, para minimize(..., jac=True)."""
+    mu = np.asarray(media_retorno, dtype="float64")
+    return lambda pesos: (-(pesos @ mu), -mu)
+
+
+def soma_um(n):
+    """Restrição de igualdade soma(w) = 1 com jacobiano constante."""
+    uns = np.ones(n)
+    return {"type": "eq", "fun": lambda pesos: pesos.sum() - 1, "jac": lambda pesos: uns}
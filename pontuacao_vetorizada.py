@@ -0,0 +1,164 @@
+import functools
+import numpy as np
+import pandas as pd
+
+# Ordem estável dos fatores macro (colunas da matriz de sensibilidade setorial)
+FATORES = (
+    "juros", "inflação", "dolar", "pib",
+    "commodities_agro", "commodities_minerio", "commodities_petroleo",
+)
+
+# Indicadores de entrada (chaves do dict macro)
+INDICADORES = ("ipca", "selic", "dolar", "pib", "soja", "milho", "minerio", "petroleo")
+
+CENARIOS = ["Expansão Forte", "Expansão Moderada", "Estável", "Contração Moderada", "Contração Forte"]
+LIMIARES_CENARIO = (38, 32, 26, 14)
+
+
+def _array(x):
+    """Converte escalar/lista/Series em ndarray float64 (None vira NaN)."""
+    if x is None:
+        return np.array(np.nan)
+    return np.asarray(x, dtype="float64")
+
+
+def _ideal(params, chave, padrao=None):
+    ideal = params.get(chave, padrao)
+    return np.nan if ideal is None else float(ideal)
+
+
+def _mesmo_formato(kernel):
+    """Series/DataFrame de entrada voltam como Series/DataFrame com o mesmo índice; o resto vira ndarray."""
+    @functools.wraps(kernel)
+    def envolvido(x, *args, **kwargs):
+        resultado = kernel(x, *args, **kwargs)
+        if isinstance(x, pd.Series):
+            return pd.Series(resultado, index=x.index, name=x.name)
+        if isinstance(x, pd.DataFrame):
+            return pd.DataFrame(resultado, index=x.index, columns=x.columns)
+        return resultado
+    return envolvido
+
+
+# ==================== KERNELS DE PONTUAÇÃO ====================
+# Mesmas regras (e mesmos resultados) das funções escalares pontuar_* do HRPMACRO.py,
+# aplicadas a escalares, arrays, Series ou grades de qualquer formato. NaN/None pontua 0.
+
+@_mesmo_formato
+def pontuar_ipca(ipca, params):
+    x = _array(ipca)
+    meta, tolerancia = params["ipca_meta"], params["ipca_tolerancia"]
+    # O ramo "abaixo da banda" da versão escalar é inalcançável: abaixo da banda já cai em "<= teto + 1"
+    return np.select(
+        [np.isnan(x), (meta - tolerancia <= x) & (x <= meta + tolerancia), x <= meta + tolerancia + 1],
+        [0.0, 10.0, 5.0],
+        default=0.0,
+    )
+
+
+@_mesmo_formato
+def pontuar_selic(selic, params):
+    x = _array(selic)
+    neutra = params["selic_neutra"]
+    return np.select(
+        [np.isnan(x), np.abs(x - neutra) <= 0.5, (x > neutra) & (x <= neutra + 2), x > neutra + 2],
+        [0.0, 10.0, 4.0, 0.0],
+        default=6.0,
+    )
+
+
+@_mesmo_formato
+def pontuar_dolar(dolar, params):
+    x = _array(dolar)
+    score = np.clip(10 - np.abs(x - params["dolar_ideal"]) * 2, 0, None)
+    return np.where(np.isnan(x), 0.0, score)
+
+
+@_mesmo_formato
+def pontuar_pib(pib, params=None):
+    x = _array(pib)
+    ideal = 2.0
+    # Acima do ideal o bruto é >= 8 e abaixo é < 8: um único clip em [0, 10] cobre os dois ramos
+    bruto = np.where(x >= ideal, 8 + (x - ideal) * 2, 8 - (ideal - x) * 3)
+    return np.where(np.isnan(x), 0.0, np.clip(bruto, 0, 10))
+
+
+def _pontuar_desvio(x, ideal, fator):
+    x = _array(x)
+    if np.isnan(ideal):
+        return np.zeros(x.shape)
+    score = np.clip(10 - np.abs(x - ideal) * fator, 0, None)
+    return np.where(np.isnan(x), 0.0, score)
+
+
+@_mesmo_formato
+def pontuar_soja(soja, params):
+    return _pontuar_desvio(soja, _ideal(params, "soja_ideal", 13.0), 1.5)
+
+
+@_mesmo_formato
+def pontuar_milho(milho, params):
+    return _pontuar_desvio(milho, _ideal(params, "milho_ideal", 5.5), 2)
+
+
+@_mesmo_formato
+def pontuar_minerio(minerio, params):
+    return _pontuar_desvio(minerio, _ideal(params, "minerio_ideal"), 0.1)
+
+
+@_mesmo_formato
+def pontuar_petroleo(petroleo, params):
+    return _pontuar_desvio(petroleo, _ideal(params, "petroleo_ideal"), 0.2)
+
+
+# ==================== AGREGADOS ====================
+
+def _validar(x):
+    # Mesmo efeito de validar_macro: ausente/NaN vira 0.0 antes de pontuar
+    x = _array(x)
+    return np.where(np.isnan(x), 0.0, x)
+
+
+def pontuar_macro(m, params, pesos=None):
+    """
+    Versão vetorizada de pontuar_macro: m mapeia indicador -> array (todos com formato compatível).
+    Retorna dict fator -> array, incluindo 'media_global'; se m for um DataFrame, um DataFrame com o mesmo índice.
+    """
+    v = {k: _validar(m.get(k)) for k in INDICADORES}
+    score = {
+        "juros": pontuar_selic(v["selic"], params),
+        "inflação": pontuar_ipca(v["ipca"], params),
+        "dolar": pontuar_dolar(v["dolar"], params),
+        "pib": pontuar_pib(v["pib"]),
+        "commodities_agro": (pontuar_soja(v["soja"], params) + pontuar_milho(v["milho"], params)) / 2,
+        "commodities_minerio": pontuar_minerio(v["minerio"], params),
+        "commodities_petroleo": pontuar_petroleo(v["petroleo"], params),
+    }
+    pesos = pesos or {k: 1 for k in score}
+    total_peso = sum(pesos.values())
+    score["media_global"] = sum(score[k] * pesos.get(k, 1) for k in FATORES) / total_peso
+    if isinstance(m, pd.DataFrame):
+        return pd.DataFrame(score, index=m.index)
+    return score
+
+
+def pontuacao_total_cenario(params, ipca, selic, dolar, pib, preco_soja=None, preco_milho=None,
+                            preco_minerio=None, preco_petroleo=None):
+    """Pontuação usada por classificar_cenario_macro (4 indicadores + 0.1x commodities)."""
+    core = (pontuar_ipca(ipca, params) + pontuar_selic(selic, params)
+            + pontuar_dolar(dolar, params) + pontuar_pib(pib))
+    commodities = 0.1 * (pontuar_soja(preco_soja, params) + pontuar_milho(preco_milho, params)
+                         + pontuar_minerio(preco_minerio, params) + pontuar_petroleo(preco_petroleo, params))
+    return core + commodities
+
+
+def classificar_cenario_codigos(total_score):
+    """Índice em CENARIOS para cada pontuação total."""
+    return np.searchsorted(-np.asarray(LIMIARES_CENARIO, dtype="float64"), -np.asarray(total_score), side="left")
+
+
+# ==================== MATRIZ DE SCORES ====================
+
+def matriz_scores(score):
+    """Empilha o dict de scores em array (..., n_fatores) na ordem de FATORES."""
+    return np.stack([np.asarray(score[f], dtype="float64") for f in FATORES], axis=-1)
@@ -0,0 +1,127 @@
+"""
+Camada única de acesso a dados externos (Yahoo Finance, BCB/SGS e Olinda/Focus).
+
+Modos (variável de ambiente HRPMACRO_MODO_DADOS):
+- "rede" (padrão): acessa a rede normalmente;
+- "gravar": acessa a rede e grava cada resposta no pacote de fixtures (HRPMACRO_FIXTURES);
+- "reproduzir": responde apenas a partir do pacote de fixtures, sem nenhum acesso à rede.
+
+No modo "reproduzir" a data de hoje fica congelada na data da gravação, para que as
+mesmas consultas (que dependem da data) encontrem as mesmas respostas. Para execuções
+reprodutíveis, aponte também HRPMACRO_CACHE_DIR para um diretório vazio.
+"""
+import os
+import json
+import pickle
+import hashlib
+import datetime
+import threading
+
+MODO = os.environ.get("HRPMACRO_MODO_DADOS", "rede").lower()
+DIRETORIO_FIXTURES = os.environ.get(
+    "HRPMACRO_FIXTURES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+)
+ARQUIVO_MANIFESTO = os.path.join(DIRETORIO_FIXTURES, "manifesto.json")
+
+_lock = threading.Lock()
+_manifesto = None
+
+
+class FixtureAusente(LookupError):
+    """Consulta sem resposta gravada no pacote de fixtures (modo reproduzir)."""
+
+
+def _carregar_manifesto():
+    global _manifesto
+    if _manifesto is None:
+        if os.path.exists(ARQUIVO_MANIFESTO):
+            with open(ARQUIVO_MANIFESTO, encoding="utf-8") as f:
+                _manifesto = json.load(f)
+        else:
+            _manifesto = {"data_gravacao": datetime.date.today().isoformat(), "consultas": {}}
+    return _manifesto
+
+
+def hoje():
+    """Data de referência: a real, ou a data da gravação no modo reproduzir."""
+    if MODO == "reproduzir":
+        return datetime.date.fromisoformat(_carregar_manifesto()["data_gravacao"])
+    return datetime.date.today()
+
+
+def _normalizar(valor):
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor]
+    if isinstance(valor, dict):
+        return {str(k): _normalizar(v) for k, v in sorted(valor.items())}
+    return str(valor)
+
+
+def _chave(tipo, *args, **kwargs):
+    descricao = json.dumps([tipo, _normalizar(args), _normalizar(kwargs)], ensure_ascii=False)
+    return f"{tipo}_{hashlib.sha1(descricao.encode('utf-8')).hexdigest()[:20]}", descricao
+
+
+def _consultar(tipo, funcao, *args, **kwargs):
+    if MODO == "rede":
+        return funcao(*args, **kwargs)
+    chave, descricao = _chave(tipo, *args, **kwargs)
+    arquivo = os.path.join(DIRETORIO_FIXTURES, f"{chave}.pkl")
+    if MODO == "reproduzir":
+        if not os.path.exists(arquivo):
+            raise FixtureAusente(f"Sem fixture para {descricao}")
+        with open(arquivo, "rb") as f:
+            return pickle.load(f)
+
+    resultado = funcao(*args, **kwargs)
+    with _lock:
+        os.makedirs(DIRETORIO_FIXTURES, exist_ok=True)
+        with open(arquivo, "wb") as f:
+            pickle.dump(resultado, f)
+        manifesto = _carregar_manifesto()
+        manifesto["consultas"][chave] = descricao
+        with open(ARQUIVO_MANIFESTO, "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=1)
+    return resultado
+
+
+# ========= YAHOO FINANCE ==========
+
+# yfinance é importado só no primeiro acesso à rede, para manter a importação dos módulos leve
+
+def _download(tickers, **kwargs):
+    import yfinance as yf
+    return yf.download(tickers, **kwargs)
+
+
+def download(tickers, **kwargs):
+    """Equivalente a yf.download(tickers, **kwargs)."""
+    return _consultar("yf_download", _download, tickers, **kwargs)
+
+
+def _historico(ticker, **kwargs):
+    import yfinance as yf
+    return yf.Ticker(ticker).history(**kwargs)
+
+
+def historico(ticker, **kwargs):
+    """Equivalente a yf.Ticker(ticker).history(**kwargs)."""
+    return _consultar("yf_historico", _historico, ticker, **kwargs)
+
+
+def _info(ticker):
+    import yfinance as yf
+    return yf.Ticker(ticker).info
+
+
+def info(ticker):
+    """Equivalente a yf.Ticker(ticker).info."""
+    return _consultar("yf_info", _info, ticker)
+
+
+# ========= HTTP (BCB / OLINDA) ==========
+
+def json_http(funcao, url, params=None):
+    """Resposta JSON de um GET; funcao(url, params) faz o acesso real à rede."""
+    return _consultar("http", funcao, url, params)
@@ -0,0 +1,123 @@
+import os
+import json
+import threading
+import pandas as pd
+import requests
+import provedor_dados
+from armazenamento_precos import DIRETORIO_CACHE
+from http_cliente import obter_json
+
+URL_SGS = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{codigo}/dados"
+DIRETORIO_SGS = os.path.join(DIRETORIO_CACHE, "sgs")
+# A API do SGS limita consultas de séries diárias a janelas de 10 anos
+JANELA_MAXIMA = pd.DateOffset(years=10, days=-1)
+
+_locks = {}
+_lock_global = threading.Lock()
+
+
+def _lock_serie(codigo):
+    with _lock_global:
+        return _locks.setdefault(codigo, threading.Lock())
+
+
+def _caminhos(codigo):
+    base = os.path.join(DIRETORIO_SGS, str(codigo))
+    return f"{base}.parquet", f"{base}.json"
+
+
+def _ler(codigo):
+    arquivo, arquivo_meta = _caminhos(codigo)
+    if not (os.path.exists(arquivo) and os.path.exists(arquivo_meta)):
+        return pd.Series(dtype="float64", name="valor"), {}
+    with open(arquivo_meta) as f:
+        meta = json.load(f)
+    return pd.read_parquet(arquivo)["valor"], meta
+
+
+def _salvar(codigo, serie, meta):
+    os.makedirs(DIRETORIO_SGS, exist_ok=True)
+    arquivo, arquivo_meta = _caminhos(codigo)
+    serie.to_frame("valor").to_parquet(f"{arquivo}.tmp")
+    os.replace(f"{arquivo}.tmp", arquivo)
+    with open(f"{arquivo_meta}.tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(f"{arquivo_meta}.tmp", arquivo_meta)
+
+
+def _parse(dados):
+    """Converte o JSON do SGS em Series float64 indexada por data, sem laços por linha."""
+    if not isinstance(dados, list) or not dados:
+        return pd.Series(dtype="float64", name="valor")
+    df = pd.DataFrame(dados)
+    datas = pd.to_datetime(df["data"], format="%d/%m/%Y")
+    valores = pd.to_numeric(df["valor"].str.replace(",", ".", regex=False), errors="coerce")
+    return pd.Series(valores.to_numpy("float64"), index=pd.DatetimeIndex(datas, name="data"), name="valor")
+
+
+def _baixar_janela(codigo, inicio, final):
+    """Baixa [inicio, final] quebrando em janelas que respeitam o limite da API."""
+    partes = []
+    atual = inicio
+    while atual <= final:
+        fim_janela = min(atual + JANELA_MAXIMA, final)
+        params = {
+            "formato": "json",
+            "dataInicial": atual.strftime("%d/%m/%Y"),
+            "dataFinal": fim_janela.strftime("%d/%m/%Y"),
+        }
+        try:
+            partes.append(_parse(obter_json(URL_SGS.format(codigo=codigo), params=params)))
+        except requests.exceptions.HTTPError as e:
+            # 404 indica janela sem observações; qualquer outro status é falha real
+            if e.response is None or e.response.status_code != 404:
+                raise
+        atual = fim_janela + pd.Timedelta(days=1)
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.Series(dtype="float64", name="valor")
+    return pd.concat(partes)
+
+
+def obter_serie_sgs(codigo, inicio, final):
+    """
+    Série SGS do BCB entre inicio e final (datas ou strings dd/mm/aaaa), servida do armazenamento local.
+    Apenas as janelas ainda não cobertas são baixadas; a ponta final é reconsultada no máximo uma vez por dia.
+    """
+    inicio = pd.to_datetime(inicio, dayfirst=True).normalize()
+    final = pd.to_datetime(final, dayfirst=True).normalize()
+    hoje = pd.Timestamp(provedor_dados.hoje())
+    with _lock_serie(codigo):
+        serie, meta = _ler(codigo)
+        coberto_ini = pd.Timestamp(meta["inicio"]) if meta else None
+        coberto_fim = pd.Timestamp(meta["final"]) if meta else None
+        verificado = pd.Timestamp(meta["verificado_em"]) if meta else None
+
+        janelas = []
+        if coberto_ini is None:
+            janelas.append((inicio, final))
+        else:
+            if inicio < coberto_ini:
+                janelas.append((inicio, coberto_ini - pd.Timedelta(days=1)))
+            if final > coberto_fim or (final >= coberto_fim and verificado < hoje):
+                # Reabre a partir do último dado salvo: observações recentes podem ser revisadas
+                ultimo = serie.index.max() if not serie.empty else coberto_fim
+                janelas.append((min(ultimo, coberto_fim), final))
+
+        if janelas:
+            try:
+                novos = [_baixar_janela(codigo, a, b) for a, b in janelas]
+            except Exception as e:
+                print(f"Falha ao atualizar série SGS {codigo}, usando cópia local: {e}")
+                novos = []
+            else:
+                serie = pd.concat([serie] + [n for n in novos if not n.empty])
+                serie = serie[~serie.index.duplicated(keep="last")].sort_index()
+                meta = {
+                    "inicio": str(min(inicio, coberto_ini) if coberto_ini is not None else inicio),
+                    "final": str(max(final, coberto_fim) if coberto_fim is not None else final),
+                    "verificado_em": str(hoje),
+                }
+                _salvar(codigo, serie, meta)
+
+    return serie.loc[inicio:final]
@@ -0,0 +1,184 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pontuacao_vetorizada as pv
+from matriz_setorial import compilar
+
+# Indicadores simulados e forma da variação mensal: diferença em p.p. ou log-retorno
+VARIAVEIS = {"selic": "diferenca", "ipca": "diferenca", "dolar": "log", "petroleo": "log"}
+HORIZONTE = 12
+TAMANHO_LOTE = 5000
+
+# probabilidades: DataFrame (mês x cenário) | favor_medio: DataFrame (mês x setor)
+# favor_final: array (trajetória x setor) no último mês do horizonte
+SimulacaoMacro = namedtuple(
+    "SimulacaoMacro", ["probabilidades", "favor_medio", "favor_final", "setores", "n_trajetorias", "metodo"]
+)
+
+
+def ipca_12_meses(ipca_mensal):
+    """IPCA acumulado em 12 meses (%) a partir da variação mensal (%), como a série 433 do SGS."""
+    fator = np.log1p(ipca_mensal.astype("float64") / 100)
+    return np.expm1(fator.rolling(12).sum()) * 100
+
+
+def niveis_simulados(macro_mensal):
+    """
+    Indicadores na unidade em que são simulados e pontuados. O IPCA do histórico (montar_macro_mensal) é a
+    variação mensal; a simulação usa o acumulado em 12 meses, a mesma unidade anual da expectativa do Focus
+    (o macro atual) e das faixas de pontuar_ipca.
+    """
+    niveis = macro_mensal.copy()
+    if "ipca" in niveis:
+        niveis["ipca"] = ipca_12_meses(niveis["ipca"])
+    return niveis
+
+
+def variacoes_mensais(macro_mensal):
+    """Variações mensais conjuntas (uma linha por mês) das variáveis simuladas com histórico (ver niveis_simulados)."""
+    macro_mensal = niveis_simulados(macro_mensal)
+    colunas = {}
+    for nome, forma in VARIAVEIS.items():
+        if nome not in macro_mensal or macro_mensal[nome].isna().all():
+            continue
+        serie = macro_mensal[nome].astype("float64")
+        colunas[nome] = np.log(serie).diff() if forma == "log" else serie.diff()
+    return pd.DataFrame(colunas).dropna()
+
+
+def _ajustar_var(variacoes):
+    """
+    VAR(1) nas variações por mínimos quadrados: d_t = c + A d_{t-1} + e_t. Retorna (c, A, resíduos).
+    Exige A estável (raio espectral < 1): um VAR explosivo faria as trajetórias divergirem no horizonte.
+    """
+    y, x = variacoes[1:], variacoes[:-1]
+    regressores = np.hstack([np.ones((len(x), 1)), x])
+    coeficientes, *_ = np.linalg.lstsq(regressores, y, rcond=None)
+    residuos = y - regressores @ coeficientes
+    a = coeficientes[1:].T
+    raio = np.abs(np.linalg.eigvals(a)).max()
+    if not raio < 1:
+        raise ValueError(f"VAR(1) instável no histórico (raio espectral {raio:.3f}); use o bootstrap")
+    return coeficientes[0], a, residuos
+
+
+def _gerar_variacoes(rng, n, horizonte, variacoes, metodo, bloco, var):
+    """(n, horizonte, k) variações simuladas; os sorteios são de linhas inteiras, preservando a correlação."""
+    if metodo == "bootstrap":
+        # Bootstrap em blocos de meses consecutivos (preserva também a autocorrelação de curto prazo)
+        n_blocos = -(-horizonte // bloco)
+        inicios = rng.integers(0, len(variacoes) - bloco + 1, size=(n, n_blocos))
+        indices = (inicios[..., None] + np.arange(bloco)).reshape(n, -1)[:, :horizonte]
+        return variacoes[indices]
+    # VAR(1) com resíduos reamostrados, partindo da última variação observada
+    c, a, residuos = var
+    saida = np.empty((n, horizonte, variacoes.shape[1]))
+    anterior = np.broadcast_to(variacoes[-1], (n, variacoes.shape[1]))
+    for h in range(horizonte):
+        anterior = c + anterior @ a.T + residuos[rng.integers(0, len(residuos), size=n)]
+        saida[:, h] = anterior
+    return saida
+
+
+def _simular_lote(semente, n, contexto):
+    rng = np.random.default_rng(semente)
+    nomes, inicial = contexto["nomes"], contexto["inicial"]
+    variacoes = _gerar_variacoes(
+        rng, n, contexto["horizonte"], contexto["variacoes"], contexto["metodo"], contexto["bloco"], contexto["var"]
+    )
+    acumulado = np.cumsum(variacoes, axis=1)
+    niveis = {}
+    for j, nome in enumerate(nomes):
+        if VARIAVEIS[nome] == "log":
+            niveis[nome] = inicial[j] * np.exp(acumulado[..., j])
+        else:
+            niveis[nome] = inicial[j] + acumulado[..., j]
+    if "selic" in niveis:
+        niveis["selic"] = np.maximum(niveis["selic"], 0.0)
+
+    valores = {k: niveis[k] if k in niveis else pv._array(contexto["fixos"].get(k)) for k in pv.INDICADORES}
+    total = pv.pontuacao_total_cenario(
+        contexto["params"], valores["ipca"], valores["selic"], valores["dolar"], valores["pib"],
+        preco_soja=valores["soja"], preco_milho=valores["milho"],
+        preco_minerio=valores["minerio"], preco_petroleo=valores["petroleo"],
+    )
+    horizonte = contexto["horizonte"]
+    codigos = np.broadcast_to(pv.classificar_cenario_codigos(total), (n, horizonte))
+    contagens = np.bincount(
+        (codigos + len(pv.CENARIOS) * np.arange(horizonte)).ravel(), minlength=horizonte * len(pv.CENARIOS)
+    ).reshape(horizonte, len(pv.CENARIOS))
+
+    score = pv.pontuar_macro(valores, contexto["params"])
+    scores = np.stack([np.broadcast_to(score[f], (n, horizonte)) for f in pv.FATORES], axis=-1)
+    favor = contexto["matriz"].favorecimento(scores)
+    return contagens, favor.sum(axis=0), favor[:, -1].astype("float32")
+
+
+def simular_cenarios(macro_mensal, params, sensibilidade_setorial, n_trajetorias=20000, horizonte=HORIZONTE,
+                     metodo="bootstrap", bloco=3, inicial=None, fixos=None, semente=None, max_workers=None):
+    """
+    Simula trajetórias macro mensais a partir da dinâmica conjunta do histórico (macro_mensal, como em
+    montar_macro_mensal, com IPCA mensal) e as classifica mês a mês com as mesmas regras de classificar_cenario_macro.
+    O IPCA é simulado como acumulado em 12 meses (ver niveis_simulados).
+    metodo: "bootstrap" (blocos de variações mensais observadas) ou "var" (VAR(1) com resíduos reamostrados;
+    ValueError se o VAR estimado for instável).
+    inicial: valores de partida, IPCA anual como no Focus (padrão: último mês do histórico); fixos: indicadores
+    não simulados (padrão: último valor do histórico, ou ausente). Os lotes rodam numa pool de threads, que só
+    se sobrepõem onde o NumPy libera o GIL; cada lote tem semente derivada de `semente`, então o resultado
+    não depende do número de threads.
+    """
+    if metodo not in ("bootstrap", "var"):
+        raise ValueError(f"Método de simulação desconhecido: {metodo}")
+    variacoes = variacoes_mensais(macro_mensal)
+    if len(variacoes) < max(bloco, 2) + 1:
+        raise ValueError("Histórico macro insuficiente para simular")
+    nomes = list(variacoes.columns)
+    ultimo = niveis_simulados(macro_mensal).ffill().iloc[-1]
+    inicial = dict(inicial or {})
+    contexto = {
+        "nomes": nomes,
+        "inicial": np.array([float(ultimo[n] if inicial.get(n) is None else inicial[n]) for n in nomes]),
+        "variacoes": variacoes.to_numpy(),
+        "var": _ajustar_var(variacoes.to_numpy()) if metodo == "var" else None,
+        "metodo": metodo,
+        "bloco": bloco,
+        "horizonte": horizonte,
+        "params": dict(params),
+        "matriz": compilar(sensibilidade_setorial),
+        "fixos": {
+            k: (fixos or {}).get(k, ultimo[k] if k in ultimo.index and pd.notna(ultimo[k]) else None)
+            for k in pv.INDICADORES if k not in nomes
+        },
+    }
+
+    tamanhos = [TAMANHO_LOTE] * (n_trajetorias // TAMANHO_LOTE)
+    if n_trajetorias % TAMANHO_LOTE:
+        tamanhos.append(n_trajetorias % TAMANHO_LOTE)
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        lotes = list(executor.map(lambda a: _simular_lote(*a, contexto), zip(sementes, tamanhos)))
+
+    meses = pd.RangeIndex(1, horizonte + 1, name="mes")
+    contagens = sum(l[0] for l in lotes)
+    setores = contexto["matriz"].setores
+    return SimulacaoMacro(
+        probabilidades=pd.DataFrame(contagens / n_trajetorias, index=meses, columns=pv.CENARIOS),
+        favor_medio=pd.DataFrame(sum(l[1] for l in lotes) / n_trajetorias, index=meses, columns=list(setores)),
+        favor_final=np.concatenate([l[2] for l in lotes]),
+        setores=setores,
+        n_trajetorias=n_trajetorias,
+        metodo=metodo,
+    )
+
+
+def quantis_favor(simulacao, quantis=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """Distribuição do favorecimento por setor no fim do horizonte: média e quantis (setor x estatística)."""
+    tabela = pd.DataFrame(
+        np.quantile(simulacao.favor_final, quantis, axis=0).T,
+        index=list(simulacao.setores),
+        columns=[f"p{int(q * 100)}" for q in quantis],
+    )
+    tabela.insert(0, "media", simulacao.favor_final.mean(axis=0))
+    return tabela
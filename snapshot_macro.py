@@ -0,0 +1,152 @@
+import copy
+import json
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+import numpy as np
+
+
+def _normalizar(valor):
+    # Números viram float; NaN vira None (mesmo tratamento de "sem dado" da pontuação)
+    if valor is None:
+        return None
+    if isinstance(valor, (bool, np.bool_)):
+        return bool(valor)
+    if isinstance(valor, (int, float, np.integer, np.floating)):
+        valor = float(valor)
+        return None if valor != valor else valor
+    return valor
+
+
+class MacroSnapshot(Mapping):
+    """
+    Estado macro imutável (indicador -> valor). Funciona como dict para leitura (macro["selic"], macro.get(...)),
+    mas não aceita alteração: use substituir(...) para obter um novo snapshot.
+    A chave (sha1 do conteúdo) é estável entre execuções e processos, e serve de chave de cache.
+    """
+
+    __slots__ = ("_valores", "_chave")
+
+    def __init__(self, valores=(), **outros):
+        itens = dict(valores, **outros)
+        object.__setattr__(self, "_valores", {k: _normalizar(v) for k, v in sorted(itens.items())})
+        conteudo = json.dumps(list(self._valores.items()), ensure_ascii=False, default=repr)
+        object.__setattr__(self, "_chave", hashlib.sha1(conteudo.encode("utf-8")).hexdigest())
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("MacroSnapshot é imutável; use substituir()")
+
+    def __delattr__(self, nome):
+        raise AttributeError("MacroSnapshot é imutável")
+
+    def __getitem__(self, chave):
+        return self._valores[chave]
+
+    def __iter__(self):
+        return iter(self._valores)
+
+    def __len__(self):
+        return len(self._valores)
+
+    def __hash__(self):
+        return int(self._chave[:16], 16)
+
+    def __eq__(self, outro):
+        if isinstance(outro, MacroSnapshot):
+            return self._chave == outro._chave
+        return Mapping.__eq__(self, outro)
+
+    def __repr__(self):
+        return f"MacroSnapshot({self._valores!r})"
+
+    def __reduce__(self):
+        return (MacroSnapshot, (self._valores,))
+
+    @property
+    def chave(self):
+        """Hash de conteúdo (hex), estável entre execuções."""
+        return self._chave
+
+    def substituir(self, **novos):
+        """Novo snapshot com os valores informados trocados (o original não muda)."""
+        return MacroSnapshot(self._valores, **novos)
+
+    def como_dict(self):
+        return dict(self._valores)
+
+
+def congelar(macro):
+    """Snapshot a partir de dict/Mapping (um MacroSnapshot é devolvido sem cópia)."""
+    return macro if isinstance(macro, MacroSnapshot) else MacroSnapshot(macro)
+
+
+class _NaoHashavel(Exception):
+    pass
+
+
+def _chave_argumento(valor):
+    if isinstance(valor, MacroSnapshot):
+        return valor
+    if isinstance(valor, Mapping):
+        return ("mapa", tuple(sorted((str(k), _chave_argumento(v)) for k, v in valor.items())))
+    if isinstance(valor, (list, tuple)):
+        return ("seq", tuple(_chave_argumento(v) for v in valor))
+    if isinstance(valor, (float, np.floating)) or valor is None:
+        return _normalizar(valor)
+    try:
+        hash(valor)
+    except TypeError:
+        raise _NaoHashavel
+    return valor
+
+
+def _chave(valor):
+    # Caminho rápido: argumentos já hasheáveis entram na chave sem conversão
+    try:
+        hash(valor)
+        return valor
+    except TypeError:
+        return _chave_argumento(valor)
+
+
+def memoizar(maxsize=64, dependencias=None, exigir_snapshot=True, copiar=copy.deepcopy):
+    """
+    Memoiza funções chamadas com MacroSnapshot (e demais argumentos congeláveis: dicts, listas, números).
+    Chamadas sem snapshot (se exigir_snapshot), ou com argumentos não congeláveis, executam normalmente sem cache.
+    dependencias: função sem argumentos cujo retorno também entra na chave (ex.: estado de PARAMS, data de hoje).
+    O resultado em cache é copiado a cada acesso (copiar; ex.: dict para resultados rasos),
+    para que quem chama possa alterá-lo sem efeito colateral.
+    """
+    def decorador(funcao):
+        cache = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            argumentos = list(args) + list(kwargs.values())
+            if exigir_snapshot and not any(isinstance(a, MacroSnapshot) for a in argumentos):
+                return funcao(*args, **kwargs)
+            try:
+                chave = (
+                    _chave(args),
+                    _chave(tuple(sorted(kwargs.items()))),
+                    _chave(dependencias() if dependencias else None),
+                )
+            except _NaoHashavel:
+                return funcao(*args, **kwargs)
+            with lock:
+                if chave in cache:
+                    cache.move_to_end(chave)
+                    return copiar(cache[chave])
+            resultado = funcao(*args, **kwargs)
+            with lock:
+                cache[chave] = resultado
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return copiar(resultado)
+
+        envolvida.cache_clear = lambda: cache.clear()
+        return envolvida
+    return decorador
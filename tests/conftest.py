@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do app ficam soltos na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import referencia as ref
+
+
+@pytest.fixture(scope="session")
+def hrp():
+    """
+    O app (HRPMACRO.py; importar não faz I/O) com PARAMS fixado: os ideais das commodities,
+    que viriam das médias móveis de 12 meses, são trocados por valores fixos até o fim da sessão.
+    """
+    import HRPMACRO
+    original = dict(HRPMACRO.PARAMS)
+    HRPMACRO.PARAMS.update(ref.IDEAIS_COMMODITIES)
+    yield HRPMACRO
+    HRPMACRO.PARAMS.clear()
+    HRPMACRO.PARAMS.update(original)
@@ -0,0 +1,49 @@
+"""
+Apoio dos testes de paridade. As regras escalares vêm do próprio HRPMACRO.py (fixture hrp do conftest);
+aqui ficam os valores fixos que lá viriam da rede, os dados sintéticos e o HRP anterior do app,
+que foi substituído pelo hrp_vetorizado e não existe mais no HRPMACRO.py.
+"""
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage
+from scipy.spatial.distance import squareform
+
+# Ideais fixos das commodities (no app vêm das médias móveis de 12 meses)
+IDEAIS_COMMODITIES = {"soja_ideal": 10.5, "milho_ideal": 4.2, "minerio_ideal": 105.0, "petroleo_ideal": 75.0}
+
+
+def hrp_pandas(correlacao, cov_df):
+    """HRP original do otimizar_carteira_hrp (Series do pandas, fatiamento por rótulo), com pesos float."""
+    link = linkage(squareform(np.sqrt((1 - correlacao) / 2).values, checks=False), method="single")
+    link = link.astype(int)
+    sort_ix = pd.Series([link[-1, 0], link[-1, 1]])
+    num_items = link[-1, 3]
+    while sort_ix.max() >= num_items:
+        sort_ix.index = range(0, sort_ix.shape[0] * 2, 2)
+        df0 = sort_ix[sort_ix >= num_items]
+        i = df0.index
+        j = df0.values - num_items
+        sort_ix[i] = link[j, 0]
+        df1 = pd.Series(link[j, 1], index=i + 1)
+        sort_ix = pd.concat([sort_ix, df1]).sort_index()
+    ordenados = [cov_df.columns[i] for i in sort_ix]
+    w = pd.Series(1.0, index=ordenados)
+    cluster_items = [ordenados]
+    while len(cluster_items) > 0:
+        cluster_items = [i[j:k] for i in cluster_items
+                         for j, k in ((0, len(i) // 2), (len(i) // 2, len(i))) if len(i) > 1]
+        for c_items in cluster_items:
+            inv_diag = 1. / np.diag(cov_df.loc[c_items, c_items].values)
+            parity_w = inv_diag / inv_diag.sum()
+            w[c_items] *= parity_w * parity_w.sum()
+    return w / w.sum()
+
+
+def retornos_sinteticos(n_ativos, n_dias=1500, semente=0, n_setores=12):
+    """Retornos diários com fator de mercado e fatores setoriais (DataFrame dias x ativos)."""
+    rng = np.random.default_rng(semente)
+    setores = rng.integers(0, n_setores, n_ativos)
+    retornos = (rng.normal(0, 0.01, (n_dias, n_setores))[:, setores]
+                + rng.normal(0.0004, 0.015, (n_dias, n_ativos))
+                + rng.normal(0, 0.008, (n_dias, 1)))
+    return pd.DataFrame(retornos, columns=[f"A{i}.SA" for i in range(n_ativos)])
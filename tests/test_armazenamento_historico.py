@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import armazenamento_historico as ah
+from historico_cenarios import calcular_historico
+
+INICIO = "2015-01-01"
+DATAS = pd.date_range("2015-01-31", "2025-12-31", freq="ME")
+_rng = np.random.default_rng(0)
+MACRO = pd.DataFrame({
+    "selic": np.clip(10 + np.cumsum(_rng.normal(0, 0.4, len(DATAS))), 2, None),
+    "ipca": np.clip(4 + np.cumsum(_rng.normal(0, 0.3, len(DATAS))), -1, None),
+    "dolar": 4.5 * np.exp(np.cumsum(_rng.normal(0, 0.03, len(DATAS)))),
+    "pib": 2 + _rng.normal(0, 1, len(DATAS)),
+    "petroleo": 70 * np.exp(np.cumsum(_rng.normal(0, 0.08, len(DATAS)))),
+}, index=DATAS)
+
+
+def montar_macro(hoje):
+    """Como montar_macro_mensal: meses de inicio até hoje; o IPCA do mês corrente ainda não saiu."""
+    def montar(inicio, anterior):
+        meses = MACRO.loc[pd.Timestamp(inicio):pd.Timestamp(hoje) + pd.offsets.MonthEnd(0)].copy()
+        meses.iloc[-1:, meses.columns.get_loc("ipca")] = np.nan
+        if anterior is not None:
+            meses = pd.concat([anterior.iloc[-1:], meses]).ffill().iloc[1:]
+        return meses.ffill()
+    return montar
+
+
+@pytest.fixture
+def atualizar(hrp, tmp_path, monkeypatch):
+    monkeypatch.setattr(ah, "DIRETORIO_HISTORICO", str(tmp_path / "historico"))
+    montagens = []
+
+    def atualizar(hoje, params=None, nome="teste"):
+        params = dict(hrp.PARAMS, **(params or {}))
+
+        def montar(inicio, anterior):
+            meses = montar_macro(hoje)(inicio, anterior)
+            montagens.append(len(meses))
+            return meses
+
+        return ah.atualizar_historico(
+            nome, INICIO, montar, lambda macro_df: calcular_historico(macro_df, params, hrp.matriz_setorial),
+            ah.impressao_digital(sorted(params.items())), hoje=hoje,
+        )
+    atualizar.montagens = montagens
+    return atualizar
+
+
+def reconstruir(hrp, hoje, params=None):
+    params = dict(hrp.PARAMS, **(params or {}))
+    return calcular_historico(montar_macro(hoje)(pd.Timestamp(INICIO), None), params, hrp.matriz_setorial)
+
+
+def assert_iguais(obtido, esperado):
+    pd.testing.assert_frame_equal(obtido.macro, esperado.macro, check_freq=False)
+    pd.testing.assert_series_equal(obtido.cenario, esperado.cenario, check_freq=False)
+    pd.testing.assert_frame_equal(obtido.favor, esperado.favor, check_freq=False)
+
+
+def test_marca_dagua():
+    assert ah.marca_dagua("2025-06-15") == pd.Timestamp("2025-04-30")
+    assert ah.marca_dagua("2025-01-02") == pd.Timestamp("2024-11-30")
+
+
+def test_incremental_igual_a_reconstrucao_na_virada_do_mes(hrp, atualizar):
+    for hoje in ["2025-05-20", "2025-05-31", "2025-06-01", "2025-06-15", "2025-08-03"]:
+        assert_iguais(atualizar(hoje), reconstruir(hrp, hoje))
+    # Depois da carga inicial, só os meses após a marca d'água salva são montados de novo
+    assert atualizar.montagens[0] == len(MACRO.loc[:"2025-05"])
+    assert atualizar.montagens[1:] == [2, 3, 2, 4]
+
+
+def test_impressao_digital_mudou_repontua_os_meses_salvos(hrp, atualizar):
+    atualizar("2025-06-15")
+    novos = {"selic_neutra": 9.0, "dolar_ideal": 5.0}
+    atualizado = atualizar("2025-06-20", params=novos)
+    assert_iguais(atualizado, reconstruir(hrp, "2025-06-20", params=novos))
+    # Repontuados a partir dos indicadores salvos: nenhum mês fechado foi montado de novo
+    assert atualizar.montagens[-1] == 2
+    assert not atualizado.cenario.equals(reconstruir(hrp, "2025-06-20").cenario)
+
+
+def test_data_de_referencia_antes_da_marca_dagua(hrp, atualizar):
+    # Como no modo reproduzir: a data congelada é anterior à última atualização salva
+    atualizar("2025-08-03")
+    assert_iguais(atualizar("2025-03-10"), reconstruir(hrp, "2025-03-10"))
+    assert_iguais(atualizar("2025-08-03"), reconstruir(hrp, "2025-08-03"))
+
+
+def test_inicio_diferente_refaz_tudo(hrp, atualizar):
+    atualizar("2025-06-15")
+    historico = ah.atualizar_historico(
+        "teste", "2020-01-01", montar_macro("2025-06-15"),
+        lambda macro_df: calcular_historico(macro_df, hrp.PARAMS, hrp.matriz_setorial),
+        ah.impressao_digital(sorted(hrp.PARAMS.items())), hoje="2025-06-15",
+    )
+    assert historico.macro.index[0] == pd.Timestamp("2020-01-31")
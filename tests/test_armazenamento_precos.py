@@ -0,0 +1,76 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import armazenamento_precos as ap
+
+DATAS = pd.bdate_range("2024-03-01", periods=12)
+
+
+def barras(datas, close, fator=1.0):
+    close = np.asarray(close, dtype="float64")
+    return pd.DataFrame({"Close": close, "Adj Close": close * fator}, index=pd.DatetimeIndex(datas, name="Date"))
+
+
+SALVO = barras(DATAS[:10], np.linspace(10, 19, 10), fator=0.9)
+
+
+def test_provento_reescala_o_historico():
+    # Novo provento: o Adj Close de todas as barras sobrepostas cai na mesma razão
+    novo = barras(DATAS[5:], np.r_[np.linspace(15, 19, 5), 20, 21], fator=0.9 * 0.98)
+    mesclado = ap._mesclar(SALVO, novo)
+    assert mesclado.index.equals(DATAS)
+    np.testing.assert_allclose(mesclado["Adj Close"].iloc[:5], SALVO["Adj Close"].iloc[:5] * 0.98)
+    np.testing.assert_allclose(mesclado["Close"], np.r_[np.linspace(10, 19, 10), 20, 21])
+
+
+def test_desdobramento_reescala_close_e_adj_close():
+    novo = barras(DATAS[5:], np.r_[np.linspace(15, 19, 5), 20, 21] / 2, fator=0.9)
+    mesclado = ap._mesclar(SALVO, novo)
+    np.testing.assert_allclose(mesclado["Close"].iloc[:5], SALVO["Close"].iloc[:5] / 2)
+    np.testing.assert_allclose(mesclado["Adj Close"].iloc[:5], SALVO["Adj Close"].iloc[:5] / 2)
+
+
+def test_barra_isolada_diferente_nao_reescala():
+    # Só a última barra salva mudou (barra parcial salva durante o pregão): ela é substituída, o resto fica
+    close = np.r_[np.linspace(15, 19, 5), 20, 21]
+    close[4] = 19.4
+    novo = barras(DATAS[5:], close, fator=0.9)
+    mesclado = ap._mesclar(SALVO, novo)
+    pd.testing.assert_frame_equal(mesclado.iloc[:9], SALVO.iloc[:9], check_freq=False)
+    assert mesclado["Close"].iloc[9] == 19.4
+
+
+def test_uma_barra_sobreposta_nao_reescala():
+    novo = barras(DATAS[9:], [19.5, 20, 21], fator=0.9)
+    mesclado = ap._mesclar(SALVO, novo)
+    pd.testing.assert_frame_equal(mesclado.iloc[:9], SALVO.iloc[:9], check_freq=False)
+    assert mesclado["Close"].iloc[9] == 19.5
+
+
+def test_atualizacao_sobrepoe_barras_e_ignora_a_de_hoje(tmp_path, monkeypatch):
+    monkeypatch.setattr(ap, "DIRETORIO_PRECOS", str(tmp_path))
+    hoje = DATAS[-1].date()
+    monkeypatch.setattr(ap.provedor_dados, "hoje", lambda: hoje)
+    ap._salvar_precos("ABCD3.SA", SALVO)
+    ontem = datetime.datetime.combine(hoje - datetime.timedelta(days=3), datetime.time()).timestamp()
+    os.utime(ap._caminho_ticker("ABCD3.SA"), (ontem, ontem))
+
+    pedidos = []
+
+    def download(tickers, start, **kwargs):
+        pedidos.append(start)
+        # Inclui a barra de hoje, ainda em formação
+        return barras(DATAS[DATAS >= pd.Timestamp(start)], np.linspace(15, 21, 7), fator=0.9)
+
+    monkeypatch.setattr(ap.provedor_dados, "download", download)
+    ap.atualizar_precos(["ABCD3.SA"])
+
+    assert pedidos == [DATAS[10 - ap.BARRAS_SOBREPOSTAS].strftime("%Y-%m-%d")]
+    salvo = ap.ler_precos_locais("ABCD3.SA")
+    assert salvo.index.max() == DATAS[-2]
+    assert salvo["Close"].iloc[-1] == pytest.approx(20.0)
+    pd.testing.assert_frame_equal(salvo.iloc[:5], SALVO.iloc[:5], check_freq=False)
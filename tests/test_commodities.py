@@ -0,0 +1,20 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import commodities
+
+
+def test_media_movel_usa_12_meses(monkeypatch):
+    monkeypatch.setattr(commodities.provedor_dados, "hoje", lambda: datetime.date(2025, 6, 16))
+    # Fechamento diário constante em cada mês, igual ao número do mês desde jan/2024 (1, 2, ...)
+    dias = pd.bdate_range("2024-01-01", "2025-06-16")
+    valores = (dias.year - 2024) * 12 + dias.month
+    diario = pd.DataFrame({"ZS=F": valores.astype("float64"), "BZ=F": np.nan}, index=dias)
+
+    medias = commodities.medias_moveis_12m(diario)
+    # jul/2024 (7) a jun/2025 (18), mês corrente incluído
+    assert medias["ZS=F"] == pytest.approx(np.mean(np.arange(7, 19)))
+    assert medias["BZ=F"] is None
@@ -0,0 +1,94 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.covariance import LedoitWolf
+
+import referencia as ref
+from contexto_carteira import ContextoCarteira
+
+DATA = datetime.date(2025, 6, 16)
+
+
+def precos_sinteticos():
+    retornos = ref.retornos_sinteticos(6, n_dias=600, semente=11)
+    precos = 20 * np.exp(retornos.cumsum())
+    precos.index = pd.bdate_range("2023-01-02", periods=600)
+    # Lacunas: um ticker que começa depois e feriados isolados
+    precos.iloc[:40, 4] = np.nan
+    precos.iloc[[100, 250], 1] = np.nan
+    return precos
+
+
+PRECOS = precos_sinteticos()
+
+
+@pytest.fixture
+def carregador():
+    chamadas = []
+
+    def carregar(tickers):
+        chamadas.append(list(tickers))
+        return PRECOS[tickers]
+    carregar.chamadas = chamadas
+    return carregar
+
+
+@pytest.fixture
+def contexto(carregador):
+    return ContextoCarteira(list(PRECOS.columns), carregador, DATA)
+
+
+def test_retornos_iguais_ao_calculo_inline(contexto):
+    pd.testing.assert_frame_equal(contexto.retornos, PRECOS.pct_change().dropna())
+    preenchidos = PRECOS.ffill().bfill()
+    pd.testing.assert_frame_equal(contexto.retornos_log, np.log(preenchidos / preenchidos.shift(1)).dropna())
+
+
+def test_media_e_covariancias_iguais_ao_calculo_inline(contexto):
+    retornos = PRECOS.pct_change().dropna()
+    pd.testing.assert_series_equal(contexto.media, retornos.mean() * 252)
+    pd.testing.assert_frame_equal(contexto.cov, retornos.cov() * 252)
+    pd.testing.assert_frame_equal(contexto.correlacao, retornos.corr())
+    np.testing.assert_allclose(contexto.cholesky @ contexto.cholesky.T, contexto.cov.to_numpy(), atol=1e-12)
+    # Otimizadores de Sharpe e de retorno: Ledoit-Wolf dos retornos log sobre preços preenchidos
+    preenchidos = PRECOS.ffill().bfill()
+    log = np.log(preenchidos / preenchidos.shift(1)).dropna()
+    np.testing.assert_array_equal(contexto.cov_encolhida_log, LedoitWolf().fit(log).covariance_)
+
+
+def test_completo_igual_ao_hrp_inline(contexto, carregador):
+    # HRP: só tickers sem lacunas, retornos simples e Ledoit-Wolf
+    dados = PRECOS.dropna(axis=1, how="any")
+    completo = contexto.completo
+    assert completo.tickers == tuple(dados.columns)
+    retornos = dados.pct_change().dropna()
+    pd.testing.assert_frame_equal(completo.retornos, retornos)
+    pd.testing.assert_frame_equal(completo.correlacao, retornos.corr())
+    np.testing.assert_array_equal(completo.cov_encolhida, LedoitWolf().fit(retornos).covariance_)
+    assert len(carregador.chamadas) == 1
+
+
+def test_subconjunto_reaproveita_os_precos(contexto, carregador):
+    parte = contexto.subconjunto(["A4.SA", "A0.SA", "A4.SA"])
+    assert parte.tickers == ("A4.SA", "A0.SA")
+    pd.testing.assert_frame_equal(parte.precos, PRECOS[["A4.SA", "A0.SA"]].dropna(how="all"))
+    pd.testing.assert_frame_equal(parte.retornos, PRECOS[["A4.SA", "A0.SA"]].pct_change().dropna())
+    assert len(carregador.chamadas) == 1
+    # Ticker fora dos preços carregados: novo contexto, carregado à parte
+    fora = contexto.subconjunto("NOVO3.SA")
+    assert fora.tickers == ("NOVO3.SA",) and "precos" not in vars(fora)
+
+
+def test_igualdade_e_hash(carregador):
+    a = ContextoCarteira(["A0.SA", "A1.SA", "A0.SA"], carregador, DATA)
+    b = ContextoCarteira(("A0.SA", "A1.SA"), lambda tickers: None, DATA)
+    assert a == b and hash(a) == hash(b)
+    assert {a: 1}[b] == 1
+    assert a != ContextoCarteira(["A0.SA", "A1.SA"], carregador, DATA + datetime.timedelta(days=1))
+    assert a != ContextoCarteira(["A1.SA", "A0.SA"], carregador, DATA)
+    assert ContextoCarteira("A0.SA", carregador, DATA).tickers == ("A0.SA",)
+    assert a != ("A0.SA", "A1.SA")
+    # Nada é carregado para comparar
+    assert carregador.chamadas == []
@@ -0,0 +1,66 @@
+import datetime
+import threading
+
+import pandas as pd
+import pytest
+
+import cotacoes
+
+HOJE = datetime.date(2025, 6, 16)
+
+
+@pytest.fixture
+def baixar(monkeypatch):
+    """_baixar_cotacoes falso: registra os pedidos e se o lock estava livre durante o download."""
+    monkeypatch.setattr(cotacoes, "_cache", {})
+    monkeypatch.setattr(cotacoes, "_sessao_cache", None)
+    monkeypatch.setattr(cotacoes, "sessao_atual", lambda: HOJE)
+    pedidos = []
+
+    def baixar_cotacoes(tickers):
+        pedidos.append((list(tickers), cotacoes._lock.locked()))
+        return {t: (None, 30.0) if t == "FALHA3.SA" else (10.0, cotacoes._FALHA if t == "SEMALVO3.SA" else 12.0)
+                for t in tickers}
+
+    monkeypatch.setattr(cotacoes, "_baixar_cotacoes", baixar_cotacoes)
+    return pedidos
+
+
+def test_download_fora_do_lock_e_cache(baixar):
+    tabela = cotacoes.obter_cotacoes(["ABCD3.SA", "FALHA3.SA", "SEMALVO3.SA"])
+    assert tabela.loc["ABCD3.SA"].tolist() == [10.0, 12.0]
+    assert pd.isna(tabela.loc["SEMALVO3.SA", "preco_alvo"])
+    cotacoes.obter_cotacoes(["ABCD3.SA", "FALHA3.SA", "SEMALVO3.SA"])
+    # O download nunca segura o lock; falhas são tentadas de novo, o resto vem do cache
+    assert baixar == [(["ABCD3.SA", "FALHA3.SA", "SEMALVO3.SA"], False), (["FALHA3.SA", "SEMALVO3.SA"], False)]
+
+
+def test_download_lento_nao_bloqueia_outra_sessao(baixar, monkeypatch):
+    cotacoes.obter_cotacoes(["ABCD3.SA"])
+    liberar, iniciado = threading.Event(), threading.Event()
+    rapido = cotacoes._baixar_cotacoes
+
+    def lento(tickers):
+        iniciado.set()
+        liberar.wait(5)
+        return rapido(tickers)
+
+    monkeypatch.setattr(cotacoes, "_baixar_cotacoes", lento)
+    outra = threading.Thread(target=cotacoes.obter_cotacoes, args=(["LENT3.SA"],))
+    outra.start()
+    assert iniciado.wait(5)
+    # Com o download da outra sessão em andamento, o que já está em cache sai na hora
+    assert cotacoes.obter_cotacoes(["ABCD3.SA"]).loc["ABCD3.SA", "preco_atual"] == 10.0
+    liberar.set()
+    outra.join(5)
+    assert "LENT3.SA" in cotacoes._cache
+
+
+def test_pregao_virou_durante_o_download(baixar, monkeypatch):
+    def baixar_e_virar(tickers):
+        monkeypatch.setattr(cotacoes, "_sessao_cache", HOJE + datetime.timedelta(days=1))
+        return {t: (10.0, 12.0) for t in tickers}
+
+    monkeypatch.setattr(cotacoes, "_baixar_cotacoes", baixar_e_virar)
+    assert cotacoes.obter_cotacoes(["ABCD3.SA"]).loc["ABCD3.SA", "preco_atual"] == 10.0
+    assert cotacoes._cache == {}
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+# Exportadoras, bancos e um ticker sem setor mapeado
+COTACOES = pd.DataFrame({
+    "preco_atual": [60.0, 35.0, 30.0, 10.0, 20.0],
+    "preco_alvo": [75.0, 40.0, 45.0, 9.0, None],
+}, index=["VALE3.SA", "PRIO3.SA", "ITUB4.SA", "XPTO3.SA", "BBAS3.SA"])
+MACRO = {"selic": 10.5, "ipca": 4.2, "dolar": 5.6, "pib": 2.1, "soja": 11.0, "milho": 4.0, "minerio": 98.0,
+         "petroleo": 80.0}
+
+
+@pytest.fixture
+def filtrar(hrp, monkeypatch):
+    monkeypatch.setattr(hrp, "obter_cotacoes", lambda tickers: COTACOES.loc[list(tickers)])
+
+    def filtrar(macro, calcular_score=hrp.calcular_score):
+        return hrp.filtrar_ativos_validos(list(COTACOES.index), hrp.setores_por_ticker, hrp.setores_por_cenario,
+                                          macro, calcular_score)
+    return filtrar
+
+
+@pytest.mark.parametrize("ausente", ["dolar", "pib", "petroleo"])
+@pytest.mark.parametrize("lote", [True, False])
+def test_indicador_ausente_vale_zero(hrp, filtrar, ausente, lote):
+    # Sem o indicador (None), o resultado é o mesmo de informá-lo como 0.0, como no laço original
+    incompleto = dict(MACRO, **{ausente: None})
+    if lote:
+        calcular_score = hrp.calcular_score
+    else:
+        # Outra função de score: passa pelo laço por ticker em vez de calcular_scores_universo
+        def calcular_score(*args, **kwargs):
+            return hrp.calcular_score(*args, **kwargs)
+
+    ativos = filtrar(incompleto, calcular_score)
+    esperado = filtrar(dict(MACRO, **{ausente: 0.0}), calcular_score)
+
+    assert incompleto[ausente] is None
+    assert [a["ticker"] for a in ativos] == [a["ticker"] for a in esperado]
+    assert len(ativos) == 4
+    for ativo, referencia in zip(ativos, esperado):
+        assert np.isfinite(ativo["favorecido"]) and np.isfinite(ativo["score"])
+        assert ativo["favorecido"] == pytest.approx(referencia["favorecido"], abs=1e-12)
+        assert ativo["score"] == pytest.approx(referencia["score"], abs=1e-12)
+        assert ativo["cenario"] == referencia["cenario"]
+
+
+def test_igual_ao_score_por_ticker(hrp, filtrar):
+    incompleto = dict(MACRO, dolar=None, pib=None)
+    zerado = dict(MACRO, dolar=0.0, pib=0.0)
+    for ativo in filtrar(incompleto):
+        favorecido = hrp.calcular_favorecimento_continuo(ativo["setor"], zerado)
+        score = hrp.calcular_score(ativo["preco_atual"], ativo["preco_alvo"], favorecido, ativo["ticker"],
+                                   ativo["setor"], zerado)
+        assert ativo["favorecido"] == pytest.approx(favorecido, abs=1e-12)
+        assert ativo["score"] == pytest.approx(score, abs=1e-12)
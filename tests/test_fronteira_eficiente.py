@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import referencia as ref
+from fronteira_eficiente import (AMOSTRADORES, PONTOS_GRAFICO, TOP_K, criar_amostrador, fator_risco,
+                                 metricas_lote, nao_dominados, simular_fronteira)
+
+RETORNOS = ref.retornos_sinteticos(15, n_dias=2500, semente=3)
+MEDIA, COV = RETORNOS.mean() * 252, RETORNOS.cov() * 252
+
+
+def test_fator_risco_reconstroi_a_covariancia():
+    fator = fator_risco(COV)
+    np.testing.assert_allclose(fator @ fator.T, COV.to_numpy(), atol=1e-12)
+    # Covariância singular (ativo duplicado): cai no fator por autovalores
+    singular = np.ones((3, 3))
+    fator = fator_risco(singular)
+    np.testing.assert_allclose(fator @ fator.T, singular, atol=1e-9)
+
+
+def test_metricas_iguais_a_formula_direta():
+    pesos = np.random.default_rng(0).dirichlet(np.ones(15), 100)
+    retorno, volatilidade, sharpe = metricas_lote(pesos, MEDIA.to_numpy(), fator_risco(COV), 0.01)
+    vol = np.sqrt(np.einsum("ij,jk,ik->i", pesos, COV.to_numpy(), pesos))
+    np.testing.assert_allclose(retorno, pesos @ MEDIA.to_numpy(), rtol=1e-12)
+    np.testing.assert_allclose(volatilidade, vol, rtol=1e-12)
+    np.testing.assert_allclose(sharpe, (retorno - 0.01) / vol, rtol=1e-12)
+
+
+def test_fluxo_igual_a_guardar_todas_as_carteiras():
+    # Mesmo sorteio em lotes, com todas as carteiras guardadas: top-k, Pareto e melhor Sharpe
+    n, lote = 20000, 1500
+    fronteira = simular_fronteira(MEDIA, COV, n, taxa_risco_livre=0.01, tamanho_lote=lote, semente=2)
+    gerador = np.random.default_rng(2)
+    todos = []
+    for inicio in range(0, n, lote):
+        pesos = gerador.random((min(lote, n - inicio), 15))
+        pesos /= pesos.sum(axis=1, keepdims=True)
+        todos.append(pesos)
+        # Mesmos sorteios do reservatório, para manter a sequência do gerador
+        posicao = inicio + np.arange(len(pesos))
+        gerador.integers(0, posicao[posicao >= PONTOS_GRAFICO] + 1)
+    todos = np.vstack(todos)
+    ret = todos @ MEDIA.to_numpy()
+    vol = np.sqrt(np.einsum("ij,jk,ik->i", todos, COV.to_numpy(), todos))
+    sharpe = (ret - 0.01) / vol
+    ordem = np.argsort(-sharpe, kind="stable")[:TOP_K]
+
+    assert (fronteira.topo.index == ordem).all()
+    np.testing.assert_allclose(fronteira.topo["Sharpe"], sharpe[ordem], rtol=1e-12)
+    np.testing.assert_allclose(fronteira.pesos_topo.to_numpy(), todos[ordem])
+    np.testing.assert_allclose(fronteira.pareto["Volatilidade"], vol[nao_dominados(vol, ret)], rtol=1e-12)
+    assert fronteira.melhor.name == ordem[0]
+    assert len(fronteira.pontos) == PONTOS_GRAFICO and fronteira.n_simuladas == n
+    assert list(fronteira.pesos_topo.columns) == list(MEDIA.index)
+
+
+def test_nao_dominados():
+    vol = np.array([1.0, 2.0, 2.0, 3.0, 1.5])
+    ret = np.array([1.0, 3.0, 2.0, 2.5, 0.5])
+    assert sorted(nao_dominados(vol, ret).tolist()) == [0, 1]
+
+
+@pytest.mark.parametrize("nome", AMOSTRADORES)
+def test_amostradores_geram_carteiras_validas(nome):
+    amostrar = criar_amostrador(nome, 8, np.random.default_rng(0))
+    pesos = amostrar(1024)
+    assert pesos.shape == (1024, 8)
+    assert (pesos >= 0).all()
+    np.testing.assert_allclose(pesos.sum(axis=1), 1.0)
+
+
+def test_amostrador_desconhecido():
+    with pytest.raises(ValueError):
+        criar_amostrador("grade", 8, np.random.default_rng(0))
+
+
+def test_parada_antecipada():
+    fronteira = simular_fronteira(MEDIA, COV, 1_000_000, amostrador="cantos", semente=1, parar_apos=20000)
+    assert fronteira.n_simuladas < 1_000_000
+    assert fronteira.melhor["Sharpe"] == fronteira.topo["Sharpe"].iloc[0]
+
+
+def test_fator_precalculado_da_o_mesmo_resultado():
+    a = simular_fronteira(MEDIA, COV, 5000, semente=4)
+    b = simular_fronteira(MEDIA, COV, 5000, semente=4, fator=fator_risco(COV))
+    pd.testing.assert_frame_equal(a.topo, b.topo)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+import referencia as ref
+from fronteira_eficiente import simular_fronteira
+from fronteira_exata import melhor_sharpe, pesos_para_retorno, pesos_para_volatilidade, tracar_fronteira
+
+RETORNOS = ref.retornos_sinteticos(12, n_dias=2500, semente=5)
+MEDIA, COV = RETORNOS.mean() * 252, RETORNOS.cov() * 252
+LIMITES = [(0.0, 1.0)] * 12
+
+
+@pytest.fixture(scope="module")
+def fronteira():
+    return tracar_fronteira(MEDIA, COV, LIMITES, n_pontos=40)
+
+
+def test_pontos_viaveis_e_ordenados(fronteira):
+    pesos = fronteira.pesos.to_numpy()
+    np.testing.assert_allclose(pesos.sum(axis=1), 1.0, atol=1e-9)
+    assert (pesos >= -1e-12).all()
+    assert np.all(np.diff(fronteira.pontos["Retorno"].to_numpy()) >= -1e-9)
+    assert list(fronteira.pesos.columns) == list(MEDIA.index)
+
+
+def test_nenhuma_carteira_sorteada_acima_da_curva(fronteira):
+    mc = simular_fronteira(MEDIA, COV, 100_000, amostrador="cantos", semente=1)
+    curva = np.interp(mc.pareto["Volatilidade"], fronteira.pontos["Volatilidade"], fronteira.pontos["Retorno"])
+    dentro = mc.pareto["Volatilidade"] <= fronteira.pontos["Volatilidade"].iloc[-1]
+    assert np.all(mc.pareto["Retorno"][dentro] <= curva[dentro] + 1e-9)
+    assert melhor_sharpe(fronteira)["Sharpe"] >= mc.melhor["Sharpe"] - 1e-6
+
+
+def test_limites_por_ativo_respeitados():
+    limites = [(0.02, 0.2)] * 12
+    fronteira = tracar_fronteira(MEDIA, COV, limites, n_pontos=20)
+    pesos = fronteira.pesos.to_numpy()
+    assert pesos.min() >= 0.02 - 1e-9 and pesos.max() <= 0.2 + 1e-9
+    np.testing.assert_allclose(pesos.sum(axis=1), 1.0, atol=1e-9)
+
+
+def test_limites_inviaveis():
+    with pytest.raises(ValueError):
+        tracar_fronteira(MEDIA, COV, [(0.0, 0.05)] * 12)
+
+
+def test_interpolacao(fronteira):
+    retornos = fronteira.pontos["Retorno"]
+    meio = (retornos.iloc[10] + retornos.iloc[11]) / 2
+    pesos = pesos_para_retorno(fronteira, meio)
+    assert pesos @ MEDIA.to_numpy() == pytest.approx(meio, rel=1e-9)
+    assert pesos.sum() == pytest.approx(1.0)
+    maxima = pesos_para_volatilidade(fronteira, 10.0)
+    np.testing.assert_allclose(maxima.to_numpy(), fronteira.pesos.iloc[-1].to_numpy())
+
+
+def test_pontos_sem_convergencia_ficam_fora(monkeypatch):
+    import fronteira_exata
+    resolver = fronteira_exata._resolver
+    chamadas = []
+
+    def falha_em_alguns(cov, restricoes, limites, inicial):
+        chamadas.append(len(restricoes))
+        # Falha (nas duas tentativas) nos alvos de número 5 a 9
+        alvo = sum(1 for r in chamadas if r == 2)
+        if len(restricoes) == 2 and 10 <= alvo <= 19:
+            return None
+        return resolver(cov, restricoes, limites, inicial)
+
+    monkeypatch.setattr(fronteira_exata, "_resolver", falha_em_alguns)
+    fronteira = tracar_fronteira(MEDIA, COV, LIMITES, n_pontos=20)
+    assert len(fronteira.pontos) == 15
+    np.testing.assert_allclose(fronteira.pesos.sum(axis=1), 1.0)
+    assert np.isfinite(melhor_sharpe(fronteira)["Sharpe"])
+
+
+def test_variancia_minima_sem_convergencia(monkeypatch):
+    import fronteira_exata
+    monkeypatch.setattr(fronteira_exata, "_resolver", lambda *args: None)
+    with pytest.raises(ValueError):
+        tracar_fronteira(MEDIA, COV, LIMITES)
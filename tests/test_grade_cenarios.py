@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from grade_cenarios import avaliar_grade, rotulos_cenario, tabela
+
+EIXOS = {
+    "selic": np.round(np.linspace(2.0, 16.0, 30), 2),
+    "ipca": np.round(np.linspace(0.0, 10.0, 25), 2),
+    "dolar": np.round(np.linspace(4.0, 7.0, 12), 2),
+}
+FIXOS = {"pib": 2.1, "soja": 11.0, "milho": None, "minerio": 98.0, "petroleo": 80.0}
+
+
+@pytest.fixture(scope="module")
+def grade(hrp):
+    return avaliar_grade(EIXOS, hrp.PARAMS, hrp.sensibilidade_setorial, FIXOS)
+
+
+def test_formatos(hrp, grade):
+    assert grade.cenario.shape == (30, 25, 12)
+    assert grade.favor.shape == (30, 25, 12, len(hrp.sensibilidade_setorial))
+
+
+def test_pontos_iguais_as_funcoes_escalares(hrp, grade):
+    rng = np.random.default_rng(0)
+    rotulos = rotulos_cenario(grade)
+    for _ in range(300):
+        i, j, k = (int(rng.integers(len(v))) for v in grade.eixos.values())
+        macro = dict(FIXOS, selic=grade.eixos["selic"][i], ipca=grade.eixos["ipca"][j], dolar=grade.eixos["dolar"][k])
+        assert rotulos[i, j, k] == hrp.classificar_cenario_macro(
+            macro["ipca"], macro["selic"], macro["dolar"], macro["pib"], preco_soja=macro["soja"],
+            preco_milho=macro["milho"], preco_minerio=macro["minerio"], preco_petroleo=macro["petroleo"],
+        )
+        score = hrp.pontuar_macro(macro)
+        for s, setor in enumerate(grade.setores):
+            assert grade.favor[i, j, k, s] == pytest.approx(hrp.calcular_favorecimento_continuo(setor, score),
+                                                            abs=1e-12)
+
+
+def test_tabela_corte_2d(grade):
+    corte = tabela(grade, "cenario", "ipca", "selic", dolar=5.3)
+    k = int(np.abs(grade.eixos["dolar"] - 5.3).argmin())
+    assert corte.shape == (25, 30)
+    assert (corte.to_numpy() == rotulos_cenario(grade)[:, :, k].T).all()
+
+
+def test_indicador_desconhecido(hrp):
+    with pytest.raises(ValueError):
+        avaliar_grade({"juros": [1.0]}, hrp.PARAMS, hrp.sensibilidade_setorial)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.covariance import LedoitWolf
+
+import referencia as ref
+from hrp_vetorizado import bissecao_recursiva, calcular_hrp
+
+
+@pytest.mark.parametrize("n_ativos", [2, 3, 15, 60, 180])
+def test_mesmos_pesos_da_implementacao_pandas(n_ativos):
+    retornos = ref.retornos_sinteticos(n_ativos, semente=n_ativos)
+    correlacao = retornos.corr()
+    cov_df = pd.DataFrame(LedoitWolf().fit(retornos).covariance_, index=retornos.columns, columns=retornos.columns)
+
+    esperado = ref.hrp_pandas(correlacao, cov_df)
+    resultado = calcular_hrp(correlacao, cov_df)
+    obtido = pd.Series(resultado.pesos, index=retornos.columns[resultado.ordem])
+
+    assert list(obtido.index) == list(esperado.index)
+    np.testing.assert_allclose(obtido.to_numpy(), esperado.to_numpy(), rtol=0, atol=1e-12)
+
+
+def test_bissecao_de_variancias_iguais():
+    # Potência de 2: subclusters sempre do mesmo tamanho, pesos iguais
+    np.testing.assert_allclose(bissecao_recursiva(np.full(8, 0.04)), np.full(8, 1 / 8))
+    # Tamanho ímpar: a paridade dentro de cada subcluster favorece o ativo isolado na primeira divisão
+    np.testing.assert_allclose(bissecao_recursiva(np.full(3, 0.04)), [1 / 2, 1 / 4, 1 / 4])
+
+
+def test_aceita_arrays():
+    retornos = ref.retornos_sinteticos(10)
+    a = calcular_hrp(retornos.corr(), retornos.cov())
+    b = calcular_hrp(retornos.corr().to_numpy(), retornos.cov().to_numpy())
+    np.testing.assert_array_equal(a.ordem, b.ordem)
+    np.testing.assert_array_equal(a.pesos, b.pesos)
+    assert a.pesos.sum() == pytest.approx(1.0)
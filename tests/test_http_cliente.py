@@ -0,0 +1,59 @@
+import pytest
+import requests
+
+import http_cliente
+
+
+class RespostaFalsa:
+    status_code = 200
+
+    def __init__(self, dados):
+        self.dados = dados
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.dados
+
+
+@pytest.fixture
+def sessao(monkeypatch):
+    """Sessão HTTP falsa: responde com os params da consulta, ou falha quando `fora_do_ar`."""
+    estado = {"fora_do_ar": False}
+
+    def get(url, params=None, timeout=None):
+        if estado["fora_do_ar"]:
+            raise requests.exceptions.ConnectionError("fora do ar")
+        return RespostaFalsa(dict(params))
+
+    monkeypatch.setattr(http_cliente._sessao, "get", get)
+    monkeypatch.setattr(http_cliente, "_ultimas_respostas", http_cliente.OrderedDict())
+    monkeypatch.setattr(http_cliente, "_circuitos", {})
+    monkeypatch.setattr(http_cliente, "MAX_RESPOSTAS_GUARDADAS", 3)
+    return estado
+
+
+def test_ultimas_respostas_limitadas(sessao):
+    url = "https://api.exemplo/serie"
+    for i in range(5):
+        http_cliente._obter_json_rede(url, {"i": i}, 1)
+    assert len(http_cliente._ultimas_respostas) == 3
+
+    sessao["fora_do_ar"] = True
+    # As mais recentes continuam disponíveis; as mais antigas saíram
+    assert http_cliente._obter_json_rede(url, {"i": 4}, 1) == {"i": 4}
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http_cliente._obter_json_rede(url, {"i": 0}, 1)
+
+
+def test_resposta_usada_na_queda_fica_guardada(sessao):
+    url = "https://api.exemplo/serie"
+    for i in range(3):
+        http_cliente._obter_json_rede(url, {"i": i}, 1)
+    sessao["fora_do_ar"] = True
+    http_cliente._obter_json_rede(url, {"i": 0}, 1)
+    sessao["fora_do_ar"] = False
+    http_cliente._obter_json_rede(url, {"i": 3}, 1)
+    # {"i": 0} foi usada na queda: a que sai é {"i": 1}
+    assert [dict(chave[1]) for chave in http_cliente._ultimas_respostas] == [{"i": 2}, {"i": 0}, {"i": 3}]
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from matriz_setorial import MatrizSetorial, compilar
+
+MACRO = {"selic": 10.5, "ipca": 4.2, "dolar": 5.6, "pib": 2.1, "soja": 11.0, "milho": 4.0, "minerio": 98.0,
+         "petroleo": 80.0}
+
+
+def favorecimento_laco(setor, score_macro, sensibilidade_setorial):
+    """Regra original de calcular_favorecimento_continuo: laço sobre o dict de sensibilidades."""
+    if setor not in sensibilidade_setorial:
+        return 0
+    bruto = sum(score_macro.get(k, 0) * peso for k, peso in sensibilidade_setorial[setor].items())
+    return np.tanh(bruto / 5) * 2
+
+
+@pytest.fixture(scope="module")
+def setores(hrp):
+    # Setores do universo real do app, com ticker sem setor e setor sem sensibilidade
+    return [hrp.setores_por_ticker[t] for t in hrp.setores_por_ticker] + [None, "Setor Desconhecido"]
+
+
+def test_favorecimento_igual_ao_laco(hrp, setores):
+    score = hrp.pontuar_macro(MACRO)
+    esperado = [favorecimento_laco(s, score, hrp.sensibilidade_setorial) for s in setores]
+    matriz = MatrizSetorial(hrp.sensibilidade_setorial)
+    np.testing.assert_allclose(matriz.favorecimento_setores(setores, score), esperado, rtol=0, atol=1e-12)
+    for setor, valor in zip(setores, esperado):
+        assert hrp.calcular_favorecimento_continuo(setor, score) == pytest.approx(valor, abs=1e-12)
+
+
+def test_fatores_ausentes_valem_zero():
+    matriz = compilar({"Parcial": {"pib": 1.5}})
+    assert matriz.matriz[0].tolist() == [1.5 if f == "pib" else 0.0 for f in matriz.fatores]
+
+
+def test_favorecimento_em_lote_por_data(hrp):
+    matriz = hrp.matriz_setorial
+    scores = np.random.default_rng(0).uniform(0, 10, (4, 3, len(matriz.fatores)))
+    favor = matriz.favorecimento(scores)
+    assert favor.shape == (4, 3, len(matriz.setores))
+    score = dict(zip(matriz.fatores, scores[2, 1]))
+    np.testing.assert_allclose(favor[2, 1], matriz.favor_por_setor(score).to_numpy(), atol=1e-12)
+
+
+def test_matriz_e_copia_somente_leitura(hrp):
+    sensibilidade = {k: dict(v) for k, v in hrp.sensibilidade_setorial.items()}
+    matriz = compilar(sensibilidade)
+    sensibilidade["Bancos"]["juros"] = 99.0
+    assert matriz.matriz[matriz.posicoes(["Bancos"])[0], 0] == hrp.sensibilidade_setorial["Bancos"]["juros"]
+    assert not matriz.matriz.flags.writeable
+    assert compilar(matriz) is matriz
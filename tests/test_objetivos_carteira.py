@@ -0,0 +1,41 @@
+import numpy as np
+from scipy.optimize import check_grad, minimize
+
+import referencia as ref
+from objetivos_carteira import retorno_negativo, sharpe_negativo, soma_um
+
+RETORNOS = ref.retornos_sinteticos(20, n_dias=2500, semente=7).to_numpy()
+MU = RETORNOS.mean(axis=0) * 252
+COV = np.cov(RETORNOS, rowvar=False) * 252
+INICIAL = np.full(20, 1 / 20)
+LIMITES = [(0.01, 0.3)] * 20
+
+
+def test_gradiente_do_sharpe():
+    objetivo = sharpe_negativo(MU, COV, 0.0001)
+    pontos = [INICIAL] + list(np.random.default_rng(0).dirichlet(np.ones(20), 5))
+    for w in pontos:
+        assert check_grad(lambda x: objetivo(x)[0], lambda x: objetivo(x)[1], w) < 1e-6
+
+
+def test_volatilidade_nula_vale_zero():
+    valor, gradiente = sharpe_negativo(MU, np.zeros((20, 20)))(INICIAL)
+    assert valor == 0.0 and not gradiente.any()
+
+
+def test_mesma_carteira_que_diferencas_finitas():
+    # Objetivos originais (sem gradiente) x analíticos: mesmo ótimo
+    def sharpe_neg(pesos):
+        vol = np.sqrt(pesos @ COV @ pesos)
+        return -(pesos @ MU - 0.0001) / vol if vol > 0 else 0
+
+    restricao = {"type": "eq", "fun": lambda x: np.sum(x) - 1}
+    opcoes = {"disp": False, "maxiter": 1000}
+    for numerico, analitico in [(sharpe_neg, sharpe_negativo(MU, COV, 0.0001)),
+                                (lambda w: -(w @ MU), retorno_negativo(MU))]:
+        antes = minimize(numerico, INICIAL, method="SLSQP", bounds=LIMITES, constraints=restricao, options=opcoes)
+        depois = minimize(analitico, INICIAL, method="SLSQP", jac=True, bounds=LIMITES,
+                          constraints=soma_um(20), options=opcoes)
+        assert depois.success
+        np.testing.assert_allclose(depois.x, antes.x, atol=1e-5)
+        assert depois.nfev < antes.nfev
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pontuacao_vetorizada as pv
+
+# indicador: faixa sorteada
+FAIXAS = {
+    "ipca": (-2, 12), "selic": (0, 16), "dolar": (2, 9), "pib": (-6, 8),
+    "soja": (5, 20), "milho": (2, 9), "minerio": (40, 250), "petroleo": (20, 140),
+}
+
+
+def fronteiras(nome, params):
+    """Valores exatamente nas fronteiras das faixas de pontuação."""
+    meta, tol, neutra = params["ipca_meta"], params["ipca_tolerancia"], params["selic_neutra"]
+    return {
+        "ipca": [meta - tol, meta + tol, meta + tol + 1, meta - tol - 1e-12],
+        "selic": [neutra - 0.5, neutra + 0.5, neutra + 2, neutra + 2 + 1e-12, neutra - 0.5 - 1e-12],
+        "dolar": [params["dolar_ideal"], params["dolar_ideal"] + 5],
+        "pib": [2.0, 2.0 - 1e-12, 2 - 8 / 3, 3.0],
+    }.get(nome, [])
+
+
+@pytest.mark.parametrize("nome", list(FAIXAS))
+def test_kernel_igual_ao_escalar(hrp, nome):
+    escalar, vetorial = getattr(hrp, f"pontuar_{nome}"), getattr(pv, f"pontuar_{nome}")
+    minimo, maximo = FAIXAS[nome]
+    valores = np.concatenate([np.random.default_rng(0).uniform(minimo, maximo, 20_000),
+                              fronteiras(nome, hrp.PARAMS), [np.nan]])
+    esperado = np.array([escalar(v) for v in valores], dtype="float64")
+    np.testing.assert_array_equal(vetorial(valores, hrp.PARAMS), esperado)
+    assert vetorial(None, hrp.PARAMS) == escalar(None)
+
+
+@pytest.mark.parametrize("nome", list(FAIXAS))
+def test_kernel_preserva_indice_da_series(hrp, nome):
+    vetorial = getattr(pv, f"pontuar_{nome}")
+    serie = pd.Series([1.0, 5.0, np.nan], index=list("abc"), name=nome)
+    resultado = vetorial(serie, hrp.PARAMS)
+    assert isinstance(resultado, pd.Series)
+    assert resultado.index.equals(serie.index) and resultado.name == nome
+
+
+def test_commodities_sem_ideal_pontuam_zero(hrp):
+    params = dict(hrp.PARAMS, minerio_ideal=None)
+    assert pv.pontuar_minerio(np.array([90.0, 105.0]), params).tolist() == [0.0, 0.0]
+
+
+def test_pontuar_macro_e_cenario_iguais_ao_escalar(hrp):
+    rng = np.random.default_rng(1)
+    n = 2000
+    macro = {
+        "ipca": rng.uniform(0, 10, n), "selic": rng.uniform(2, 16, n), "dolar": rng.uniform(4, 7, n),
+        "pib": rng.uniform(-3, 5, n), "soja": rng.uniform(8, 14, n), "milho": rng.uniform(3, 6, n),
+        "minerio": rng.uniform(60, 150, n), "petroleo": rng.uniform(50, 100, n),
+    }
+    # Valores ausentes em parte das linhas
+    macro["soja"][::7] = np.nan
+    macro["petroleo"][::5] = np.nan
+
+    score = pv.pontuar_macro(macro, hrp.PARAMS)
+    total = pv.pontuacao_total_cenario(
+        hrp.PARAMS, macro["ipca"], macro["selic"], macro["dolar"], macro["pib"], preco_soja=macro["soja"],
+        preco_milho=macro["milho"], preco_minerio=macro["minerio"], preco_petroleo=macro["petroleo"],
+    )
+    cenarios = np.asarray(pv.CENARIOS, dtype=object)[pv.classificar_cenario_codigos(total)]
+    for i in range(n):
+        linha = {k: float(v[i]) for k, v in macro.items()}
+        esperado = hrp.pontuar_macro(linha)
+        for fator, valor in esperado.items():
+            assert score[fator][i] == pytest.approx(valor, abs=1e-12)
+        assert cenarios[i] == hrp.classificar_cenario_macro(
+            linha["ipca"], linha["selic"], linha["dolar"], linha["pib"], preco_soja=linha["soja"],
+            preco_milho=linha["milho"], preco_minerio=linha["minerio"], preco_petroleo=linha["petroleo"],
+        )
+
+
+def test_pontuar_macro_dataframe_mantem_indice(hrp):
+    indice = pd.date_range("2024-01-31", periods=3, freq="ME")
+    macro = pd.DataFrame({"ipca": [3.0, 5.0, 9.0], "selic": [7.0, 10.0, 12.0]}, index=indice)
+    score = pv.pontuar_macro(macro, hrp.PARAMS)
+    assert list(score.columns) == list(pv.FATORES) + ["media_global"]
+    assert score.index.equals(indice)
+
+
+def test_classificar_cenario_nos_limiares():
+    codigos = pv.classificar_cenario_codigos(np.array([38, 37.999, 32, 26, 14, 13.999]))
+    assert codigos.tolist() == [0, 1, 1, 2, 3, 4]
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulador_macro import HORIZONTE, _ajustar_var, ipca_12_meses, quantis_favor, simular_cenarios, variacoes_mensais
+
+
+def macro_sintetico(n_meses=130, semente=0):
+    rng = np.random.default_rng(semente)
+    datas = pd.date_range("2015-01-31", periods=n_meses, freq="ME")
+    return pd.DataFrame({
+        "selic": np.clip(10 + np.cumsum(rng.normal(0, 0.4, n_meses)), 2, None),
+        "ipca": 0.4 + rng.normal(0, 0.3, n_meses),
+        "dolar": 4.5 * np.exp(np.cumsum(rng.normal(0, 0.03, n_meses))),
+        "petroleo": 70 * np.exp(np.cumsum(rng.normal(0, 0.08, n_meses))),
+        "pib": 2.0,
+    }, index=datas)
+
+
+MACRO = macro_sintetico()
+
+
+def test_variacoes_mensais():
+    variacoes = variacoes_mensais(MACRO)
+    assert list(variacoes.columns) == ["selic", "ipca", "dolar", "petroleo"]
+    # As 11 primeiras variações do IPCA em 12 meses não existem
+    assert len(variacoes) == len(MACRO) - 12
+    np.testing.assert_allclose(variacoes["dolar"], np.log(MACRO["dolar"]).diff().iloc[12:])
+    np.testing.assert_allclose(variacoes["ipca"], ipca_12_meses(MACRO["ipca"]).diff().iloc[12:])
+
+
+def test_ipca_12_meses():
+    mensal = pd.Series(0.5, index=pd.date_range("2020-01-31", periods=14, freq="ME"))
+    acumulado = ipca_12_meses(mensal)
+    assert acumulado.iloc[:11].isna().all()
+    np.testing.assert_allclose(acumulado.iloc[11:], (1.005 ** 12 - 1) * 100)
+
+
+def test_ipca_simulado_na_unidade_anual(hrp):
+    # IPCA mensal em torno de 0,4% (≈ 5% ao ano): a simulação parte e fica na unidade anual
+    sim = simular_cenarios(MACRO, hrp.PARAMS, hrp.matriz_setorial, n_trajetorias=2000, horizonte=1, semente=0,
+                           inicial={"selic": 7.0, "dolar": 5.3, "petroleo": 75.0, "ipca": 3.0})
+    esperado = hrp.classificar_cenario_macro(3.0, 7.0, 5.3, 2.0, preco_petroleo=75.0)
+    # Variação de um mês do IPCA em 12 meses é pequena perto da banda da meta: quase tudo no cenário inicial
+    assert sim.probabilidades.loc[1, esperado] > 0.5
+
+
+@pytest.mark.parametrize("metodo", ["bootstrap", "var"])
+def test_probabilidades_e_formatos(hrp, metodo):
+    sim = simular_cenarios(MACRO, hrp.PARAMS, hrp.matriz_setorial, n_trajetorias=6000, metodo=metodo, semente=1)
+    assert sim.probabilidades.shape == (HORIZONTE, 5)
+    np.testing.assert_allclose(sim.probabilidades.sum(axis=1), 1.0)
+    assert sim.favor_final.shape == (6000, len(hrp.sensibilidade_setorial))
+    assert sim.favor_medio.shape == (HORIZONTE, len(hrp.sensibilidade_setorial))
+    assert list(quantis_favor(sim).columns) == ["media", "p5", "p25", "p50", "p75", "p95"]
+
+
+def test_resultado_nao_depende_do_numero_de_workers(hrp):
+    a = simular_cenarios(MACRO, hrp.PARAMS, hrp.matriz_setorial, n_trajetorias=12000, semente=3, max_workers=1)
+    b = simular_cenarios(MACRO, hrp.PARAMS, hrp.matriz_setorial, n_trajetorias=12000, semente=3, max_workers=4)
+    pd.testing.assert_frame_equal(a.probabilidades, b.probabilidades)
+    np.testing.assert_array_equal(a.favor_final, b.favor_final)
+
+
+def test_horizonte_de_um_mes_parte_do_valor_inicial(hrp):
+    # Sem variação possível (histórico constante), todas as trajetórias ficam no cenário do ponto inicial
+    constante = MACRO.assign(selic=7.0, ipca=0.25, dolar=5.3, petroleo=75.0)
+    sim = simular_cenarios(constante, hrp.PARAMS, hrp.matriz_setorial, n_trajetorias=1000, horizonte=1, semente=0)
+    ipca_anual = (1.0025 ** 12 - 1) * 100
+    esperado = hrp.classificar_cenario_macro(ipca_anual, 7.0, 5.3, 2.0, preco_petroleo=75.0)
+    assert sim.probabilidades.loc[1, esperado] == 1.0
+
+
+def test_var_instavel():
+    rng = np.random.default_rng(0)
+    explosivo = np.zeros((80, 2))
+    for t in range(1, 80):
+        explosivo[t] = 1.1 * explosivo[t - 1] + rng.normal(0, 1, 2)
+    with pytest.raises(ValueError, match="instável"):
+        _ajustar_var(explosivo)
+    c, a, residuos = _ajustar_var(rng.normal(0, 1, (80, 2)))
+    assert np.abs(np.linalg.eigvals(a)).max() < 1
+
+
+def test_erros(hrp):
+    with pytest.raises(ValueError):
+        simular_cenarios(MACRO, hrp.PARAMS, hrp.matriz_setorial, metodo="garch")
+    with pytest.raises(ValueError):
+        simular_cenarios(MACRO.iloc[:3], hrp.PARAMS, hrp.matriz_setorial)